@@ -0,0 +1,212 @@
+"""Precompute analysis artifacts for the bundled MEI corpus.
+
+Run as ``encoding-music-mcp precompute``. Every analysis is written to the
+artifact store in ``MCP_ARTIFACT_DIR``, so a server using the same directory
+(for example, one baked into a container image) serves the first request for
+a bundled score as fast as any later one.
+
+The command exits with status 1 when any analysis fails or is not stored.
+Scores with no notes of their own, such as the CRIM files that only include
+the movements of a mass, are skipped.
+"""
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any
+
+from .tools.artifact_store import get_artifact_store
+from .tools.helpers import get_mei_collections, get_mei_filepath
+from .tools.intervals import (
+    _load_score_index,
+    count_melodic_ngrams,
+    get_cadences,
+    get_melodic_intervals,
+    get_notes,
+)
+from .tools.metadata import get_mei_metadata
+from .tools.ngram_engine import load_melodic_score
+from .tools.visualisation.voice_ranges import _extract_staff_ranges
+from .tools.visualisation.weighted_note_distribution import _load_pitch_class_table
+
+__all__ = ["main", "precompute_file"]
+
+DEFAULT_NGRAM_LENGTHS = (3, 4, 5)
+
+
+def _analyses(
+    filename: str, ngram_lengths: tuple[int, ...]
+) -> list[tuple[str, dict[str, Any], Callable[[], Any]]]:
+    """Return ``(artifact, params, run)`` for each analysis stored for one score.
+
+    ``artifact`` and ``params`` name the artifact that ``run`` must leave in
+    the store.
+    """
+    filepath = get_mei_filepath(filename)
+    analyses = [
+        ("mei_metadata", {}, lambda: get_mei_metadata(filename)),
+        ("score_index", {}, lambda: _load_score_index(filepath)),
+        ("melodic_score", {}, lambda: load_melodic_score(filepath)),
+        ("pitch_class_table", {}, lambda: _load_pitch_class_table(filepath)),
+        ("crim_notes", {}, lambda: get_notes(filename)),
+        (
+            "crim_melodic_intervals",
+            {"kind": "d"},
+            lambda: get_melodic_intervals(filename),
+        ),
+        ("voice_ranges", {}, lambda: _extract_staff_ranges(filename)),
+        ("cadences", {}, lambda: get_cadences(filename)),
+    ]
+    for n in ngram_lengths:
+        analyses.append(
+            (
+                "melodic_ngram_counts",
+                {"n": n},
+                lambda n=n: count_melodic_ngrams(filename, n=n),
+            )
+        )
+    return analyses
+
+
+def _has_notes(filepath: Path) -> bool:
+    """Return whether a score has any sounding notes of its own."""
+    return bool(_load_pitch_class_table(filepath).durations[-1].any())
+
+
+def precompute_file(filename: str, ngram_lengths: tuple[int, ...]) -> list[str]:
+    """Store every precomputed analysis of one score.
+
+    Args:
+        filename: Name of a bundled MEI file.
+        ngram_lengths: Lengths of the melodic n-gram count tables to store.
+
+    Returns:
+        One message per analysis that failed or whose artifact was not
+        stored; the rest are still stored.
+    """
+    store = get_artifact_store()
+    if store is None:
+        return ["The artifact store is disabled (MCP_ARTIFACT_DIR is empty)"]
+    filepath = get_mei_filepath(filename)
+    errors = []
+    for artifact, params, analysis in _analyses(filename, ngram_lengths):
+        label = artifact + "".join(f" {key}={value}" for key, value in params.items())
+        try:
+            analysis()
+        except Exception as exc:  # noqa: BLE001 - reported per analysis
+            errors.append(f"{label}: {type(exc).__name__}: {exc}")
+            continue
+        stored = store.stored_params(artifact, filepath)
+        if not any(candidate.items() >= params.items() for candidate in stored):
+            errors.append(f"{label}: computed but not stored")
+    return errors
+
+
+def _precompute_in_worker(
+    filename: str, ngram_lengths: tuple[int, ...]
+) -> tuple[bool, list[str]]:
+    """Precompute one score unless it has no notes; return ``(has_notes, errors)``."""
+    if not _has_notes(get_mei_filepath(filename)):
+        return False, []
+    return True, precompute_file(filename, ngram_lengths)
+
+
+def _parse_args(argv: list[str] | None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="encoding-music-mcp precompute",
+        description="Precompute analysis artifacts for the bundled MEI files.",
+    )
+    parser.add_argument(
+        "--collection",
+        default="all_files",
+        help="Collection to precompute (default: all_files)",
+    )
+    parser.add_argument(
+        "--ngram-lengths",
+        type=int,
+        nargs="+",
+        default=list(DEFAULT_NGRAM_LENGTHS),
+        help="Melodic n-gram lengths to count (default: 3 4 5)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Worker processes (default: CPU count)",
+    )
+    parser.add_argument(
+        "--artifact-dir",
+        help="Artifact directory (default: MCP_ARTIFACT_DIR or the temp directory)",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Precompute artifacts for a collection and print a summary.
+
+    Returns:
+        Process exit status: ``0`` on success, ``1`` if any analysis failed or
+        was not stored, and ``2`` for invalid arguments.
+    """
+    args = _parse_args(argv)
+    if args.artifact_dir is not None:
+        # Set before starting workers, which inherit the environment.
+        os.environ["MCP_ARTIFACT_DIR"] = args.artifact_dir
+    store = get_artifact_store()
+    if store is None:
+        print(
+            "The artifact store is disabled (MCP_ARTIFACT_DIR is empty)",
+            file=sys.stderr,
+        )
+        return 2
+    collections = get_mei_collections()
+    if args.collection not in collections:
+        print(
+            f"Unknown collection {args.collection!r}; expected one of {sorted(collections)}",
+            file=sys.stderr,
+        )
+        return 2
+    if args.workers < 1:
+        print("--workers must be at least 1", file=sys.stderr)
+        return 2
+
+    filenames = collections[args.collection]
+    ngram_lengths = tuple(args.ngram_lengths)
+    started = time.perf_counter()
+    failures = 0
+    skipped = []
+    with ProcessPoolExecutor(
+        max_workers=min(args.workers, len(filenames)),
+        mp_context=multiprocessing.get_context("spawn"),
+    ) as executor:
+        futures = {
+            executor.submit(_precompute_in_worker, filename, ngram_lengths): filename
+            for filename in filenames
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            filename = futures[future]
+            has_notes, errors = future.result()
+            print(f"[{done}/{len(filenames)}] {filename}", flush=True)
+            if not has_notes:
+                skipped.append(filename)
+                print("  skipped: no notes of its own", flush=True)
+            for error in errors:
+                failures += 1
+                print(f"  {error}", file=sys.stderr, flush=True)
+
+    store.compact()
+    stats = store.stats()
+    print(
+        f"Stored {stats['artifacts']} artifacts ({stats['bytes'] / 1e6:.1f} MB) "
+        f"in {stats['root']} in {time.perf_counter() - started:.0f}s; "
+        f"{failures} analyses failed or were not stored; "
+        f"{len(skipped)} scores without notes skipped"
+    )
+    return 1 if failures else 0
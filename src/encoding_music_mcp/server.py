@@ -1,10 +1,13 @@
 """MCP server for MEI file analysis."""
 
 import os
+import sys
 
 from fastmcp import FastMCP
 from starlette.responses import JSONResponse
 
+from .tools.worker_pool import configure_tool_workers
+
 # Create MCP server
 mcp = FastMCP("encoding-music-mcp")
 
@@ -25,13 +28,23 @@ def main():
 
     Supports two transport modes controlled by MCP_TRANSPORT env var:
     - "stdio" (default): Local MCP client communication via stdin/stdout
-    - "http": Remote HTTP server for deployment behind reverse proxy
+    - "http": Remote HTTP server for deployment behind reverse proxy. CPU-bound
+      tools run in a pool of MCP_TOOL_WORKERS worker processes.
+
+    ``encoding-music-mcp precompute`` instead fills the artifact store for the
+    bundled corpus; see :mod:`encoding_music_mcp.precompute`.
     """
+    if sys.argv[1:2] == ["precompute"]:
+        from .precompute import main as precompute_main
+
+        raise SystemExit(precompute_main(sys.argv[2:]))
+
     transport = os.environ.get("MCP_TRANSPORT", "stdio")
 
     if transport == "http":
         host = os.environ.get("MCP_HOST", "0.0.0.0")
         port = int(os.environ.get("MCP_PORT", "8000"))
+        configure_tool_workers()
         mcp.run(transport="http", host=host, port=port)
     else:
         mcp.run()
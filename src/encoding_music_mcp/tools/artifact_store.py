@@ -0,0 +1,578 @@
+"""Persistent on-disk store for per-score analysis artifacts.
+
+The in-memory score cache is lost on every restart and is private to each
+worker process. Artifacts written here survive restarts and are shared by
+every process using the same directory (``MCP_ARTIFACT_DIR``).
+
+Each artifact is keyed by the SHA-256 of the score's content, the analysis
+name and version, its parameters, and the versions of this package and of the
+libraries that computed it, so edited files, changed parameters, and upgrades
+never reuse a stale result. The oldest artifacts are deleted once the store
+outgrows ``MCP_ARTIFACT_MAX_MB``. Files are written to a temporary name and renamed into
+place, and a SQLite index (in WAL mode) records them, so concurrent readers
+and writers never see a partial artifact.
+
+Three formats are supported:
+
+- ``"npz"``: dataclasses of NumPy arrays, such as the native event tables,
+  and pandas DataFrames, such as CRIM Intervals results.
+- ``"json"``: plain JSON values.
+- ``"svg"``: rendered SVG text, such as notation pages.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import importlib
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections.abc import Callable
+from contextlib import closing
+from functools import cache, lru_cache
+from importlib import metadata
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from .score_cache import get_score_cache
+
+__all__ = [
+    "ArtifactStore",
+    "code_versions",
+    "content_hash",
+    "get_artifact_store",
+    "library_versions",
+    "load_artifact",
+    "persistent",
+]
+
+_STORE_VERSION = 2
+_FORMATS = {"json": ".json", "npz": ".npz", "svg": ".svg"}
+_SQLITE_TIMEOUT_S = 30.0
+_DEFAULT_MAX_MB = 1024
+_DISTRIBUTION = "encoding-music-mcp"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    key TEXT PRIMARY KEY,
+    analysis TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    params TEXT NOT NULL,
+    versions TEXT NOT NULL,
+    format TEXT NOT NULL,
+    path TEXT NOT NULL,
+    bytes INTEGER NOT NULL,
+    created REAL NOT NULL
+)
+"""
+
+
+def content_hash(filepath: Path) -> str:
+    """Return the SHA-256 of a file's bytes, memoised by path, mtime, and size.
+
+    Digests are kept in the shared score cache, so they are bounded by its
+    memory budget and replaced when a file changes.
+    """
+    return get_score_cache().get_or_load(
+        "content_hash",
+        filepath,
+        lambda path: hashlib.sha256(path.read_bytes()).hexdigest(),
+        size_estimate=lambda _path, digest: 2 * len(digest),
+    )
+
+
+@cache
+def library_versions(libraries: tuple[str, ...]) -> dict[str, str]:
+    """Return the installed version of each named distribution."""
+    versions = {}
+    for library in libraries:
+        try:
+            versions[library] = metadata.version(library)
+        except metadata.PackageNotFoundError:
+            versions[library] = "unknown"
+    return versions
+
+
+def code_versions(libraries: tuple[str, ...]) -> dict[str, str]:
+    """Return the versions of this package and of the named distributions.
+
+    This is the version record of every artifact key, and of anything else
+    derived from scores that must not outlive an upgrade.
+    """
+    return library_versions((_DISTRIBUTION, *libraries))
+
+
+def _encode_column(values: np.ndarray, arrays: dict[str, np.ndarray]) -> Any:
+    """Return a JSON node for one DataFrame column or index level.
+
+    Object columns, such as CRIM's mix of interval names and NaN rests, are
+    kept as JSON lists so no pickling is needed.
+    """
+    if values.dtype.hasobject:
+        return {"__objects__": [_encode(item, arrays) for item in values.tolist()]}
+    return _encode(values, arrays)
+
+
+def _decode_column(node: Any, arrays: dict[str, np.ndarray]) -> np.ndarray:
+    """Rebuild a column encoded by ``_encode_column``."""
+    if "__objects__" not in node:
+        return _decode(node, arrays)
+    values = np.empty(len(node["__objects__"]), dtype=object)
+    values[:] = [_decode(item, arrays) for item in node["__objects__"]]
+    return values
+
+
+def _encode_frame(frame: pd.DataFrame, arrays: dict[str, np.ndarray]) -> Any:
+    """Return a JSON node for a DataFrame, column by column."""
+    if isinstance(frame.columns, pd.MultiIndex):
+        raise TypeError("DataFrames with hierarchical columns cannot be stored")
+    if not all(isinstance(dtype, np.dtype) for dtype in frame.dtypes):
+        raise TypeError("DataFrames with extension dtypes cannot be stored")
+    index = frame.index
+    return {
+        "__frame__": [
+            _encode_column(frame.iloc[:, position].to_numpy(), arrays)
+            for position in range(frame.shape[1])
+        ],
+        "columns": _encode_column(frame.columns.to_numpy(), arrays),
+        "columns_name": _encode(frame.columns.name, arrays),
+        "index": [
+            _encode_column(index.get_level_values(level).to_numpy(), arrays)
+            for level in range(index.nlevels)
+        ],
+        "index_names": _encode(list(index.names), arrays),
+    }
+
+
+def _decode_frame(node: dict[str, Any], arrays: dict[str, np.ndarray]) -> pd.DataFrame:
+    """Rebuild a DataFrame encoded by ``_encode_frame``."""
+    levels = [_decode_column(level, arrays) for level in node["index"]]
+    names = _decode(node["index_names"], arrays)
+    if len(levels) == 1:
+        index = pd.Index(levels[0], name=names[0])
+    else:
+        index = pd.MultiIndex.from_arrays(levels, names=names)
+    frame = pd.DataFrame(
+        {
+            position: _decode_column(column, arrays)
+            for position, column in enumerate(node["__frame__"])
+        },
+        index=index,
+    )
+    frame.columns = pd.Index(
+        _decode_column(node["columns"], arrays),
+        name=_decode(node["columns_name"], arrays),
+    )
+    return frame
+
+
+def _encode(value: Any, arrays: dict[str, np.ndarray]) -> Any:
+    """Return a JSON tree for a value, moving its arrays into ``arrays``."""
+    if isinstance(value, np.ndarray):
+        if value.dtype.hasobject:
+            raise TypeError("Object arrays cannot be stored without pickling")
+        name = f"a{len(arrays)}"
+        arrays[name] = value
+        return {"__array__": name}
+    if isinstance(value, pd.DataFrame):
+        return _encode_frame(value, arrays)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        cls = type(value)
+        if not cls.__module__.startswith(f"{__package__}."):
+            raise TypeError(f"Cannot store dataclass from module {cls.__module__}")
+        return {
+            "__dataclass__": cls.__module__.removeprefix(f"{__package__}."),
+            "__name__": cls.__qualname__,
+            "fields": {
+                field.name: _encode(getattr(value, field.name), arrays)
+                for field in dataclasses.fields(value)
+                if field.init
+            },
+        }
+    if isinstance(value, dict):
+        if not all(isinstance(key, str) for key in value):
+            raise TypeError("Only dictionaries with string keys can be stored")
+        return {"__dict__": {key: _encode(item, arrays) for key, item in value.items()}}
+    if isinstance(value, tuple):
+        return {"__tuple__": [_encode(item, arrays) for item in value]}
+    if isinstance(value, list):
+        return [_encode(item, arrays) for item in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    if value is None or isinstance(value, str | int | float | bool):
+        return value
+    raise TypeError(f"Cannot store value of type {type(value).__name__}")
+
+
+def _decode(node: Any, arrays: dict[str, np.ndarray]) -> Any:
+    """Rebuild a value encoded by ``_encode``."""
+    if isinstance(node, list):
+        return [_decode(item, arrays) for item in node]
+    if not isinstance(node, dict):
+        return node
+    if "__array__" in node:
+        return arrays[node["__array__"]]
+    if "__tuple__" in node:
+        return tuple(_decode(item, arrays) for item in node["__tuple__"])
+    if "__dict__" in node:
+        return {key: _decode(item, arrays) for key, item in node["__dict__"].items()}
+    if "__frame__" in node:
+        return _decode_frame(node, arrays)
+    module = importlib.import_module(f"{__package__}.{node['__dataclass__']}")
+    cls = getattr(module, node["__name__"])
+    if not dataclasses.is_dataclass(cls):
+        raise TypeError(f"{node['__name__']} is not a dataclass")
+    return cls(**{key: _decode(item, arrays) for key, item in node["fields"].items()})
+
+
+def _write_value(value: Any, fmt: str, handle: Any) -> None:
+    """Serialise a value to an open binary file."""
+    if fmt == "npz":
+        arrays: dict[str, np.ndarray] = {}
+        tree = json.dumps(_encode(value, arrays))
+        np.savez(handle, __tree__=np.array(tree), **arrays)
+    elif fmt == "svg":
+        if not isinstance(value, str):
+            raise TypeError("SVG artifacts must be strings")
+        handle.write(value.encode("utf-8"))
+    else:
+        handle.write(json.dumps(value).encode("utf-8"))
+
+
+def _read_npz(source: Path | io.BytesIO) -> Any:
+    """Deserialise an ``.npz`` artifact from a path or buffer."""
+    with np.load(source, allow_pickle=False) as data:
+        arrays = {name: data[name] for name in data.files}
+    return _decode(json.loads(str(arrays.pop("__tree__"))), arrays)
+
+
+def _read_value(path: Path, fmt: str) -> Any:
+    """Deserialise a value written by ``_write_value``."""
+    if fmt == "npz":
+        return _read_npz(path)
+    if fmt == "svg":
+        return path.read_text(encoding="utf-8")
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _round_trips(value: Any, payload: bytes, fmt: str) -> bool:
+    """Return whether a serialised DataFrame or JSON value reads back unchanged.
+
+    A DataFrame whose index or column types would change on reading, and JSON
+    that turns tuples into lists and keys into strings, are recomputed rather
+    than stored.
+    """
+    if fmt == "json":
+        return json.loads(payload) == value
+    if fmt != "npz" or not isinstance(value, pd.DataFrame):
+        return True
+    restored = _read_npz(io.BytesIO(payload))
+    return (
+        restored.equals(value)
+        and restored.index.names == value.index.names
+        and restored.dtypes.astype(str).tolist() == value.dtypes.astype(str).tolist()
+    )
+
+
+class ArtifactStore:
+    """Versioned, content-addressed artifacts under one directory.
+
+    When ``max_bytes`` is set, the oldest artifacts are evicted once the
+    store outgrows it.
+    """
+
+    def __init__(self, root: Path, max_bytes: int | None = None):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._index_path = self.root / "index.sqlite"
+        self._local = threading.local()
+        self._setup_lock = threading.Lock()
+        self._ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return this thread's connection to the index, opening it on first use.
+
+        The directory, WAL mode (which persists in the database file), and
+        schema are set up once per store rather than on every lookup.
+        """
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            with self._setup_lock:
+                if not self._ready:
+                    self.root.mkdir(parents=True, exist_ok=True)
+                    with closing(
+                        sqlite3.connect(self._index_path, timeout=_SQLITE_TIMEOUT_S)
+                    ) as setup:
+                        setup.execute("PRAGMA journal_mode=WAL")
+                        setup.execute(_SCHEMA)
+                    self._ready = True
+            connection = sqlite3.connect(self._index_path, timeout=_SQLITE_TIMEOUT_S)
+            self._local.connection = connection
+        return connection
+
+    def _key(
+        self,
+        analysis: str,
+        filepath: Path,
+        params: dict[str, Any],
+        libraries: tuple[str, ...],
+        version: int,
+    ) -> tuple[str, dict[str, Any]]:
+        """Return the artifact key and the record it was derived from."""
+        record = {
+            "store": _STORE_VERSION,
+            "analysis": analysis,
+            "version": version,
+            "content_hash": content_hash(filepath),
+            "params": params,
+            "versions": code_versions(libraries),
+        }
+        payload = json.dumps(record, sort_keys=True, default=repr)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest(), record
+
+    def load_or_build(
+        self,
+        analysis: str,
+        filepath: Path,
+        build: Callable[[], Any],
+        fmt: str = "npz",
+        params: dict[str, Any] | None = None,
+        libraries: tuple[str, ...] = ("numpy",),
+        version: int = 1,
+    ) -> Any:
+        """Return a stored artifact, building and storing it on a miss.
+
+        Args:
+            analysis: Name of the analysis, such as ``"score_index"``.
+            filepath: Path of the score the artifact is derived from.
+            build: Callable computing the artifact.
+            fmt: Storage format: ``"npz"``, ``"json"``, or ``"svg"``.
+            params: JSON-serialisable parameters of the analysis.
+            libraries: Distributions whose versions affect the result.
+            version: Analysis version; bump it when the builder changes.
+
+        Returns:
+            The stored or newly built artifact.
+        """
+        if fmt not in _FORMATS:
+            raise ValueError(f"Unsupported artifact format: {fmt!r}")
+        key, record = self._key(analysis, filepath, params or {}, libraries, version)
+        row = (
+            self._connect()
+            .execute("SELECT path FROM artifacts WHERE key = ?", (key,))
+            .fetchone()
+        )
+        if row is not None:
+            try:
+                return _read_value(self.root / row[0], fmt)
+            except (OSError, ValueError, KeyError, TypeError):
+                # Missing or unreadable; rebuild it below.
+                pass
+
+        value = build()
+        self._save(key, record, fmt, value)
+        return value
+
+    def _save(self, key: str, record: dict[str, Any], fmt: str, value: Any) -> None:
+        """Write an artifact atomically and index it; skip unstorable values."""
+        buffer = io.BytesIO()
+        try:
+            _write_value(value, fmt, buffer)
+            payload = buffer.getvalue()
+            if not _round_trips(value, payload, fmt):
+                return
+        except (ImportError, NotImplementedError, TypeError, ValueError):
+            return
+
+        relative = Path(record["analysis"]) / f"{key}{_FORMATS[fmt]}"
+        path = self.root / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        handle, temp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(handle, "wb") as temp_file:
+                temp_file.write(payload)
+            os.replace(temp_name, path)
+        except BaseException:
+            Path(temp_name).unlink(missing_ok=True)
+            raise
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO artifacts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    record["analysis"],
+                    record["content_hash"],
+                    json.dumps(record["params"], sort_keys=True, default=repr),
+                    json.dumps(record["versions"], sort_keys=True),
+                    fmt,
+                    relative.as_posix(),
+                    len(payload),
+                    time.time(),
+                ),
+            )
+            evicted = self._evict(connection)
+        for relative in evicted:
+            (self.root / relative).unlink(missing_ok=True)
+
+    def _evict(self, connection: sqlite3.Connection) -> list[str]:
+        """Drop the oldest index entries until the store fits ``max_bytes``.
+
+        Returns:
+            Paths of the evicted artifacts, to delete once the change commits.
+        """
+        if self.max_bytes is None:
+            return []
+        (total,) = connection.execute(
+            "SELECT COALESCE(SUM(bytes), 0) FROM artifacts"
+        ).fetchone()
+        evicted = []
+        for key, relative, size in connection.execute(
+            "SELECT key, path, bytes FROM artifacts ORDER BY created, rowid"
+        ):
+            if total <= self.max_bytes:
+                break
+            evicted.append((key, relative))
+            total -= size
+        connection.executemany(
+            "DELETE FROM artifacts WHERE key = ?", [(key,) for key, _ in evicted]
+        )
+        return [relative for _, relative in evicted]
+
+    def stored_params(self, analysis: str, filepath: Path) -> list[dict[str, Any]]:
+        """Return the parameters of every stored artifact of one analysis of a score."""
+        rows = self._connect().execute(
+            "SELECT params FROM artifacts WHERE analysis = ? AND content_hash = ?",
+            (analysis, content_hash(filepath)),
+        )
+        return [json.loads(params) for (params,) in rows]
+
+    def stats(self) -> dict[str, Any]:
+        """Return artifact counts and sizes per analysis."""
+        rows = (
+            self._connect()
+            .execute(
+                "SELECT analysis, COUNT(*), SUM(bytes) FROM artifacts GROUP BY analysis"
+            )
+            .fetchall()
+        )
+        return {
+            "root": str(self.root),
+            "artifacts": sum(count for _, count, _ in rows),
+            "bytes": sum(size for _, _, size in rows),
+            "analyses": {
+                analysis: {"artifacts": count, "bytes": size}
+                for analysis, count, size in rows
+            },
+        }
+
+    def compact(self) -> None:
+        """Fold the write-ahead log into the index and reclaim free space.
+
+        Used after precomputing, so a baked artifact pack is one index file.
+        """
+        connection = self._connect()
+        connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        connection.execute("VACUUM")
+
+    def clear(self) -> None:
+        """Delete every artifact and its index entry."""
+        with self._connect() as connection:
+            paths = [row[0] for row in connection.execute("SELECT path FROM artifacts")]
+            connection.execute("DELETE FROM artifacts")
+        for relative in paths:
+            (self.root / relative).unlink(missing_ok=True)
+
+
+def _artifact_dir() -> Path | None:
+    """Return the artifact directory (``MCP_ARTIFACT_DIR``), or ``None`` if disabled.
+
+    Setting ``MCP_ARTIFACT_DIR`` to an empty string disables the store.
+    """
+    default = Path(tempfile.gettempdir()) / "encoding_music_mcp_artifacts"
+    value = os.environ.get("MCP_ARTIFACT_DIR", str(default))
+    return Path(value) if value else None
+
+
+def _max_bytes_from_env() -> int | None:
+    """Read the store's size limit from ``MCP_ARTIFACT_MAX_MB``; ``0`` means none."""
+    max_mb = int(os.environ.get("MCP_ARTIFACT_MAX_MB", str(_DEFAULT_MAX_MB)))
+    return max_mb * 1024 * 1024 if max_mb > 0 else None
+
+
+@lru_cache(maxsize=4)
+def _store_for(root: Path, max_bytes: int | None) -> ArtifactStore:
+    return ArtifactStore(root, max_bytes)
+
+
+def get_artifact_store() -> ArtifactStore | None:
+    """Return the shared artifact store, or ``None`` when it is disabled."""
+    root = _artifact_dir()
+    return _store_for(root, _max_bytes_from_env()) if root is not None else None
+
+
+def load_artifact(
+    analysis: str,
+    filepath: Path,
+    build: Callable[[], Any],
+    fmt: str = "npz",
+    params: dict[str, Any] | None = None,
+    libraries: tuple[str, ...] = ("numpy",),
+    version: int = 1,
+) -> Any:
+    """Return an artifact from the shared store, or build it if the store is off.
+
+    Takes the same arguments as :meth:`ArtifactStore.load_or_build`.
+    """
+    store = get_artifact_store()
+    if store is None:
+        return build()
+    return store.load_or_build(
+        analysis,
+        filepath,
+        build,
+        fmt=fmt,
+        params=params,
+        libraries=libraries,
+        version=version,
+    )
+
+
+def persistent(
+    analysis: str,
+    build: Callable[[Path], Any],
+    fmt: str = "npz",
+    libraries: tuple[str, ...] = ("numpy",),
+    version: int = 1,
+) -> Callable[[Path], Any]:
+    """Wrap a score-cache loader so it reads from and writes to the store.
+
+    Args:
+        analysis: Name of the analysis, used in the artifact key.
+        build: Loader taking the score path, as passed to ``get_or_load``.
+        fmt: Storage format of the artifact.
+        libraries: Distributions whose versions affect the result.
+        version: Analysis version; bump it when ``build`` changes.
+
+    Returns:
+        Loader with the same signature as ``build``.
+    """
+
+    def load(filepath: Path) -> Any:
+        return load_artifact(
+            analysis,
+            filepath,
+            lambda: build(filepath),
+            fmt=fmt,
+            libraries=libraries,
+            version=version,
+        )
+
+    return load
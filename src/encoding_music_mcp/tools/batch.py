@@ -0,0 +1,230 @@
+"""Batch analysis of many MEI files in a pool of worker processes.
+
+Every batch call shares one process-wide pool of at most ``MCP_BATCH_WORKERS``
+workers, so concurrent batches cannot start more processes than that between
+them.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import inspect
+import os
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from fastmcp import Context
+
+from .helpers import get_mei_collections
+from .intervals import count_melodic_ngrams, get_cadences
+from .key_analysis import analyze_key, analyze_key_windows
+from .metadata import get_mei_metadata
+from .visualisation.voice_ranges import plot_voice_ranges
+from .worker_pool import ToolWorkerPool
+
+__all__ = ["BATCH_TOOLS", "batch_analyze"]
+
+_MAX_DEFAULT_WORKERS = 8
+
+
+def _voice_range_data(filename: str) -> dict[str, Any]:
+    """Return the structured voice-range payload without the app wrapper."""
+    return plot_voice_ranges(filename).structured_content
+
+
+BATCH_TOOLS: dict[str, Callable[..., dict[str, Any]]] = {
+    "analyze_key": analyze_key,
+    "analyze_key_windows": analyze_key_windows,
+    "count_melodic_ngrams": count_melodic_ngrams,
+    "get_cadences": get_cadences,
+    "get_mei_metadata": get_mei_metadata,
+    "plot_voice_ranges": _voice_range_data,
+}
+
+
+def _validate_params(tool: str, params: dict[str, Any] | None) -> dict[str, Any]:
+    """Check a batch tool name and its keyword arguments."""
+    if tool not in BATCH_TOOLS:
+        raise ValueError(
+            f"Unknown batch tool {tool!r}; expected one of {sorted(BATCH_TOOLS)}"
+        )
+    params = dict(params or {})
+    accepted = set(inspect.signature(BATCH_TOOLS[tool]).parameters) - {"filename"}
+    unknown = sorted(set(params) - accepted)
+    if unknown:
+        raise ValueError(
+            f"Unsupported parameter(s) for {tool}: {unknown}; expected a subset of {sorted(accepted)}"
+        )
+    return params
+
+
+def _batch_filenames(filenames: list[str] | None, collection: str | None) -> list[str]:
+    """Return the requested filenames in order, without duplicates."""
+    if filenames is None and collection is None:
+        raise ValueError("Provide filenames, a collection, or both")
+    selected = [Path(filename).name for filename in filenames or []]
+    if collection is not None:
+        collections = get_mei_collections()
+        if collection not in collections:
+            raise ValueError(
+                f"Unknown collection {collection!r}; expected one of {sorted(collections)}"
+            )
+        selected.extend(collections[collection])
+    selected = list(dict.fromkeys(selected))
+    if not selected:
+        raise ValueError("No MEI files selected for batch analysis")
+    return selected
+
+
+def _run_batch_item(
+    tool: str, filename: str, params: dict[str, Any]
+) -> tuple[bool, Any]:
+    """Run one tool on one file, returning ``(ok, result_or_message)``.
+
+    Exceptions are flattened to strings here so that one failing score cannot
+    break the pool with an unpicklable error.
+    """
+    try:
+        return True, BATCH_TOOLS[tool](filename, **params)
+    except Exception as exc:  # noqa: BLE001 - reported per file
+        return False, f"{type(exc).__name__}: {exc}"
+
+
+def _batch_worker_cap() -> int:
+    """Read the process-wide batch worker limit from ``MCP_BATCH_WORKERS``."""
+    default = min(os.cpu_count() or 1, _MAX_DEFAULT_WORKERS)
+    return max(1, int(os.environ.get("MCP_BATCH_WORKERS", str(default))))
+
+
+_POOL: tuple[asyncio.AbstractEventLoop, ToolWorkerPool] | None = None
+_ACTIVE_BATCHES = 0
+
+
+def _batch_pool() -> ToolWorkerPool:
+    """Return the pool shared by every batch running on the current loop.
+
+    The pool's slots belong to one event loop, so a new pool replaces it when
+    batches run on another loop or the worker limit has changed.
+    """
+    global _POOL
+    loop = asyncio.get_running_loop()
+    cap = _batch_worker_cap()
+    if _POOL is None or _POOL[0] is not loop or _POOL[1].max_workers != cap:
+        if _POOL is not None:
+            _POOL[1].shutdown()
+        _POOL = (loop, ToolWorkerPool(cap))
+    return _POOL[1]
+
+
+async def batch_analyze(
+    tool: str,
+    filenames: list[str] | None = None,
+    collection: str | None = None,
+    params: dict[str, Any] | None = None,
+    max_workers: int | None = None,
+    ctx: Context | None = None,
+) -> dict[str, Any]:
+    """Run one per-file analysis tool over many MEI files in parallel.
+
+    CRIM Intervals and music21 are pure Python and hold the GIL, so files are
+    analysed in a pool of worker processes. Progress is reported to the MCP
+    client as each file finishes, and a failing file is recorded in
+    ``errors`` without stopping the rest of the batch. Cancelling the call
+    terminates the worker processes.
+
+    Args:
+        tool: Analysis to run: "analyze_key", "analyze_key_windows",
+            "count_melodic_ngrams", "get_cadences", "get_mei_metadata", or
+            "plot_voice_ranges" (the structured range data only).
+        filenames: MEI filenames to analyse.
+        collection: Collection name from ``list_available_mei_files`` (e.g.,
+            "crim_corpus"). Combined with ``filenames`` when both are given.
+        params: Keyword arguments passed to the tool for every file, such as
+            ``{"n": 5, "engine": "numpy"}`` for ``count_melodic_ngrams``.
+        max_workers: Number of worker processes for this call. Always capped
+            at ``MCP_BATCH_WORKERS`` (the CPU count, at most 8, by default),
+            which also limits the workers of all concurrent batches together,
+            and at the number of files.
+        ctx: MCP context used for progress notifications.
+
+    Returns:
+        Dictionary containing:
+        - tool: The tool that was run
+        - params: The keyword arguments passed to the tool
+        - file_count: Number of files analysed
+        - succeeded: Number of files analysed without error
+        - results: Tool result per filename, in request order
+        - errors: Error message per filename that failed
+    """
+    global _ACTIVE_BATCHES
+    params = _validate_params(tool, params)
+    selected = _batch_filenames(filenames, collection)
+    if max_workers is None:
+        max_workers = _MAX_DEFAULT_WORKERS
+    if max_workers < 1:
+        raise ValueError("max_workers must be at least 1")
+    pool = _batch_pool()
+    max_workers = min(max_workers, pool.max_workers, len(selected))
+    limit = asyncio.Semaphore(max_workers)
+
+    async def run_item(filename: str) -> tuple[bool, Any]:
+        async with limit:
+            try:
+                return await pool.run(
+                    _run_batch_item,
+                    {"tool": tool, "filename": filename, "params": params},
+                )
+            except RuntimeError as exc:
+                # The worker died outright (e.g., killed for memory); it is
+                # replaced for the remaining files.
+                return False, f"{type(exc).__name__}: {exc}"
+
+    outcomes: dict[str, tuple[bool, Any]] = {}
+    pending = {
+        asyncio.ensure_future(run_item(filename)): filename for filename in selected
+    }
+    _ACTIVE_BATCHES += 1
+    try:
+        if ctx is not None:
+            await ctx.report_progress(0, len(selected), f"Running {tool}")
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                filename = pending.pop(future)
+                outcomes[filename] = future.result()
+                if ctx is not None:
+                    await ctx.report_progress(
+                        len(outcomes), len(selected), f"Finished {filename}"
+                    )
+    finally:
+        # Cancelling a running item kills its worker, so a cancelled or
+        # failed batch does not leave files being analysed.
+        for future in pending:
+            future.cancel()
+        if pending:
+            await asyncio.wait(pending)
+        _ACTIVE_BATCHES -= 1
+        if not _ACTIVE_BATCHES:
+            # Idle workers hold a parsed-score cache each; free them between
+            # batches rather than for the life of the server.
+            pool.stop_idle()
+
+    results = {
+        filename: outcomes[filename][1]
+        for filename in selected
+        if outcomes[filename][0]
+    }
+    errors = {
+        filename: outcomes[filename][1]
+        for filename in selected
+        if not outcomes[filename][0]
+    }
+    return {
+        "tool": tool,
+        "params": params,
+        "file_count": len(selected),
+        "succeeded": len(results),
+        "results": results,
+        "errors": errors,
+    }
@@ -0,0 +1,1049 @@
+"""Persistent corpus-wide suffix array over melodic interval sequences.
+
+Each index covers one interval configuration (``kind``, ``combine_unisons``,
+``compound``) and concatenates the integer-coded interval sequence of every
+part of the bundled corpus and any registered uploads. Rests and part ends
+become separator tokens that never match anything, so no match spans them,
+just as CRIM's n-grams never include a rest. A suffix array and its LCP array
+over that text answer exact lookups of any length in O(m log N), enumerate
+repeated passages of every length at once, and supply the candidates that
+approximate searches verify with a bit-parallel edit-distance scan. Interval sequences come from the
+native n-gram engine, which produces the same intervals as CRIM. Indexes are
+written to disk and refreshed per file when a score is added, removed, or
+changed. Each index file is named by a digest of the index version, the
+package and library versions, and the name and content of every indexed file,
+so an upgrade or an edited score never reuses a stale index.
+"""
+
+import bisect
+import hashlib
+import json
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Lock
+from typing import Any
+from xml.etree.ElementTree import ParseError
+
+import numpy as np
+import pandas as pd
+
+from .artifact_store import code_versions, content_hash
+from .helpers import get_mei_collections, get_mei_filepath
+from .intervals import (
+    _load_score_index,
+    _normalise_pattern,
+    _resolve_ngram_cell_matches,
+)
+from .ngram_engine import (
+    REST_CODE,
+    _normalise_kind,
+    load_melodic_score,
+    melodic_part_intervals,
+)
+
+__all__ = [
+    "MelodicSuffixIndex",
+    "find_repeated_melodic_passages",
+    "get_melodic_suffix_index",
+    "search_melodic_pattern",
+    "search_similar_melodic_patterns",
+]
+
+_INDEX_VERSION = 3
+_DIGEST_CHARS = 32
+_INDEX_LOCK = Lock()
+_INDEXES: dict[tuple[str, bool | None, bool], tuple[str, "MelodicSuffixIndex"]] = {}
+
+_REPEAT_SORTS = ("length", "count")
+
+
+def _index_dir() -> Path:
+    """Return the directory for persisted indexes (``MCP_INDEX_DIR``)."""
+    default = Path(tempfile.gettempdir()) / "encoding_music_mcp_index"
+    return Path(os.environ.get("MCP_INDEX_DIR", str(default)))
+
+
+def _index_stem(kind: str, combine_unisons: bool | None, compound: bool) -> str:
+    """Return the file name prefix shared by every index of one configuration."""
+    unisons = {None: "default", True: "combined", False: "separate"}[combine_unisons]
+    return f"melodic_suffix_{kind}_{unisons}{'_compound' if compound else ''}"
+
+
+def _corpus_digest(fingerprints: dict[str, tuple[str, int, int]]) -> str:
+    """Return a digest of the index version, code versions, and corpus contents."""
+    record = {
+        "index": _INDEX_VERSION,
+        "versions": code_versions(("numpy",)),
+        "files": {
+            filename: content_hash(Path(path))
+            for filename, (path, _, _) in fingerprints.items()
+        },
+    }
+    payload = json.dumps(record, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _index_files(stem: str) -> list[Path]:
+    """Return the persisted indexes of one configuration, newest first."""
+    files = []
+    for path in _index_dir().glob(f"{stem}_{'?' * _DIGEST_CHARS}.npz"):
+        try:
+            files.append((path.stat().st_mtime_ns, path))
+        except FileNotFoundError:
+            continue
+    return [path for _, path in sorted(files, reverse=True)]
+
+
+def _latest_index(
+    stem: str, kind: str, combine_unisons: bool | None, compound: bool
+) -> "MelodicSuffixIndex | None":
+    """Return the newest persisted index of a configuration, whatever its digest.
+
+    An index of an older corpus still saves re-analysing its unchanged files.
+    """
+    for path in _index_files(stem):
+        index = MelodicSuffixIndex.load(path, kind, combine_unisons, compound)
+        if index is not None:
+            return index
+    return None
+
+
+def _corpus_files() -> dict[str, tuple[str, int, int]]:
+    """Return the (path, mtime, size) fingerprint of every available file."""
+    fingerprints: dict[str, tuple[str, int, int]] = {}
+    for filename in get_mei_collections()["all_files"]:
+        filepath = get_mei_filepath(filename)
+        try:
+            stat = filepath.stat()
+        except FileNotFoundError:
+            continue
+        fingerprints[filename] = (
+            str(filepath.resolve()),
+            stat.st_mtime_ns,
+            stat.st_size,
+        )
+    return fingerprints
+
+
+def _suffix_tokens(text: np.ndarray, label_count: int) -> np.ndarray:
+    """Replace each separator with a distinct token above every label code."""
+    separators = text == REST_CODE
+    tokens = text.astype(np.int64)
+    tokens[separators] = label_count + np.arange(int(separators.sum()))
+    return tokens
+
+
+def _suffix_array(tokens: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Build the suffix array and LCP array of a token sequence.
+
+    Suffixes are sorted by prefix doubling. The rank arrays of every doubling
+    step are kept so the LCP of adjacent suffixes can be found by binary
+    lifting, all with whole-array NumPy operations.
+    """
+    length = len(tokens)
+    if length == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int32)
+
+    rank = np.unique(tokens, return_inverse=True)[1].reshape(-1).astype(np.int64)
+    ranks = [rank]
+    order = np.argsort(rank, kind="stable")
+    span = 1
+    while rank[order[-1]] < length - 1:
+        following = np.full(length, -1, dtype=np.int64)
+        following[: length - span] = rank[span:]
+        keys = rank * (length + 1) + following + 1
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        rank = np.empty(length, dtype=np.int64)
+        rank[order] = np.concatenate(
+            ([0], np.cumsum(sorted_keys[1:] != sorted_keys[:-1]))
+        )
+        ranks.append(rank)
+        span *= 2
+
+    # ranks[level] compares prefixes of length 2**level. The top level is
+    # unique, so every LCP is below 2**(len(ranks) - 1).
+    left, right = order[:-1], order[1:]
+    lcp = np.zeros(length - 1, dtype=np.int64)
+    for level in range(len(ranks) - 2, -1, -1):
+        left_at, right_at = left + lcp, right + lcp
+        inside = np.flatnonzero(np.maximum(left_at, right_at) < length)
+        equal = ranks[level][left_at[inside]] == ranks[level][right_at[inside]]
+        lcp[inside[equal]] += 1 << level
+    return order, np.concatenate(([0], lcp)).astype(np.int32)
+
+
+@dataclass
+class MelodicSuffixIndex:
+    """Suffix array over the melodic interval sequences of the corpus.
+
+    ``text`` holds one label code per interval, with ``REST_CODE`` for
+    intervals touching a rest and after the last interval of every part. The
+    per-position arrays describe the interval starting at each text position.
+
+    Attributes:
+        kind: Interval kind.
+        combine_unisons: Unison handling, as passed to the n-gram tools.
+        compound: Whether compound intervals are kept.
+        filenames: Indexed filenames.
+        fingerprints: ``(path, mtime_ns, size)`` of each file when indexed.
+        labels: Interval labels indexed by code.
+        text: Concatenated interval codes of every part.
+        file_starts: Text offset of each file, plus the total length.
+        file_idx: Index into ``filenames`` of each position.
+        part: Part label of each position.
+        measure: Measure of each position's first note.
+        beat: Beat of each position's first note.
+        offset: Offset in quarter notes of each position's first note.
+        suffix_array: Text positions in lexicographic order of their suffixes.
+        lcp: Longest common prefix of each suffix with the previous one.
+    """
+
+    kind: str
+    combine_unisons: bool | None
+    compound: bool
+    filenames: list[str]
+    fingerprints: list[tuple[str, int, int]]
+    labels: np.ndarray
+    text: np.ndarray
+    file_starts: np.ndarray
+    file_idx: np.ndarray
+    part: np.ndarray
+    measure: np.ndarray
+    beat: np.ndarray
+    offset: np.ndarray
+    suffix_array: np.ndarray
+    lcp: np.ndarray
+
+    def __post_init__(self) -> None:
+        self._label_codes = {label: code for code, label in enumerate(self.labels)}
+        self._tokens = _suffix_tokens(self.text, len(self.labels))
+        self._separators = np.flatnonzero(self.text == REST_CODE)
+
+    def values(self, position: int, length: int) -> list[str]:
+        """Return the interval labels of ``length`` positions from ``position``."""
+        return self.labels[self.text[position : position + length]].tolist()
+
+    def find(self, pattern_values: list[str]) -> np.ndarray:
+        """Return the text positions where a pattern occurs.
+
+        Positions are ordered by file, offset, and part, the row-major order of
+        CRIM's n-gram frames. The lookup is two binary searches over the
+        suffix array, each comparing at most ``len(pattern_values)`` tokens.
+        """
+        codes = [self._label_codes.get(value) for value in pattern_values]
+        if not codes or None in codes:
+            return np.zeros(0, dtype=np.int64)
+        target = tuple(codes)
+        width = len(target)
+
+        def prefix(rank: int) -> tuple[int, ...]:
+            position = int(self.suffix_array[rank])
+            return tuple(self._tokens[position : position + width].tolist())
+
+        ranks = range(len(self.suffix_array))
+        low = bisect.bisect_left(ranks, target, key=prefix)
+        high = bisect.bisect_right(ranks, target, lo=low, key=prefix)
+        positions = self.suffix_array[low:high]
+        order = np.lexsort(
+            (self.part[positions], self.offset[positions], self.file_idx[positions])
+        )
+        return positions[order]
+
+    def find_similar(
+        self, pattern_values: list[str], max_distance: int, searched: np.ndarray
+    ) -> list[tuple[int, int, int]]:
+        """Return ``(start, length, distance)`` of matches within an edit distance.
+
+        Candidates come from a partition filter: any match with at most
+        ``max_distance`` edits contains one of ``max_distance + 1`` disjoint
+        pieces of the pattern exactly, so only the text around suffix-array
+        hits of those pieces is verified, with Myers' bit-parallel scan.
+        Each match ends where the distance along the text is locally minimal.
+
+        Args:
+            pattern_values: Interval labels to search for.
+            max_distance: Maximum number of substituted, inserted, or deleted
+                intervals, below ``len(pattern_values)``.
+            searched: Boolean mask over ``filenames``.
+        """
+        width = len(pattern_values)
+        codes = [self._label_codes.get(value, -1) for value in pattern_values]
+        windows = []
+        for piece_start, piece in _pattern_pieces(pattern_values, max_distance + 1):
+            hits = self.find(piece)
+            hits = hits[searched[self.file_idx[hits]]]
+            # Matches never cross a separator, so clip windows to the segment.
+            following = np.searchsorted(self._separators, hits)
+            segment_start = np.where(
+                following > 0, self._separators[following - 1] + 1, 0
+            )
+            start = np.maximum(hits - piece_start - max_distance, segment_start)
+            stop = np.minimum(
+                hits - piece_start + width + max_distance, self._separators[following]
+            )
+            windows.append(np.stack((start, stop), axis=1))
+
+        matches = []
+        for start, stop in _merge_windows(np.concatenate(windows)):
+            tokens = self._tokens[start:stop]
+            distances = _myers_distances(codes, tokens.tolist())
+            # Report each end where the distance reaches a local minimum, so a
+            # match is not repeated with one interval more or less at its end.
+            padded = np.concatenate(([width + 1], distances, [width + 1]))
+            ends = np.flatnonzero(
+                (distances <= max_distance)
+                & (distances < padded[:-2])
+                & (distances <= padded[2:])
+            )
+            for end in ends.tolist():
+                distance = int(distances[end])
+                region_start = max(end + 1 - width - max_distance, 0)
+                length = _alignment_length(
+                    codes, tokens[region_start : end + 1].tolist(), distance
+                )
+                matches.append((start + end + 1 - length, length, distance))
+        return sorted(set(matches))
+
+    def repeats(
+        self, min_length: int, searched: np.ndarray
+    ) -> list[tuple[int, int, int]]:
+        """Return the maximal repeats within the searched files.
+
+        A maximal repeat cannot be extended left or right without losing an
+        occurrence. Each repeat is reported once as ``(length, position,
+        count)`` where ``position`` is one occurrence in ``text``.
+
+        Args:
+            min_length: Shortest repeat length, in intervals.
+            searched: Boolean mask over ``filenames``.
+        """
+        kept = np.flatnonzero(
+            searched[self.file_idx[self.suffix_array]]
+            & (self.text[self.suffix_array] != REST_CODE)
+        )
+        if len(kept) < 2:
+            return []
+        suffixes = self.suffix_array[kept]
+        # The LCP of consecutive kept suffixes is the minimum over those skipped.
+        lcp = np.concatenate(
+            ([0], np.minimum.reduceat(self.lcp[: kept[-1] + 1], kept[:-1] + 1))
+        )
+        previous = np.where(suffixes > 0, self._tokens[suffixes - 1], -1)
+        left_changes = np.concatenate(([0], np.cumsum(previous[1:] != previous[:-1])))
+
+        repeats = []
+        for start, stop in _runs(lcp >= min_length):
+            # Enumerate the LCP intervals within one run of shared prefixes.
+            stack: list[tuple[int, int]] = []
+            for rank in range(start, stop + 1):
+                value = int(lcp[rank]) if rank < stop else 0
+                lower = rank - 1
+                while stack and value < stack[-1][0]:
+                    length, lower = stack.pop()
+                    # Occurrences all preceded by the same interval extend left.
+                    if left_changes[rank - 1] != left_changes[lower]:
+                        repeats.append((length, int(suffixes[lower]), rank - lower))
+                if value >= min_length and (not stack or value > stack[-1][0]):
+                    stack.append((value, lower))
+        return repeats
+
+    @classmethod
+    def build(
+        cls,
+        kind: str,
+        combine_unisons: bool | None,
+        compound: bool,
+        fingerprints: dict[str, tuple[str, int, int]],
+        previous: "MelodicSuffixIndex | None" = None,
+    ) -> "MelodicSuffixIndex":
+        """Build an index, reusing the sequences of unchanged files from ``previous``."""
+        filenames = sorted(fingerprints)
+        reused: dict[str, tuple[np.ndarray, ...]] = {}
+        if previous is not None:
+            for index, filename in enumerate(previous.filenames):
+                if fingerprints.get(filename) == previous.fingerprints[index]:
+                    reused[filename] = previous._file_block(index)
+
+        blocks = [
+            reused.get(filename)
+            or _file_intervals(
+                Path(fingerprints[filename][0]), kind, combine_unisons, compound
+            )
+            for filename in filenames
+        ]
+
+        # Re-code every file against one shared, sorted label vocabulary.
+        labels = np.unique(
+            np.concatenate([np.zeros(0, dtype=str)] + [block[0] for block in blocks])
+        )
+        texts = []
+        for block_labels, text, *_ in blocks:
+            codes = np.append(np.searchsorted(labels, block_labels), REST_CODE)
+            texts.append(codes[np.where(text == REST_CODE, -1, text)])
+        lengths = [len(text) for text in texts]
+        text = np.concatenate([np.zeros(0, dtype=np.int32), *texts]).astype(np.int32)
+        part, measure, beat, offset = (
+            np.concatenate([np.zeros(0, dtype=dtype)] + [block[i] for block in blocks])
+            for i, dtype in zip(range(2, 6), ("i2", "i4", "f8", "f8"), strict=True)
+        )
+        suffix_array, lcp = _suffix_array(_suffix_tokens(text, len(labels)))
+        return cls(
+            kind=kind,
+            combine_unisons=combine_unisons,
+            compound=compound,
+            filenames=filenames,
+            fingerprints=[fingerprints[filename] for filename in filenames],
+            labels=labels,
+            text=text,
+            file_starts=np.concatenate(([0], np.cumsum(lengths))).astype(np.int64),
+            file_idx=np.repeat(np.arange(len(filenames)), lengths).astype(np.int32),
+            part=part.astype(np.int16),
+            measure=measure.astype(np.int32),
+            beat=beat.astype(np.float64),
+            offset=offset.astype(np.float64),
+            suffix_array=suffix_array.astype(np.int64),
+            lcp=lcp,
+        )
+
+    def _file_block(self, file_number: int) -> tuple[np.ndarray, ...]:
+        """Return one file's (labels, text, part, measure, beat, offset)."""
+        start, stop = self.file_starts[file_number], self.file_starts[file_number + 1]
+        return (
+            self.labels,
+            self.text[start:stop],
+            self.part[start:stop],
+            self.measure[start:stop],
+            self.beat[start:stop],
+            self.offset[start:stop],
+        )
+
+    def save(self, path: Path) -> None:
+        """Write the index atomically so concurrent readers never see a partial file."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        handle, temp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(handle, "wb") as temp_file:
+                np.savez(
+                    temp_file,
+                    filenames=np.array(self.filenames, dtype=str),
+                    paths=np.array(
+                        [path_ for path_, _, _ in self.fingerprints], dtype=str
+                    ),
+                    stats=np.array(
+                        [stat for _, *stat in self.fingerprints], dtype=np.int64
+                    ).reshape(-1, 2),
+                    labels=self.labels.astype(str),
+                    text=self.text,
+                    file_starts=self.file_starts,
+                    part=self.part,
+                    measure=self.measure,
+                    beat=self.beat,
+                    offset=self.offset,
+                    suffix_array=self.suffix_array,
+                    lcp=self.lcp,
+                )
+            os.replace(temp_name, path)
+        except BaseException:
+            Path(temp_name).unlink(missing_ok=True)
+            raise
+
+    @classmethod
+    def load(
+        cls, path: Path, kind: str, combine_unisons: bool | None, compound: bool
+    ) -> "MelodicSuffixIndex | None":
+        """Read a persisted index, or return ``None`` if it is missing or unreadable."""
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                arrays = {key: data[key] for key in data.files}
+        except (FileNotFoundError, OSError, ValueError, KeyError):
+            return None
+        try:
+            file_starts = arrays["file_starts"]
+            return cls(
+                kind=kind,
+                combine_unisons=combine_unisons,
+                compound=compound,
+                filenames=arrays["filenames"].tolist(),
+                fingerprints=[
+                    (str(path_), int(mtime), int(size))
+                    for path_, (mtime, size) in zip(
+                        arrays["paths"].tolist(), arrays["stats"].tolist(), strict=True
+                    )
+                ],
+                labels=arrays["labels"],
+                text=arrays["text"],
+                file_starts=file_starts,
+                file_idx=np.repeat(
+                    np.arange(len(file_starts) - 1), np.diff(file_starts)
+                ).astype(np.int32),
+                part=arrays["part"],
+                measure=arrays["measure"],
+                beat=arrays["beat"],
+                offset=arrays["offset"],
+                suffix_array=arrays["suffix_array"],
+                lcp=arrays["lcp"],
+            )
+        except (KeyError, ValueError):
+            return None
+
+
+def _pattern_pieces(
+    pattern_values: list[str], count: int
+) -> list[tuple[int, list[str]]]:
+    """Split a pattern into ``count`` near-equal pieces with their offsets."""
+    bounds = np.linspace(0, len(pattern_values), count + 1).round().astype(int)
+    return [
+        (int(start), pattern_values[start:stop])
+        for start, stop in zip(bounds[:-1].tolist(), bounds[1:].tolist(), strict=True)
+    ]
+
+
+def _merge_windows(windows: np.ndarray) -> list[tuple[int, int]]:
+    """Merge overlapping ``(start, stop)`` windows."""
+    if not len(windows):
+        return []
+    windows = windows[np.argsort(windows[:, 0], kind="stable")]
+    reach = np.maximum.accumulate(windows[:, 1])
+    new_group = np.concatenate(([True], windows[1:, 0] >= reach[:-1]))
+    starts = windows[new_group, 0]
+    stops = reach[np.concatenate((np.flatnonzero(new_group)[1:] - 1, [-1]))]
+    return list(zip(starts.tolist(), stops.tolist(), strict=True))
+
+
+def _myers_distances(codes: list[int], tokens: list[int]) -> np.ndarray:
+    """Return the best edit distance of ``codes`` ending at each token.
+
+    Myers' bit-parallel algorithm keeps one column of the edit-distance
+    matrix as vertical delta bit-vectors, so each token costs a handful of
+    integer operations regardless of the pattern length. Codes below zero
+    match nothing.
+    """
+    width = len(codes)
+    mask = (1 << width) - 1
+    high = 1 << (width - 1)
+    match_masks: dict[int, int] = {}
+    for bit, code in enumerate(codes):
+        if code >= 0:
+            match_masks[code] = match_masks.get(code, 0) | (1 << bit)
+
+    positive, negative, score = mask, 0, width
+    distances = np.empty(len(tokens), dtype=np.int64)
+    for position, token in enumerate(tokens):
+        equal = match_masks.get(token, 0)
+        vertical = equal | negative
+        horizontal = ((((equal & positive) + positive) & mask) ^ positive) | equal
+        horizontal_positive = negative | (~(horizontal | positive) & mask)
+        horizontal_negative = positive & horizontal
+        if horizontal_positive & high:
+            score += 1
+        elif horizontal_negative & high:
+            score -= 1
+        horizontal_positive = (horizontal_positive << 1) & mask
+        horizontal_negative = (horizontal_negative << 1) & mask
+        positive = horizontal_negative | (~(vertical | horizontal_positive) & mask)
+        negative = horizontal_positive & vertical
+        distances[position] = score
+    return distances
+
+
+def _alignment_length(codes: list[int], region: list[int], distance: int) -> int:
+    """Return the length of the match of ``codes`` ending at the end of ``region``.
+
+    Among alignments with the given distance, the one whose length is closest
+    to the pattern's is chosen.
+    """
+    pattern, text = codes[::-1], region[::-1]
+    row = list(range(len(text) + 1))
+    for index, code in enumerate(pattern, start=1):
+        previous, row = row, [index]
+        for column, token in enumerate(text, start=1):
+            row.append(
+                min(
+                    previous[column] + 1,
+                    row[column - 1] + 1,
+                    previous[column - 1] + (code != token),
+                )
+            )
+    candidates = [length for length, cost in enumerate(row) if cost == distance]
+    return min(candidates, key=lambda length: (abs(length - len(codes)), length))
+
+
+def _runs(mask: np.ndarray) -> list[tuple[int, int]]:
+    """Return ``(first - 1, last + 1)`` around each run of ``True`` values."""
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.astype(np.int8), [0]))))
+    return [(int(start) - 1, int(stop)) for start, stop in edges.reshape(-1, 2)]
+
+
+def _file_intervals(
+    filepath: Path,
+    kind: str,
+    combine_unisons: bool | None,
+    compound: bool,
+) -> tuple[np.ndarray, ...]:
+    """Return (labels, text, part, measure, beat, offset) for one file.
+
+    The interval codes of every part are followed by a ``REST_CODE``
+    separator.
+    """
+    try:
+        melodic_score = load_melodic_score(filepath)
+    except (ParseError, ValueError):
+        # Unreadable scores stay in the index with no intervals, so they are
+        # not re-parsed on every refresh.
+        melodic_score = None
+    parts, labels = (
+        melodic_part_intervals(melodic_score, kind, combine_unisons, compound)
+        if melodic_score is not None
+        else ({}, [])
+    )
+
+    code_blocks, part_blocks, offset_blocks = [], [], []
+    for part_label, (offsets, codes) in parts.items():
+        code_blocks.append(np.append(codes, REST_CODE))
+        part_blocks.append(np.full(len(codes) + 1, int(part_label), dtype=np.int16))
+        offset_blocks.append(np.append(offsets, offsets[-1] if len(offsets) else 0.0))
+
+    if not code_blocks:
+        return (
+            np.zeros(0, dtype=str),
+            np.zeros(0, dtype=np.int64),
+            np.zeros(0, dtype=np.int16),
+            np.zeros(0, dtype=np.int32),
+            np.zeros(0, dtype=np.float64),
+            np.zeros(0, dtype=np.float64),
+        )
+    offsets = np.concatenate(offset_blocks)
+    measures, beats = melodic_score.locations(offsets)
+    return (
+        np.array(labels, dtype=str),
+        np.concatenate(code_blocks),
+        np.concatenate(part_blocks),
+        measures.astype(np.int32),
+        beats,
+        offsets,
+    )
+
+
+def get_melodic_suffix_index(
+    kind: str = "d",
+    combine_unisons: bool | None = None,
+    compound: bool = False,
+) -> MelodicSuffixIndex:
+    """Return an up-to-date corpus index, building or refreshing it as needed.
+
+    The in-memory index is checked against a digest of the current files on
+    every call. Only added or modified files are re-analysed before the suffix
+    array is rebuilt, and the refreshed index is written back to disk in place
+    of the older one.
+    """
+    kind = _normalise_kind(kind)
+    key = (kind, combine_unisons, compound)
+    fingerprints = _corpus_files()
+    digest = _corpus_digest(fingerprints)
+    stem = _index_stem(kind, combine_unisons, compound)
+    path = _index_dir() / f"{stem}_{digest[:_DIGEST_CHARS]}.npz"
+    with _INDEX_LOCK:
+        cached = _INDEXES.get(key)
+        if cached is not None and cached[0] == digest:
+            return cached[1]
+        index = MelodicSuffixIndex.load(path, kind, combine_unisons, compound)
+        if index is None:
+            previous = (
+                cached[1]
+                if cached is not None
+                else _latest_index(stem, kind, combine_unisons, compound)
+            )
+            index = MelodicSuffixIndex.build(
+                kind, combine_unisons, compound, fingerprints, previous=previous
+            )
+            index.save(path)
+            for stale in _index_files(stem):
+                if stale != path:
+                    stale.unlink(missing_ok=True)
+        _INDEXES[key] = (digest, index)
+    return index
+
+
+def search_melodic_pattern(
+    pattern: str | list[str],
+    kind: str = "d",
+    combine_unisons: bool | None = None,
+    compound: bool = False,
+    filenames: list[str] | None = None,
+    collection: str | None = None,
+    include_note_ids: bool = True,
+    limit: int = 100,
+) -> dict[str, Any]:
+    """Find every occurrence of a melodic interval pattern across the corpus.
+
+    Answers "where else does 2_2_-3_2 occur?" or "find this 11-interval
+    subject" from a persisted suffix array over all built-in and registered
+    MEI files instead of analysing each file. Patterns of any length share one
+    index per configuration, which the first search builds.
+
+    Args:
+        pattern: Interval pattern as "2_2_-3_2", "2, 2, -3, 2", or a list of
+            interval labels in the notation of ``kind``.
+        kind: Interval representation used for melodic intervals.
+        combine_unisons: Whether repeated unisons are combined before interval
+            extraction. ``None`` uses the default CRIM path.
+        compound: Whether to use compound intervals.
+        filenames: Optional filenames to restrict the search to.
+        collection: Optional collection name from ``list_available_mei_files``
+            (e.g. "bach_inventions") to restrict the search to.
+        include_note_ids: Whether to resolve MEI note IDs for returned
+            occurrences.
+        limit: Maximum number of occurrence records to return.
+
+    Returns:
+        Dictionary containing:
+        - pattern: The pattern as a list of interval labels
+        - pattern_string: Underscore-separated pattern key
+        - n: The n-gram length searched
+        - kind: The interval type used
+        - combine_unisons: Whether unisons were combined
+        - compound: Whether compound intervals were used
+        - indexed_files: Number of files covered by the search
+        - total_occurrences: Number of occurrences in the searched files
+        - file_count: Number of files containing the pattern
+        - files: Per-file counts, most frequent first
+        - occurrences: Up to ``limit`` occurrence records, by file and offset
+        - truncated: Whether occurrences were cut off by ``limit``
+    """
+    pattern_values, pattern_string = _normalise_pattern(
+        tuple(pattern) if isinstance(pattern, list) else pattern
+    )
+    if not pattern_values:
+        raise ValueError("pattern must contain at least one interval")
+
+    n = len(pattern_values)
+    index = get_melodic_suffix_index(kind, combine_unisons, compound)
+    searched = _searched_files(index, filenames, collection)
+    positions = index.find(pattern_values)
+    positions = positions[searched[index.file_idx[positions]]]
+
+    shown = positions[: max(limit, 0)]
+    occurrences = _occurrence_records(index, shown, n)
+    if include_note_ids:
+        occurrences = _with_note_ids(occurrences)
+
+    files = _file_counts(index, positions)
+    return {
+        "pattern": pattern_values,
+        "pattern_string": pattern_string,
+        "n": n,
+        "kind": kind,
+        "combine_unisons": combine_unisons,
+        "compound": compound,
+        "indexed_files": int(searched.sum()),
+        "total_occurrences": len(positions),
+        "file_count": len(files),
+        "files": files,
+        "occurrences": occurrences,
+        "truncated": len(positions) > len(shown),
+    }
+
+
+def find_repeated_melodic_passages(
+    min_length: int = 8,
+    sort_by: str = "length",
+    min_count: int = 2,
+    kind: str = "d",
+    combine_unisons: bool | None = None,
+    compound: bool = False,
+    filenames: list[str] | None = None,
+    collection: str | None = None,
+    limit: int = 20,
+    max_occurrences: int = 10,
+    include_note_ids: bool = False,
+) -> dict[str, Any]:
+    """Find the longest or most frequent repeated melodic passages.
+
+    Answers "what is the longest repeated melodic passage in this mass?" or
+    "which long motives recur most often across the inventions?" from the
+    corpus suffix array. Only maximal repeats are reported: passages that
+    cannot be extended by another interval on either side without losing an
+    occurrence, so a long repeat is not also listed as each of its fragments.
+    Repeats never span a rest or a part boundary.
+
+    Args:
+        min_length: Shortest passage to report, in intervals.
+        sort_by: "length" for the longest passages first or "count" for the
+            most frequent first.
+        min_count: Minimum number of occurrences of a reported passage.
+        kind: Interval representation used for melodic intervals.
+        combine_unisons: Whether repeated unisons are combined before interval
+            extraction. ``None`` uses the default CRIM path.
+        compound: Whether to use compound intervals.
+        filenames: Optional filenames to restrict the search to.
+        collection: Optional collection name from ``list_available_mei_files``
+            to restrict the search to.
+        limit: Maximum number of passages to return.
+        max_occurrences: Maximum number of occurrence records per passage.
+        include_note_ids: Whether to resolve MEI note IDs for returned
+            occurrences.
+
+    Returns:
+        Dictionary containing:
+        - min_length: The shortest passage length considered
+        - sort_by: The ranking used
+        - kind: The interval type used
+        - combine_unisons: Whether unisons were combined
+        - compound: Whether compound intervals were used
+        - indexed_files: Number of files covered by the search
+        - total_repeats: Number of maximal repeats found
+        - repeats: Up to ``limit`` passages with pattern, pattern_string,
+          length, count, file_count, files, and occurrences
+        - truncated: Whether repeats were cut off by ``limit``
+    """
+    if min_length < 1:
+        raise ValueError("min_length must be at least 1")
+    if sort_by not in _REPEAT_SORTS:
+        raise ValueError(
+            f"Unknown sort_by {sort_by!r}; expected one of {', '.join(_REPEAT_SORTS)}"
+        )
+
+    index = get_melodic_suffix_index(kind, combine_unisons, compound)
+    searched = _searched_files(index, filenames, collection)
+    repeats = [
+        (length, count, index.values(position, length))
+        for length, position, count in index.repeats(min_length, searched)
+        if count >= min_count
+    ]
+    if sort_by == "length":
+        repeats.sort(key=lambda repeat: (-repeat[0], -repeat[1], "_".join(repeat[2])))
+    else:
+        repeats.sort(key=lambda repeat: (-repeat[1], -repeat[0], "_".join(repeat[2])))
+
+    records = []
+    for length, count, pattern_values in repeats[: max(limit, 0)]:
+        pattern_string = "_".join(pattern_values)
+        positions = index.find(pattern_values)
+        positions = positions[searched[index.file_idx[positions]]]
+        occurrences = _occurrence_records(
+            index, positions[: max(max_occurrences, 0)], length
+        )
+        if include_note_ids:
+            occurrences = _with_note_ids(occurrences)
+        files = _file_counts(index, positions)
+        records.append(
+            {
+                "pattern": pattern_values,
+                "pattern_string": pattern_string,
+                "length": length,
+                "count": count,
+                "file_count": len(files),
+                "files": files,
+                "occurrences": occurrences,
+            }
+        )
+
+    return {
+        "min_length": min_length,
+        "sort_by": sort_by,
+        "kind": kind,
+        "combine_unisons": combine_unisons,
+        "compound": compound,
+        "indexed_files": int(searched.sum()),
+        "total_repeats": len(repeats),
+        "repeats": records,
+        "truncated": len(repeats) > len(records),
+    }
+
+
+def search_similar_melodic_patterns(
+    pattern: str | list[str],
+    max_distance: int = 1,
+    kind: str = "d",
+    combine_unisons: bool | None = None,
+    compound: bool = False,
+    filenames: list[str] | None = None,
+    collection: str | None = None,
+    include_note_ids: bool = True,
+    limit: int = 100,
+) -> dict[str, Any]:
+    """Find near-matches of a melodic interval pattern across the corpus.
+
+    Answers "where is this soggetto quoted with an altered interval or an
+    added passing note?" by finding passages within ``max_distance`` edits
+    (substituted, inserted, or deleted intervals) of the pattern. Candidates
+    come from exact suffix-array lookups of pattern pieces and are verified
+    with a bit-parallel edit-distance scan, so only a small part of the
+    corpus is examined. Matches never span a rest or a part boundary.
+
+    Args:
+        pattern: Interval pattern as "2_2_-3_2", "2, 2, -3, 2", or a list of
+            interval labels in the notation of ``kind``.
+        max_distance: Maximum number of interval edits, below the pattern
+            length.
+        kind: Interval representation used for melodic intervals.
+        combine_unisons: Whether repeated unisons are combined before interval
+            extraction. ``None`` uses the default CRIM path.
+        compound: Whether to use compound intervals.
+        filenames: Optional filenames to restrict the search to.
+        collection: Optional collection name from ``list_available_mei_files``
+            to restrict the search to.
+        include_note_ids: Whether to resolve MEI note IDs for returned matches.
+        limit: Maximum number of match records to return.
+
+    Returns:
+        Dictionary containing:
+        - pattern: The query as a list of interval labels
+        - pattern_string: Underscore-separated query key
+        - max_distance: The largest edit distance allowed
+        - kind: The interval type used
+        - combine_unisons: Whether unisons were combined
+        - compound: Whether compound intervals were used
+        - indexed_files: Number of files covered by the search
+        - total_matches: Number of matches in the searched files
+        - distance_counts: Number of matches at each distance
+        - file_count: Number of files containing a match
+        - files: Per-file match counts, most frequent first
+        - matches: Up to ``limit`` match records, closest first, each with
+          the matched pattern, its distance, and its location
+        - truncated: Whether matches were cut off by ``limit``
+    """
+    pattern_values, pattern_string = _normalise_pattern(
+        tuple(pattern) if isinstance(pattern, list) else pattern
+    )
+    if not pattern_values:
+        raise ValueError("pattern must contain at least one interval")
+    if not 0 <= max_distance < len(pattern_values):
+        raise ValueError(
+            "max_distance must be at least 0 and below the pattern length "
+            f"({len(pattern_values)})"
+        )
+
+    index = get_melodic_suffix_index(kind, combine_unisons, compound)
+    searched = _searched_files(index, filenames, collection)
+    found = np.array(
+        index.find_similar(pattern_values, max_distance, searched), dtype=np.int64
+    ).reshape(-1, 3)
+    starts, lengths, distances = found.T
+    order = np.lexsort(
+        (index.part[starts], index.offset[starts], index.file_idx[starts], distances)
+    )
+    starts, lengths, distances = starts[order], lengths[order], distances[order]
+
+    shown = min(max(limit, 0), len(starts))
+    matches = _occurrence_records(index, starts[:shown], lengths[:shown])
+    for match, distance in zip(matches, distances[:shown].tolist(), strict=True):
+        match["distance"] = distance
+    if include_note_ids:
+        matches = _with_note_ids(matches)
+
+    files = _file_counts(index, starts)
+    return {
+        "pattern": pattern_values,
+        "pattern_string": pattern_string,
+        "max_distance": max_distance,
+        "kind": kind,
+        "combine_unisons": combine_unisons,
+        "compound": compound,
+        "indexed_files": int(searched.sum()),
+        "total_matches": len(starts),
+        "distance_counts": {
+            str(distance): int(count)
+            for distance, count in zip(
+                *np.unique(distances, return_counts=True), strict=True
+            )
+        },
+        "file_count": len(files),
+        "files": files,
+        "matches": matches,
+        "truncated": len(starts) > shown,
+    }
+
+
+def _searched_files(
+    index: MelodicSuffixIndex, filenames: list[str] | None, collection: str | None
+) -> np.ndarray:
+    """Return a mask of the indexed files selected by name or collection."""
+    if filenames is None and collection is None:
+        return np.ones(len(index.filenames), dtype=bool)
+    allowed = {Path(filename).name for filename in filenames or []}
+    if collection is not None:
+        collections = get_mei_collections()
+        if collection not in collections:
+            raise ValueError(
+                f"Unknown collection {collection!r}; expected one of {sorted(collections)}"
+            )
+        allowed.update(collections[collection])
+    return np.array([filename in allowed for filename in index.filenames], dtype=bool)
+
+
+def _file_counts(
+    index: MelodicSuffixIndex, positions: np.ndarray
+) -> list[dict[str, Any]]:
+    """Return per-file occurrence counts, most frequent first."""
+    counts = np.bincount(index.file_idx[positions], minlength=len(index.filenames))
+    return sorted(
+        (
+            {"filename": index.filenames[file_number], "count": int(count)}
+            for file_number, count in enumerate(counts.tolist())
+            if count
+        ),
+        key=lambda record: (-record["count"], record["filename"]),
+    )
+
+
+def _occurrence_records(
+    index: MelodicSuffixIndex,
+    positions: np.ndarray,
+    lengths: int | np.ndarray,
+) -> list[dict[str, Any]]:
+    """Build occurrence records for text spans starting at ``positions``."""
+    records = []
+    for position, length, file_number, part, measure, beat, offset in zip(
+        positions.tolist(),
+        np.broadcast_to(lengths, positions.shape).tolist(),
+        index.file_idx[positions].tolist(),
+        index.part[positions].tolist(),
+        index.measure[positions].tolist(),
+        index.beat[positions].tolist(),
+        index.offset[positions].tolist(),
+        strict=True,
+    ):
+        pattern_values = index.values(position, length)
+        records.append(
+            {
+                "filename": index.filenames[file_number],
+                "pattern": pattern_values,
+                "pattern_string": "_".join(pattern_values),
+                "column": str(part),
+                "start_measure": float(measure),
+                "start_beat": beat,
+                "start_offset": offset,
+            }
+        )
+    return records
+
+
+def _with_note_ids(occurrences: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Resolve note IDs and durations, one score index per file."""
+    groups: dict[tuple[str, int], list[int]] = {}
+    for position, occurrence in enumerate(occurrences):
+        key = (occurrence["filename"], len(occurrence["pattern"]))
+        groups.setdefault(key, []).append(position)
+
+    resolved: list[dict[str, Any]] = list(occurrences)
+    for (filename, n), positions in groups.items():
+        cells = pd.DataFrame(
+            {
+                "measure": [occurrences[i]["start_measure"] for i in positions],
+                "beat": [occurrences[i]["start_beat"] for i in positions],
+                "offset": [occurrences[i]["start_offset"] for i in positions],
+                "column": [occurrences[i]["column"] for i in positions],
+                "match_values": [occurrences[i]["pattern"] for i in positions],
+                "match_string": [occurrences[i]["pattern_string"] for i in positions],
+            }
+        )
+        matches = _resolve_ngram_cell_matches(
+            _load_score_index(get_mei_filepath(filename)), cells, n
+        )
+        for position, match in zip(positions, matches, strict=True):
+            resolved[position] = {**occurrences[position], **match}
+    return resolved
@@ -0,0 +1,425 @@
+"""Imitation and canon detection between the parts of a score.
+
+Each part's melody is placed on a regular grid measured in quarter notes. The
+first note of every melodic interval carries a symbol for that interval and
+the time until the next note, so two parts that imitate each other at a lag
+have many equal symbols that far apart. The symbol indicator sequences of
+every pair of parts are cross-correlated with NumPy's FFT, in O(n log n) per
+pair, and only lags with enough coinciding symbols are scanned for contiguous
+imitative entries.
+"""
+
+from dataclasses import dataclass
+from fractions import Fraction
+from math import gcd
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from .helpers import get_mei_filepath
+from .intervals import ScoreIndex, _load_score_index, _resolve_ngram_cell_matches
+from .ngram_engine import (
+    REST_CODE,
+    MelodicScore,
+    _interval_label,
+    _melodic_events,
+    _normalise_kind,
+    load_melodic_score,
+    melodic_interval_codes,
+)
+
+__all__ = ["detect_imitation"]
+
+# Onsets are snapped to this many grid steps per quarter note at most.
+_MAX_GRID_DIVISIONS = 960
+# Candidate lags scanned together when locating imitative runs.
+_LAG_CHUNK = 256
+
+
+@dataclass(frozen=True)
+class _PartMelody:
+    """Melodic intervals of one part, located on the shared grid.
+
+    Attributes:
+        offsets: Offset in quarter notes of each interval's first note.
+        cells: Grid cell of each interval's first note.
+        codes: Interval label code, or ``REST_CODE`` next to a rest.
+        symbols: Matching symbol combining interval and time to the next
+            note, or ``-1`` next to a rest.
+        diatonic: Diatonic step number of each interval's first note.
+        ps: MIDI pitch of each interval's first note.
+    """
+
+    offsets: np.ndarray
+    cells: np.ndarray
+    codes: np.ndarray
+    symbols: np.ndarray
+    diatonic: np.ndarray
+    ps: np.ndarray
+
+
+def _grid_step(offsets: np.ndarray) -> float:
+    """Return the coarsest grid step, in quarter notes, that holds every onset."""
+    fractions = [
+        Fraction(value).limit_denominator(_MAX_GRID_DIVISIONS)
+        for value in np.unique(offsets).tolist()
+    ]
+    denominator = 1
+    for fraction in fractions:
+        denominator = (
+            denominator * fraction.denominator // gcd(denominator, fraction.denominator)
+        )
+    numerator = 0
+    for fraction in fractions:
+        numerator = gcd(
+            numerator, fraction.numerator * denominator // fraction.denominator
+        )
+    return float(Fraction(numerator or denominator, denominator))
+
+
+def _part_melodies(
+    melodic_score: MelodicScore, kind: str, grid: float | None
+) -> tuple[dict[str, _PartMelody], list[str], float]:
+    """Return every part's intervals on one grid, plus labels and grid step."""
+    vocabulary: dict[str, int] = {}
+    raw = {}
+    for label, voice in melodic_score.voices.items():
+        offset, _, diatonic, ps = _melodic_events(voice, combine_unisons=None)
+        starts, codes, vocabulary = melodic_interval_codes(
+            voice, kind, compound=True, vocabulary=vocabulary
+        )
+        raw[label] = (starts, codes, np.diff(offset), diatonic[:-1], ps[:-1])
+
+    all_offsets = np.concatenate(
+        [np.zeros(1)]
+        + [np.append(starts, starts + gaps) for starts, _, gaps, *_ in raw.values()]
+    )
+    step = float(grid) if grid else _grid_step(all_offsets)
+
+    # One symbol per distinct (interval, time to next note) pair in the score.
+    keys = {
+        label: np.stack((codes, np.rint(gaps / step)), axis=1)
+        for label, (_, codes, gaps, *_) in raw.items()
+    }
+    valid_keys = np.concatenate(
+        [np.zeros((0, 2))] + [key[key[:, 0] != REST_CODE] for key in keys.values()]
+    )
+    unique_keys = np.unique(valid_keys, axis=0)
+    melodies = {}
+    for label, (starts, codes, _, diatonic, ps) in raw.items():
+        symbols = np.full(len(codes), -1, dtype=np.int64)
+        valid = codes != REST_CODE
+        if valid.any():
+            symbols[valid] = _row_positions(unique_keys, keys[label][valid])
+        melodies[label] = _PartMelody(
+            offsets=starts,
+            cells=np.rint(starts / step).astype(np.int64),
+            codes=codes,
+            symbols=symbols,
+            diatonic=diatonic,
+            ps=ps,
+        )
+    return melodies, list(vocabulary), step
+
+
+def _row_positions(sorted_rows: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """Return the index of each row of ``rows`` within unique ``sorted_rows``."""
+    combined = np.concatenate((sorted_rows, rows))
+    _, inverse = np.unique(combined, axis=0, return_inverse=True)
+    return inverse.reshape(-1)[len(sorted_rows) :]
+
+
+def _lag_counts(
+    leader: _PartMelody, follower: _PartMelody, cell_count: int
+) -> np.ndarray:
+    """Return coinciding symbols for every lag via FFT cross-correlation.
+
+    Index ``lag`` of the result counts leader intervals whose symbol recurs in
+    the follower ``lag`` cells later; negative lags wrap to the end.
+    """
+    shared = np.intersect1d(
+        leader.symbols[leader.symbols >= 0], follower.symbols[follower.symbols >= 0]
+    )
+    size = 1 << (2 * cell_count - 1).bit_length()
+    if not len(shared):
+        return np.zeros(size, dtype=np.int64)
+
+    spectra = []
+    for melody in (leader, follower):
+        keep = np.isin(melody.symbols, shared)
+        indicators = np.zeros((len(shared), cell_count))
+        np.add.at(
+            indicators,
+            (np.searchsorted(shared, melody.symbols[keep]), melody.cells[keep]),
+            1.0,
+        )
+        spectra.append(np.fft.rfft(indicators, n=size, axis=1))
+    correlation = np.fft.irfft((np.conj(spectra[0]) * spectra[1]).sum(axis=0), n=size)
+    return np.rint(correlation).astype(np.int64)
+
+
+def _imitative_runs(
+    leader: _PartMelody,
+    follower: _PartMelody,
+    lags: np.ndarray,
+    cell_count: int,
+    min_intervals: int,
+) -> list[tuple[int, int, int, int]]:
+    """Return ``(lag, leader_start, follower_start, length)`` interval runs.
+
+    Every candidate lag is one row of a matched-interval matrix, scanned in
+    chunks to bound memory on long scores.
+    """
+    if not len(leader.cells) or not len(follower.cells):
+        return []
+    follower_at_cell = np.full(cell_count, -1, dtype=np.int64)
+    follower_at_cell[follower.cells] = np.arange(len(follower.cells))
+    runs = []
+    for first in range(0, len(lags), _LAG_CHUNK):
+        chunk = lags[first : first + _LAG_CHUNK]
+        targets = leader.cells[None, :] + chunk[:, None]
+        partners = np.where(
+            targets < cell_count,
+            follower_at_cell[np.minimum(targets, cell_count - 1)],
+            -1,
+        )
+        matched = (
+            (partners >= 0)
+            & (leader.symbols >= 0)
+            & (follower.symbols[np.maximum(partners, 0)] == leader.symbols)
+        )
+        edges = np.diff(np.pad(matched.astype(np.int8), ((0, 0), (1, 1))), axis=1)
+        rows, columns = np.nonzero(edges)
+        starts, stops = columns[0::2], columns[1::2]
+        for row, start, stop in zip(
+            rows[0::2].tolist(), starts.tolist(), stops.tolist(), strict=True
+        ):
+            if stop - start >= min_intervals:
+                runs.append(
+                    (int(chunk[row]), start, int(partners[row, start]), stop - start)
+                )
+    return runs
+
+
+def _note_ids(
+    score_index: ScoreIndex,
+    column: str,
+    starts: list[dict[str, float]],
+    patterns: list[list[str]],
+) -> list[list[str]]:
+    """Resolve the MEI note IDs of imitative spans in one part."""
+    note_ids: list[list[str]] = [[] for _ in starts]
+    by_length: dict[int, list[int]] = {}
+    for position, pattern in enumerate(patterns):
+        by_length.setdefault(len(pattern), []).append(position)
+    for length, positions in by_length.items():
+        cells = pd.DataFrame(
+            {
+                "measure": [starts[i]["measure"] for i in positions],
+                "beat": [starts[i]["beat"] for i in positions],
+                "offset": [starts[i]["offset"] for i in positions],
+                "column": column,
+                "match_values": [patterns[i] for i in positions],
+                "match_string": ["_".join(patterns[i]) for i in positions],
+            }
+        )
+        for position, match in zip(
+            positions,
+            _resolve_ngram_cell_matches(score_index, cells, length),
+            strict=True,
+        ):
+            note_ids[position] = match["note_ids"]
+    return note_ids
+
+
+def detect_imitation(
+    filename: str,
+    min_notes: int = 6,
+    kind: str = "d",
+    max_lag: float | None = None,
+    grid: float | None = None,
+    include_note_ids: bool = True,
+    limit: int = 100,
+) -> dict[str, Any]:
+    """Detect imitative entries and canons between every pair of parts.
+
+    Two parts imitate each other when one repeats a passage of the other,
+    with the same intervals and rhythm, after a time lag and usually at a
+    transposition. Each pair of parts is cross-correlated with an FFT on a
+    regular quarter-note grid to find the lags worth scanning, then runs of
+    at least ``min_notes`` imitated notes are reported with their voices, lag,
+    transposition, and note IDs for highlighting.
+
+    Args:
+        filename: Name of the MEI file (e.g., "Bach_BWV_0772.mei").
+        min_notes: Minimum number of notes in an imitative entry.
+        kind: Interval representation that must match: "d" (diatonic, allows
+            tonal answers), "q" (with quality), "c" (semitones), or "z".
+        max_lag: Optional maximum delay of the follower, in quarter notes.
+        grid: Optional grid step in quarter notes. ``None`` uses the coarsest
+            step that keeps every onset on the grid.
+        include_note_ids: Whether to resolve MEI note IDs for each entry.
+        limit: Maximum number of entries to return.
+
+    Returns:
+        Dictionary containing:
+        - filename: The input filename
+        - kind: The interval type used
+        - min_notes: The minimum entry length used
+        - max_lag: The maximum lag used, if any
+        - grid: The grid step in quarter notes
+        - voice_pairs: Strongest lag and coinciding interval count per pair
+        - entry_count: Number of imitative entries found
+        - entries: Up to ``limit`` entries in order of the leader's start,
+          each with leader, follower, lag, transposition, note_count,
+          pattern, start locations, and note IDs
+        - truncated: Whether entries were cut off by ``limit``
+    """
+    if min_notes < 2:
+        raise ValueError("min_notes must be at least 2")
+    if max_lag is not None and max_lag <= 0:
+        raise ValueError("max_lag must be positive")
+    if grid is not None and grid <= 0:
+        raise ValueError("grid must be positive")
+
+    filepath = get_mei_filepath(filename)
+    melodic_score = load_melodic_score(filepath)
+    interval_kind = _normalise_kind(kind)
+    melodies, labels, step = _part_melodies(melodic_score, interval_kind, grid)
+    cell_count = 1 + max(
+        (int(melody.cells.max()) for melody in melodies.values() if len(melody.cells)),
+        default=0,
+    )
+    max_cells = cell_count - 1 if max_lag is None else int(max_lag / step + 1e-9)
+
+    runs = []
+    voice_pairs = []
+    lags = np.arange(1, min(max_cells, cell_count - 1) + 1)
+    parts = list(melodies)
+    for first_index, first in enumerate(parts):
+        for second in parts[first_index + 1 :]:
+            counts = _lag_counts(melodies[first], melodies[second], cell_count)
+            directions = (
+                (first, second, counts[lags]),
+                (second, first, counts[len(counts) - lags]),
+            )
+            for leader, follower, lag_counts in directions:
+                candidates = lags[lag_counts >= min_notes - 1]
+                runs.extend(
+                    (leader, follower, *run)
+                    for run in _imitative_runs(
+                        melodies[leader],
+                        melodies[follower],
+                        candidates,
+                        cell_count,
+                        min_notes - 1,
+                    )
+                )
+            if len(lags):
+                leader, follower, lag_counts = max(
+                    directions, key=lambda direction: direction[2].max()
+                )
+                peak = int(np.argmax(lag_counts))
+                voice_pairs.append(
+                    {
+                        "leader": leader,
+                        "follower": follower,
+                        "lag": float(lags[peak] * step),
+                        "matched_intervals": int(lag_counts[peak]),
+                    }
+                )
+
+    # A follower passage is explained once, by its longest imitation.
+    runs.sort(key=lambda run: (-run[5], run[2], run[0], run[3]))
+    accepted: list[tuple[str, str, int, int, int, int]] = []
+    for run in runs:
+        leader, follower, _, _, follower_start, length = run
+        if any(
+            kept[0] == leader
+            and kept[1] == follower
+            and follower_start < kept[4] + kept[5]
+            and kept[4] < follower_start + length
+            for kept in accepted
+        ):
+            continue
+        accepted.append(run)
+    accepted.sort(
+        key=lambda run: (
+            float(melodies[run[0]].offsets[run[3]]),
+            float(melodies[run[1]].offsets[run[4]]),
+            run[0],
+            run[1],
+        )
+    )
+
+    entries = []
+    for leader, follower, lag, leader_start, follower_start, length in accepted[
+        : max(limit, 0)
+    ]:
+        leader_melody, follower_melody = melodies[leader], melodies[follower]
+        pattern = [
+            labels[code]
+            for code in leader_melody.codes[
+                leader_start : leader_start + length
+            ].tolist()
+        ]
+        steps = int(
+            follower_melody.diatonic[follower_start]
+            - leader_melody.diatonic[leader_start]
+        )
+        semitones = float(
+            follower_melody.ps[follower_start] - leader_melody.ps[leader_start]
+        )
+        entries.append(
+            {
+                "leader": leader,
+                "follower": follower,
+                "lag": lag * step,
+                "transposition": _interval_label(interval_kind, True, steps, semitones),
+                "transposition_semitones": semitones,
+                "note_count": length + 1,
+                "pattern": pattern,
+                "pattern_string": "_".join(pattern),
+                "leader_offset": float(leader_melody.offsets[leader_start]),
+                "follower_offset": float(follower_melody.offsets[follower_start]),
+            }
+        )
+
+    for role in ("leader", "follower"):
+        offsets = np.array([entry.pop(f"{role}_offset") for entry in entries])
+        measures, beats = melodic_score.locations(offsets)
+        for entry, measure, beat, offset in zip(
+            entries, measures.tolist(), beats.tolist(), offsets.tolist(), strict=True
+        ):
+            entry[f"{role}_start"] = {
+                "measure": measure,
+                "beat": beat,
+                "offset": offset,
+            }
+
+    if include_note_ids:
+        score_index = _load_score_index(filepath)
+        for role in ("leader", "follower"):
+            for column in sorted({entry[role] for entry in entries}):
+                selected = [entry for entry in entries if entry[role] == column]
+                note_ids = _note_ids(
+                    score_index,
+                    column,
+                    [entry[f"{role}_start"] for entry in selected],
+                    [entry["pattern"] for entry in selected],
+                )
+                for entry, ids in zip(selected, note_ids, strict=True):
+                    entry[f"{role}_note_ids"] = ids
+
+    return {
+        "filename": filename,
+        "kind": kind,
+        "min_notes": min_notes,
+        "max_lag": max_lag,
+        "grid": step,
+        "voice_pairs": voice_pairs,
+        "entry_count": len(accepted),
+        "entries": entries,
+        "truncated": len(accepted) > len(entries),
+    }
@@ -1,12 +1,28 @@
 """MEI interval analysis tools using CRIM Intervals."""
 
 import xml.etree.ElementTree as ET
+from collections.abc import Callable
+from dataclasses import dataclass
+from functools import cached_property
 from pathlib import Path
 from typing import Any
 
+import numpy as np
+import pandas as pd
+from crim_intervals import main_objs
 from crim_intervals.main_objs import importScore
 
+from .artifact_store import load_artifact, persistent
 from .helpers import get_mei_filepath
+from .ngram_engine import (
+    REST_CODE,
+    count_ngram_range,
+    load_melodic_score,
+    melodic_interval_sequences,
+    melodic_ngram_frame,
+    validate_engine,
+)
+from .score_cache import get_score_cache
 
 __all__ = [
     "get_notes",
@@ -14,6 +30,7 @@ __all__ = [
     "get_harmonic_intervals",
     "get_melodic_ngrams",
     "count_melodic_ngrams",
+    "count_melodic_ngrams_range",
     "resolve_note_ids_for_highlight",
     "get_melodic_ngram_matches",
     "get_first_occur_melodic_ngrams",
@@ -23,6 +40,14 @@ __all__ = [
 _MEI_NS = {"mei": "http://www.music-encoding.org/ns/mei"}
 _XML_ID = "{http://www.w3.org/XML/1998/namespace}id"
 
+# Parsed music21 scores plus CRIM's cached analyses take roughly 30-80 times
+# the MEI file size in memory; this factor feeds the score cache budget.
+_CRIM_PIECE_SIZE_FACTOR = 40
+# Approximate footprint of one interned note-ID string plus its lookup entry.
+_NOTE_ID_BYTES = 200
+# Libraries whose versions key stored CRIM Intervals DataFrames.
+_CRIM_LIBRARIES = ("crim-intervals", "music21", "pandas")
+
 
 def _get_staff_ppq(root: ET.Element) -> dict[str, int]:
     """Return ppq values for each staff number, inheriting score-level ppq."""
@@ -95,17 +120,78 @@ def _iter_layer_events(
     return events
 
 
-def _build_part_note_events(filepath: Path) -> dict[str, list[dict[str, Any]]]:
-    """Parse MEI and return sounded-note events for each CRIM part number."""
-    root = ET.parse(filepath).getroot()
-    staff_ppq = _get_staff_ppq(root)
+@dataclass(frozen=True)
+class PartNoteEvents:
+    """Columnar sounded-note events for one CRIM part.
 
+    Events are stored in onset order. Event ``i`` owns the interned note IDs
+    ``note_id_codes[note_id_offsets[i]:note_id_offsets[i + 1]]``, so a chord
+    is one row with several codes. ``measure``, ``beat``, and ``offset_key``
+    hold values rounded to five decimals, matching CRIM location keys, while
+    ``offset`` and ``duration`` keep exact quarter-note values.
+    """
+
+    measure: np.ndarray
+    beat: np.ndarray
+    offset: np.ndarray
+    offset_key: np.ndarray
+    duration: np.ndarray
+    note_id_offsets: np.ndarray
+    note_id_codes: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.offset)
+
+    @property
+    def end_q(self) -> float:
+        """Return the latest note end in quarter notes, or 0.0 when empty."""
+        if not len(self):
+            return 0.0
+        return float(np.max(self.offset + self.duration))
+
+    @cached_property
+    def measure_beat_index(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return event order sorted by (measure, beat) and the sorted keys.
+
+        Built on first use, since only measure/beat lookups need it.
+        """
+        order = np.lexsort((np.arange(len(self)), self.beat, self.measure))
+        return order, self.measure[order], self.beat[order]
+
+    @property
+    def nbytes(self) -> int:
+        """Return the memory held by the event arrays."""
+        return sum(
+            array.nbytes
+            for array in (
+                self.measure,
+                self.beat,
+                self.offset,
+                self.offset_key,
+                self.duration,
+                self.note_id_offsets,
+                self.note_id_codes,
+            )
+        )
+
+
+def _build_part_note_events(
+    root: ET.Element,
+    staff_ppq: dict[str, int],
+    note_ids: list[str],
+) -> dict[str, PartNoteEvents]:
+    """Return columnar sounded-note events for each CRIM part number.
+
+    Note IDs are interned into ``note_ids``; the returned parts refer to them by
+    position.
+    """
     part_key_to_label: dict[tuple[str, str], str] = {}
-    part_events: dict[str, list[dict[str, Any]]] = {}
+    columns: dict[str, dict[str, list[Any]]] = {}
     global_offsets_ppq: dict[str, int] = {}
 
     for measure in root.findall(".//mei:measure", _MEI_NS):
         measure_n = float(measure.get("n", "0"))
+        measure_key = round(measure_n, 5)
         measure_offsets_ppq: dict[str, int] = {}
 
         for staff in measure.findall("mei:staff", _MEI_NS):
@@ -118,10 +204,18 @@ def _build_part_note_events(filepath: Path) -> dict[str, list[dict[str, Any]]]:
                 if part_key not in part_key_to_label:
                     part_label = str(len(part_key_to_label) + 1)
                     part_key_to_label[part_key] = part_label
-                    part_events[part_label] = []
+                    columns[part_label] = {
+                        "measure": [],
+                        "beat": [],
+                        "offset": [],
+                        "duration": [],
+                        "note_id_offsets": [0],
+                        "note_id_codes": [],
+                    }
                     global_offsets_ppq[part_label] = 0
 
                 part_label = part_key_to_label[part_key]
+                part_columns = columns[part_label]
                 measure_offset_ppq = measure_offsets_ppq.get(part_label, 0)
                 layer_events: list[dict[str, Any]] = []
 
@@ -131,16 +225,19 @@ def _build_part_note_events(filepath: Path) -> dict[str, list[dict[str, Any]]]:
                 for event in layer_events:
                     dur_ppq = event["dur_ppq"]
                     if event["kind"] == "note" and event["note_ids"]:
-                        onset_q = global_offsets_ppq[part_label] / current_ppq
-                        beat = 1 + (measure_offset_ppq / current_ppq)
-                        part_events[part_label].append(
-                            {
-                                "measure": measure_n,
-                                "beat": beat,
-                                "offset": onset_q,
-                                "duration": dur_ppq / current_ppq,
-                                "note_ids": event["note_ids"],
-                            }
+                        part_columns["measure"].append(measure_key)
+                        part_columns["beat"].append(
+                            round(1 + (measure_offset_ppq / current_ppq), 5)
+                        )
+                        part_columns["offset"].append(
+                            global_offsets_ppq[part_label] / current_ppq
+                        )
+                        part_columns["duration"].append(dur_ppq / current_ppq)
+                        for note_id in event["note_ids"]:
+                            part_columns["note_id_codes"].append(len(note_ids))
+                            note_ids.append(note_id)
+                        part_columns["note_id_offsets"].append(
+                            len(part_columns["note_id_codes"])
                         )
 
                     measure_offset_ppq += dur_ppq
@@ -148,25 +245,101 @@ def _build_part_note_events(filepath: Path) -> dict[str, list[dict[str, Any]]]:
 
                 measure_offsets_ppq[part_label] = measure_offset_ppq
 
-    return part_events
-
-
-def _build_note_event_lookup(
-    part_events: dict[str, list[dict[str, Any]]],
-) -> dict[str, dict[tuple[float, float, float], int]]:
-    """Index note events by measure, beat, and offset for each part."""
-    note_lookup: dict[str, dict[tuple[float, float, float], int]] = {}
-    for part_label, events in part_events.items():
-        part_lookup: dict[tuple[float, float, float], int] = {}
-        for idx, event in enumerate(events):
-            key = (
-                round(float(event["measure"]), 5),
-                round(float(event["beat"]), 5),
-                round(float(event["offset"]), 5),
-            )
-            part_lookup[key] = idx
-        note_lookup[part_label] = part_lookup
-    return note_lookup
+    return {
+        part_label: PartNoteEvents(
+            measure=np.array(part_columns["measure"], dtype=np.float64),
+            beat=np.array(part_columns["beat"], dtype=np.float64),
+            offset=np.array(part_columns["offset"], dtype=np.float64),
+            offset_key=np.array(
+                [round(offset, 5) for offset in part_columns["offset"]],
+                dtype=np.float64,
+            ),
+            duration=np.array(part_columns["duration"], dtype=np.float64),
+            note_id_offsets=np.array(part_columns["note_id_offsets"], dtype=np.int32),
+            note_id_codes=np.array(part_columns["note_id_codes"], dtype=np.int32),
+        )
+        for part_label, part_columns in columns.items()
+    }
+
+
+@dataclass(frozen=True)
+class ScoreIndex:
+    """Note-event tables derived from one parse of an MEI file.
+
+    Attributes:
+        staff_ppq: Pulses per quarter note for each staff number.
+        parts: Columnar sounded-note events for each CRIM part label.
+        note_ids: Interned MEI ``xml:id`` table referenced by the parts.
+        note_id_events: Part label and event index for each ``xml:id``.
+    """
+
+    staff_ppq: dict[str, int]
+    parts: dict[str, PartNoteEvents]
+    note_ids: tuple[str, ...]
+    note_id_events: dict[str, tuple[str, int]]
+
+    def event_note_ids(self, part_label: str, event_indices: np.ndarray) -> list[str]:
+        """Return the note IDs owned by the given events, in event order."""
+        part = self.parts[part_label]
+        if not len(event_indices):
+            return []
+        first, last = int(event_indices[0]), int(event_indices[-1])
+        if last - first + 1 == len(event_indices):
+            codes = part.note_id_codes[
+                part.note_id_offsets[first] : part.note_id_offsets[last + 1]
+            ]
+            return [self.note_ids[code] for code in codes.tolist()]
+        starts = part.note_id_offsets[event_indices]
+        lengths = part.note_id_offsets[event_indices + 1] - starts
+        # Expand each event's [start, start + length) slice of the CSR table.
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        positions += np.arange(int(lengths.sum()))
+        return [self.note_ids[code] for code in part.note_id_codes[positions].tolist()]
+
+
+def _build_score_index(filepath: Path) -> ScoreIndex:
+    """Parse an MEI file once and build every note-event table from it."""
+    root = ET.parse(filepath).getroot()
+    staff_ppq = _get_staff_ppq(root)
+    note_ids: list[str] = []
+    parts = _build_part_note_events(root, staff_ppq, note_ids)
+
+    note_id_events: dict[str, tuple[str, int]] = {}
+    for part_label, part in parts.items():
+        event_by_position = np.repeat(
+            np.arange(len(part), dtype=np.int32),
+            np.diff(part.note_id_offsets),
+        )
+        for code, event_index in zip(
+            part.note_id_codes.tolist(), event_by_position.tolist(), strict=True
+        ):
+            note_id_events.setdefault(note_ids[code], (part_label, event_index))
+
+    return ScoreIndex(
+        staff_ppq=staff_ppq,
+        parts=parts,
+        note_ids=tuple(note_ids),
+        note_id_events=note_id_events,
+    )
+
+
+def _score_index_size(filepath: Path, score_index: ScoreIndex) -> int:
+    """Estimate the memory held by a score index."""
+    return sum(part.nbytes for part in score_index.parts.values()) + (
+        _NOTE_ID_BYTES * len(score_index.note_ids)
+    )
+
+
+def _load_score_index(filepath: Path) -> ScoreIndex:
+    """Return the cached note-event index for an MEI file."""
+    if not filepath.exists():
+        raise FileNotFoundError(f"MEI file not found: {filepath}")
+    return get_score_cache().get_or_load(
+        "score_index",
+        filepath,
+        persistent("score_index", _build_score_index),
+        size_estimate=_score_index_size,
+    )
 
 
 def _normalise_part_labels(value: Any) -> list[str]:
@@ -206,102 +379,215 @@ def _span_location_key(span: dict[str, Any]) -> tuple[float, float, float] | Non
     return None
 
 
-def _event_starts_in_span(
-    event: dict[str, Any],
+def _first_event_at_offset(part: PartNoteEvents, offset_key: float) -> int | None:
+    """Binary-search the first event whose rounded onset equals ``offset_key``."""
+    idx = int(np.searchsorted(part.offset_key, offset_key, side="left"))
+    if idx < len(part) and part.offset_key[idx] == offset_key:
+        return idx
+    return None
+
+
+def _last_event_at_location(
+    part: PartNoteEvents,
+    location_key: tuple[float, float, float],
+) -> int | None:
+    """Return the last event matching a rounded (measure, beat, offset) key."""
+    measure_key, beat_key, offset_key = location_key
+    lo = int(np.searchsorted(part.offset_key, offset_key, side="left"))
+    hi = int(np.searchsorted(part.offset_key, offset_key, side="right"))
+    for idx in range(hi - 1, lo - 1, -1):
+        if part.measure[idx] == measure_key and part.beat[idx] == beat_key:
+            return idx
+    return None
+
+
+def _events_at_measure_beat(
+    part: PartNoteEvents,
+    measure_key: float,
+    beat_key: float,
+) -> np.ndarray:
+    """Return events at a rounded measure and beat, in onset order."""
+    order, sorted_measure, sorted_beat = part.measure_beat_index
+    lo = int(np.searchsorted(sorted_measure, measure_key, side="left"))
+    hi = int(np.searchsorted(sorted_measure, measure_key, side="right"))
+    beats = sorted_beat[lo:hi]
+    beat_lo = lo + int(np.searchsorted(beats, beat_key, side="left"))
+    beat_hi = lo + int(np.searchsorted(beats, beat_key, side="right"))
+    return order[beat_lo:beat_hi]
+
+
+def _event_run(part: PartNoteEvents, start_idx: int, note_count: Any) -> np.ndarray:
+    """Return ``note_count`` consecutive event indices with slice semantics."""
+    run = range(len(part))[start_idx : start_idx + int(note_count)]
+    return np.arange(run.start, run.stop, run.step)
+
+
+def _span_event_indices(
+    part: PartNoteEvents,
     span: dict[str, Any],
+    location_key: tuple[float, float, float] | None,
     start_q: float | None,
-) -> bool:
-    """Return True when an event onset belongs to a requested highlight span."""
-    event_offset = float(event["offset"])
+) -> np.ndarray:
+    """Return the indices of a part's events selected by a requested span."""
+    note_count = span.get("note_count")
+    if note_count is not None:
+        start_idx = None
+        if location_key is not None:
+            start_idx = _last_event_at_location(part, location_key)
+        if start_idx is None and start_q is not None:
+            start_idx = _first_event_at_offset(part, round(start_q, 5))
+        if start_idx is None and "start_measure" in span and "start_beat" in span:
+            candidates = _events_at_measure_beat(
+                part,
+                round(float(span["start_measure"]), 5),
+                round(float(span["start_beat"]), 5),
+            )
+            if len(candidates):
+                start_idx = int(candidates[0])
+        if start_idx is None:
+            return np.empty(0, dtype=np.intp)
+        return _event_run(part, start_idx, note_count)
+
     if start_q is not None:
-        if round(event_offset, 5) < round(start_q, 5):
-            return False
+        start_key = round(start_q, 5)
         end_q = span.get("end_q", span.get("end_offset"))
         if end_q is None and "duration" in span:
             end_q = start_q + float(span["duration"])
+        lo = int(np.searchsorted(part.offset_key, start_key, side="left"))
         if end_q is None:
-            return round(event_offset, 5) == round(start_q, 5)
-        return round(event_offset, 5) < round(float(end_q), 5)
+            hi = int(np.searchsorted(part.offset_key, start_key, side="right"))
+        else:
+            end_key = round(float(end_q), 5)
+            hi = max(lo, int(np.searchsorted(part.offset_key, end_key, side="left")))
+        return np.arange(lo, hi)
 
     if "start_measure" in span and "start_beat" in span:
-        return (
-            round(float(event["measure"]), 5) == round(float(span["start_measure"]), 5)
-            and round(float(event["beat"]), 5) == round(float(span["start_beat"]), 5)
+        return _events_at_measure_beat(
+            part,
+            round(float(span["start_measure"]), 5),
+            round(float(span["start_beat"]), 5),
         )
 
-    return False
+    return np.empty(0, dtype=np.intp)
 
 
-def _resolve_note_id_spans(
-    filepath: Path,
+def _span_part_labels(score_index: ScoreIndex, span: dict[str, Any]) -> list[str]:
+    """Return the CRIM part labels a span asks for, defaulting to every part."""
+    requested_parts = _normalise_part_labels(
+        span.get("column", span.get("staff", span.get("part", span.get("voice_pair"))))
+    )
+    return [str(label) for label in requested_parts] or list(score_index.parts)
+
+
+def _span_start_q(span: dict[str, Any]) -> float | None:
+    """Return a span's quarter-note start, if it has one."""
+    start_q = span.get("start_q", span.get("start_offset"))
+    return float(start_q) if start_q is not None else None
+
+
+def _resolve_span_events(
+    score_index: ScoreIndex,
+    span: dict[str, Any],
+) -> list[tuple[str, np.ndarray]]:
+    """Return (part label, event indices) for each part a span matches."""
+    location_key = _span_location_key(span)
+    start_q = _span_start_q(span)
+
+    selections: list[tuple[str, np.ndarray]] = []
+    for part_label in _span_part_labels(score_index, span):
+        part = score_index.parts.get(part_label)
+        if part is None or not len(part):
+            continue
+        event_indices = _span_event_indices(part, span, location_key, start_q)
+        if len(event_indices):
+            selections.append((part_label, event_indices))
+    return selections
+
+
+def _resolve_span_events_batch(
+    score_index: ScoreIndex,
     spans: list[dict[str, Any]],
-) -> list[dict[str, Any]]:
-    """Resolve generic measure/beat/offset spans to MEI note IDs."""
-    part_events = _build_part_note_events(filepath)
-    note_lookup = _build_note_event_lookup(part_events)
+) -> list[list[tuple[str, np.ndarray]]]:
+    """Resolve many spans, locating fixed-length runs in one sweep per part.
 
-    resolved_spans: list[dict[str, Any]] = []
-    for index, span in enumerate(spans):
-        requested_parts = _normalise_part_labels(
-            span.get("column", span.get("staff", span.get("part", span.get("voice_pair"))))
-        )
-        part_labels = requested_parts or list(part_events.keys())
-        note_count = span.get("note_count")
-        location_key = _span_location_key(span)
-        start_q = span.get("start_q", span.get("start_offset"))
-        start_q_float = float(start_q) if start_q is not None else None
+    Spans with ``note_count`` and a measure/beat/offset location are grouped
+    by part and located with a single vectorised binary search over the
+    sorted onsets. Every other span shape, and the rare location misses,
+    fall back to :func:`_resolve_span_events`.
+    """
+    results: list[list[tuple[str, np.ndarray]] | None] = [None] * len(spans)
+    batched: list[tuple[int, list[str]]] = []
+    queries: dict[str, tuple[list[int], list[tuple[float, float, float]]]] = {}
 
-        note_ids: list[str] = []
-        matched_parts: list[str] = []
+    for span_index, span in enumerate(spans):
+        location_key = _span_location_key(span)
+        if span.get("note_count") is None or location_key is None:
+            results[span_index] = _resolve_span_events(score_index, span)
+            continue
+        part_labels = _span_part_labels(score_index, span)
+        batched.append((span_index, part_labels))
+        for part_label in part_labels:
+            if part_label in score_index.parts:
+                span_indices, keys = queries.setdefault(part_label, ([], []))
+                span_indices.append(span_index)
+                keys.append(location_key)
+
+    starts: dict[tuple[int, str], int] = {}
+    for part_label, (span_indices, keys) in queries.items():
+        part = score_index.parts[part_label]
+        if not len(part):
+            continue
+        key_array = np.array(keys, dtype=np.float64)
+        lo = np.searchsorted(part.offset_key, key_array[:, 2], side="left")
+        hi = np.searchsorted(part.offset_key, key_array[:, 2], side="right")
+        last = np.clip(hi - 1, 0, len(part) - 1)
+        found = (
+            (hi > lo)
+            & (part.measure[last] == key_array[:, 0])
+            & (part.beat[last] == key_array[:, 1])
+        )
+        for span_index, is_found, start_idx in zip(
+            span_indices, found.tolist(), last.tolist(), strict=True
+        ):
+            if is_found:
+                starts[(span_index, part_label)] = start_idx
+
+    for span_index, part_labels in batched:
+        span = spans[span_index]
+        selections: list[tuple[str, np.ndarray]] = []
         for part_label in part_labels:
-            events = part_events.get(str(part_label), [])
-            if not events:
+            part = score_index.parts.get(part_label)
+            if part is None or not len(part):
                 continue
-
-            part_note_ids: list[str] = []
-            if note_count is not None:
-                start_idx = (
-                    note_lookup.get(str(part_label), {}).get(location_key)
-                    if location_key is not None
-                    else None
-                )
-                if start_idx is None and start_q_float is not None:
-                    start_idx = next(
-                        (
-                            event_index
-                            for event_index, event in enumerate(events)
-                            if round(float(event["offset"]), 5)
-                            == round(start_q_float, 5)
-                        ),
-                        None,
-                    )
-                if (
-                    start_idx is None
-                    and "start_measure" in span
-                    and "start_beat" in span
-                ):
-                    start_idx = next(
-                        (
-                            event_index
-                            for event_index, event in enumerate(events)
-                            if round(float(event["measure"]), 5)
-                            == round(float(span["start_measure"]), 5)
-                            and round(float(event["beat"]), 5)
-                            == round(float(span["start_beat"]), 5)
-                        ),
-                        None,
-                    )
-                if start_idx is not None:
-                    for event in events[start_idx : start_idx + int(note_count)]:
-                        part_note_ids.extend(event["note_ids"])
+            start_idx = starts.get((span_index, part_label))
+            if start_idx is not None:
+                event_indices = _event_run(part, start_idx, span["note_count"])
             else:
-                for event in events:
-                    if _event_starts_in_span(event, span, start_q_float):
-                        part_note_ids.extend(event["note_ids"])
+                event_indices = _span_event_indices(
+                    part, span, _span_location_key(span), _span_start_q(span)
+                )
+            if len(event_indices):
+                selections.append((part_label, event_indices))
+        results[span_index] = selections
+
+    return results
+
 
-            if part_note_ids:
-                matched_parts.append(str(part_label))
-                note_ids.extend(part_note_ids)
+def _resolve_note_id_spans(
+    score_index: ScoreIndex,
+    spans: list[dict[str, Any]],
+) -> list[dict[str, Any]]:
+    """Resolve generic measure/beat/offset spans to MEI note IDs."""
+    resolved_spans: list[dict[str, Any]] = []
+    span_selections = _resolve_span_events_batch(score_index, spans)
+    for index, (span, selections) in enumerate(
+        zip(spans, span_selections, strict=True)
+    ):
+        note_ids: list[str] = []
+        matched_parts: list[str] = []
+        for part_label, event_indices in selections:
+            matched_parts.append(part_label)
+            note_ids.extend(score_index.event_note_ids(part_label, event_indices))
 
         resolved_spans.append(
             {
@@ -315,72 +601,6 @@ def _resolve_note_id_spans(
     return resolved_spans
 
 
-def _build_note_id_matches(
-    filepath: Path, mel_ngrams: Any, n: int
-) -> list[dict[str, Any]]:
-    """Build structured note-id spans for each melodic n-gram match."""
-    matches: list[dict[str, Any]] = []
-
-    for row in mel_ngrams.index:
-        measure, beat, offset = (float(row[0]), float(row[1]), float(row[2]))
-
-        for column in mel_ngrams.columns:
-            pattern = mel_ngrams.loc[row, column]
-            if isinstance(pattern, tuple):
-                pattern_values = list(pattern)
-                pattern_string = "_".join(map(str, pattern))
-            elif isinstance(pattern, str) and pattern.strip():
-                pattern_values = [value.strip() for value in pattern.split(",")]
-                pattern_string = "_".join(pattern_values)
-            else:
-                continue
-
-            part_label = str(column)
-            matches.append(
-                {
-                    "pattern": pattern_values,
-                    "pattern_string": pattern_string,
-                    "column": part_label,
-                    "start_measure": measure,
-                    "start_beat": beat,
-                    "start_offset": offset,
-                    "note_count": n + 1,
-                }
-            )
-
-    resolved_matches = _resolve_note_id_spans(filepath, matches)
-    part_events = _build_part_note_events(filepath)
-    events_by_part_and_note_id = {
-        part_label: {
-            note_id: event
-            for event in events
-            for note_id in event["note_ids"]
-        }
-        for part_label, events in part_events.items()
-    }
-    for match in resolved_matches:
-        match.pop("index", None)
-        match.pop("matched_parts", None)
-        match.pop("note_count", None)
-        note_ids = match["note_ids"]
-        duration = 0.0
-        if note_ids:
-            event_by_note_id = events_by_part_and_note_id.get(match["column"], {})
-            span_events = [event_by_note_id[note_id] for note_id in note_ids if note_id in event_by_note_id]
-            if span_events:
-                first_event = span_events[0]
-                last_event = span_events[-1]
-                duration = (
-                    float(last_event["offset"])
-                    + float(last_event["duration"])
-                    - float(first_event["offset"])
-                )
-        match["duration"] = duration
-        match["end_offset"] = float(match["start_offset"]) + duration
-
-    return resolved_matches
-
-
 def _normalise_pattern(pattern: Any) -> tuple[list[str], str]:
     """Convert a CRIM n-gram cell value into list and underscore-string forms."""
     if isinstance(pattern, tuple):
@@ -406,6 +626,56 @@ def _pattern_to_string(pattern: Any) -> str:
     return pattern_string
 
 
+def _crim_melodic_intervals(
+    piece: Any, kind: str, combine_unisons: bool | None, compound: bool
+) -> Any:
+    """Return CRIM's melodic interval frame for the n-gram tools."""
+    if combine_unisons is None:
+        return piece.melodic(kind=kind, end=False)
+    nr = piece.notes(combineUnisons=combine_unisons)
+    return piece.melodic(
+        df=nr,
+        kind=kind,
+        compound=compound,
+        unit=0,
+        end=False,
+    )
+
+
+def _melodic_interval_sequences(
+    filepath: Path,
+    kind: str,
+    combine_unisons: bool | None,
+    compound: bool,
+    engine: str,
+) -> tuple[list[np.ndarray], list[str]]:
+    """Return per-part integer interval codes and their labels.
+
+    The CRIM engine codes the melodic interval frame CRIM builds n-grams
+    from; like CRIM's n-gram exclusion, any label mentioning a rest is coded
+    as a rest.
+    """
+    if validate_engine(engine) == "numpy":
+        return melodic_interval_sequences(
+            load_melodic_score(filepath),
+            kind=kind,
+            combine_unisons=combine_unisons,
+            compound=compound,
+        )
+
+    mel = _crim_melodic_intervals(
+        _load_piece(filepath), kind, combine_unisons, compound
+    )
+    columns = [mel[column].dropna().astype(str).to_numpy() for column in mel.columns]
+    if not columns:
+        return [], []
+    codes, labels = pd.factorize(np.concatenate(columns))
+    is_rest = np.array(["Rest" in label for label in labels], dtype=bool)
+    codes = np.where(is_rest[codes], REST_CODE, codes) if len(codes) else codes
+    boundaries = np.cumsum([len(column) for column in columns])[:-1]
+    return np.split(codes.astype(np.int64), boundaries), labels.tolist()
+
+
 def _load_melodic_ngram_dataframe(
     filepath: Path,
     n: int,
@@ -413,24 +683,26 @@ def _load_melodic_ngram_dataframe(
     entries: bool,
     combine_unisons: bool | None = None,
     compound: bool = False,
+    engine: str = "crim",
 ) -> Any:
-    """Load and normalise a melodic n-gram dataframe."""
-    piece = importScore(str(filepath))
-    if piece is None:
-        raise FileNotFoundError(f"Could not load MEI file: {filepath}")
+    """Load and normalise a melodic n-gram dataframe.
 
-    if combine_unisons is None:
-        mel = piece.melodic(kind=kind, end=False)
-    else:
-        nr = piece.notes(combineUnisons=combine_unisons)
-        mel = piece.melodic(
-            df=nr,
+    ``engine="numpy"`` builds the same frame from the native MEI note
+    sequences instead of a CRIM piece; it does not support entry filtering.
+    """
+    if validate_engine(engine) == "numpy":
+        if entries:
+            raise ValueError("entries filtering requires engine='crim'")
+        return melodic_ngram_frame(
+            load_melodic_score(filepath),
+            n=n,
             kind=kind,
+            combine_unisons=combine_unisons,
             compound=compound,
-            unit=0,
-            end=False,
         )
 
+    piece = _load_piece(filepath)
+    mel = _crim_melodic_intervals(piece, kind, combine_unisons, compound)
     mel_ngrams = piece.ngrams(df=mel, n=n, offsets="first")
 
     if entries:
@@ -473,40 +745,321 @@ def _group_matches_by_pattern(
     return dict(sorted(grouped.items()))
 
 
-def _count_patterns(mel_ngrams: Any) -> list[dict[str, Any]]:
-    """Count how often each melodic n-gram pattern occurs."""
-    counts: dict[str, int] = {}
-    patterns_by_string: dict[str, list[str]] = {}
+def _match_pattern_form(pattern: Any) -> tuple[list[Any], str] | tuple[None, None]:
+    """Return the pattern list and key used in note-ID match records."""
+    if isinstance(pattern, tuple):
+        return list(pattern), "_".join(map(str, pattern))
+    if isinstance(pattern, str) and pattern.strip():
+        pattern_values = [value.strip() for value in pattern.split(",")]
+        return pattern_values, "_".join(pattern_values)
+    return None, None
+
+
+def _ngram_cells(mel_ngrams: Any) -> pd.DataFrame:
+    """Stack a detail-indexed n-gram frame into one row per non-empty cell.
+
+    Rows keep the frame's row-major order. Each distinct cell value is
+    normalised once and broadcast back to its cells. ``match_values`` and
+    ``match_string`` keep CRIM's values for note-ID match records, while
+    ``count_values`` and ``count_string`` hold the normalised form used for
+    counting; either pair is ``None`` when the cell does not contribute to that
+    view.
+    """
+    values = mel_ngrams.to_numpy(dtype=object)
+    row_count, column_count = values.shape
+    codes, uniques = pd.factorize(values.ravel(), use_na_sentinel=False)
+
+    match_forms = [_match_pattern_form(pattern) for pattern in uniques]
+    count_forms = [_normalise_pattern(pattern) for pattern in uniques]
+    match_strings = np.array([form[1] for form in match_forms], dtype=object)
+    count_strings = np.array([form[1] or None for form in count_forms], dtype=object)
+    keep_unique = np.array(
+        [
+            match_string is not None or count_string is not None
+            for match_string, count_string in zip(
+                match_strings, count_strings, strict=True
+            )
+        ],
+        dtype=bool,
+    )
+    keep = keep_unique[codes] if len(codes) else np.zeros(0, dtype=bool)
+    kept_codes = codes[keep]
+
+    locations = {
+        name: np.repeat(
+            mel_ngrams.index.get_level_values(level).to_numpy(dtype=np.float64),
+            column_count,
+        )[keep]
+        for level, name in enumerate(("measure", "beat", "offset"))
+    }
+    columns = np.tile(
+        np.array([str(column) for column in mel_ngrams.columns], dtype=object),
+        row_count,
+    )[keep]
 
-    for row in mel_ngrams.index:
-        for column in mel_ngrams.columns:
-            pattern_values, pattern_string = _normalise_pattern(mel_ngrams.loc[row, column])
-            if not pattern_string:
-                continue
+    match_values = np.empty(len(uniques), dtype=object)
+    match_values[:] = [form[0] for form in match_forms]
+    count_values = np.empty(len(uniques), dtype=object)
+    count_values[:] = [form[0] if form[1] else None for form in count_forms]
 
-            counts[pattern_string] = counts.get(pattern_string, 0) + 1
-            patterns_by_string.setdefault(pattern_string, pattern_values)
+    return pd.DataFrame(
+        {
+            **locations,
+            "column": columns,
+            "match_values": match_values[kept_codes],
+            "match_string": match_strings[kept_codes],
+            "count_values": count_values[kept_codes],
+            "count_string": count_strings[kept_codes],
+        }
+    )
+
+
+def _count_ngram_cells(cells: pd.DataFrame) -> list[dict[str, Any]]:
+    """Count how often each melodic n-gram pattern occurs."""
+    counted = cells[cells["count_string"].notna()]
+    counts = counted["count_string"].value_counts(sort=False)
+    first_values = counted.drop_duplicates("count_string").set_index("count_string")[
+        "count_values"
+    ]
 
     sorted_patterns = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
     return [
         {
-            "pattern": patterns_by_string[pattern_string],
+            "pattern": list(first_values[pattern_string]),
             "pattern_string": pattern_string,
-            "count": count,
+            "count": int(count),
         }
         for pattern_string, count in sorted_patterns
     ]
 
 
-def _load_piece_with_details(filepath: Path) -> tuple[Any, Any]:
-    """Load a score and its detailed note dataframe."""
-    piece = importScore(str(filepath))
+def _resolve_ngram_cell_matches(
+    score_index: ScoreIndex,
+    cells: pd.DataFrame,
+    n: int,
+) -> list[dict[str, Any]]:
+    """Build structured note-id spans for each melodic n-gram occurrence."""
+    matched = cells[cells["match_string"].notna()]
+    matches: list[dict[str, Any]] = [
+        {
+            "pattern": list(pattern_values),
+            "pattern_string": pattern_string,
+            "column": column,
+            "start_measure": measure,
+            "start_beat": beat,
+            "start_offset": offset,
+        }
+        for pattern_values, pattern_string, column, measure, beat, offset in zip(
+            matched["match_values"].tolist(),
+            matched["match_string"].tolist(),
+            matched["column"].tolist(),
+            matched["measure"].tolist(),
+            matched["beat"].tolist(),
+            matched["offset"].tolist(),
+            strict=True,
+        )
+    ]
+
+    span_selections = _resolve_span_events_batch(
+        score_index,
+        [{**match, "note_count": n + 1} for match in matches],
+    )
+    for match, selections in zip(matches, span_selections, strict=True):
+        note_ids: list[str] = []
+        duration = 0.0
+        for part_label, event_indices in selections:
+            note_ids.extend(score_index.event_note_ids(part_label, event_indices))
+            if part_label == match["column"]:
+                part = score_index.parts[part_label]
+                first_idx, last_idx = int(event_indices[0]), int(event_indices[-1])
+                duration = (
+                    float(part.offset[last_idx])
+                    + float(part.duration[last_idx])
+                    - float(part.offset[first_idx])
+                )
+        match["note_ids"] = note_ids
+        match["duration"] = duration
+        match["end_offset"] = match["start_offset"] + duration
+
+    return matches
+
+
+def _build_note_id_matches(
+    score_index: ScoreIndex, mel_ngrams: Any, n: int
+) -> list[dict[str, Any]]:
+    """Build structured note-id spans for each melodic n-gram match."""
+    return _resolve_ngram_cell_matches(score_index, _ngram_cells(mel_ngrams), n)
+
+
+def _melodic_ngram_analysis(
+    filepath: Path,
+    n: int,
+    kind: str,
+    entries: bool,
+    combine_unisons: bool | None = None,
+    compound: bool = False,
+    include_matches: bool = True,
+    engine: str = "crim",
+) -> dict[str, Any]:
+    """Build an n-gram frame once and derive every view from one traversal.
+
+    Returns:
+        Dictionary containing:
+        - mel_ngrams: The detail-indexed n-gram dataframe
+        - pattern_counts: Ranked pattern/count records
+        - matches: Note-ID match records in traversal order, when requested
+    """
+    mel_ngrams = _load_melodic_ngram_dataframe(
+        filepath,
+        n=n,
+        kind=kind,
+        entries=entries,
+        combine_unisons=combine_unisons,
+        compound=compound,
+        engine=engine,
+    )
+    cells = _ngram_cells(mel_ngrams)
+    analysis: dict[str, Any] = {
+        "mel_ngrams": mel_ngrams,
+        "pattern_counts": _count_ngram_cells(cells),
+    }
+    if include_matches:
+        analysis["matches"] = _resolve_ngram_cell_matches(
+            _load_score_index(filepath), cells, n
+        )
+    return analysis
+
+
+def _count_melodic_ngram_range(
+    filepath: Path,
+    n_min: int,
+    n_max: int,
+    kind: str,
+    entries: bool,
+    combine_unisons: bool | None = None,
+    compound: bool = False,
+    engine: str = "crim",
+) -> dict[int, list[dict[str, Any]]]:
+    """Rank melodic n-gram counts for every length from ``n_min`` to ``n_max``.
+
+    The interval sequence is built once and each length extends the previous
+    one. Entry filtering depends on each length's n-grams, so it falls back to
+    one cached-piece analysis per length.
+    """
+    if n_min < 1 or n_max < n_min:
+        raise ValueError("n-gram lengths must satisfy 1 <= n_min <= n_max")
+    if entries:
+        return {
+            n: _melodic_ngram_analysis(
+                filepath,
+                n=n,
+                kind=kind,
+                entries=entries,
+                combine_unisons=combine_unisons,
+                compound=compound,
+                include_matches=False,
+                engine=engine,
+            )["pattern_counts"]
+            for n in range(n_min, n_max + 1)
+        }
+    sequences, labels = _melodic_interval_sequences(
+        filepath, kind, combine_unisons, compound, engine
+    )
+    return count_ngram_range(sequences, labels, n_min, n_max)
+
+
+def _first_occurrences(
+    pattern_counts: list[dict[str, Any]],
+    matches: list[dict[str, Any]],
+) -> list[dict[str, Any]]:
+    """Keep the first occurrence of each counted pattern across all parts."""
+    count_by_pattern = {
+        record["pattern_string"]: record["count"] for record in pattern_counts
+    }
+    grouped_matches = _group_matches_by_pattern(
+        matches,
+        patterns=[record["pattern_string"] for record in pattern_counts],
+    )
+
+    pattern_records: list[dict[str, Any]] = []
+    for pattern_string, pattern_matches in grouped_matches.items():
+        if not pattern_matches:
+            continue
+
+        first_match = pattern_matches[0]
+        start_q = float(first_match["start_offset"])
+        duration = float(first_match["duration"])
+        pattern_records.append(
+            {
+                "pattern": first_match["pattern"],
+                "pattern_string": pattern_string,
+                "count": count_by_pattern.get(pattern_string, len(pattern_matches)),
+                "start_q": start_q,
+                "duration": duration,
+                "end_q": start_q + duration,
+                "column": first_match["column"],
+                "note_ids": first_match["note_ids"],
+            }
+        )
+
+    pattern_records.sort(
+        key=lambda record: (
+            record["start_q"],
+            str(record["column"]),
+            record["pattern_string"],
+        )
+    )
+    return pattern_records
+
+
+def _import_piece(filepath: Path) -> Any:
+    """Parse a score with CRIM, leaving its lifetime to the shared score cache."""
+    path = str(filepath)
+    # CRIM memoises every import in an unbounded module-level dict keyed by
+    # path. Bypass it so edited files are re-parsed and evicted pieces are freed.
+    main_objs.pathDict.pop(path, None)
+    piece = importScore(path)
+    main_objs.pathDict.pop(path, None)
     if piece is None:
         raise FileNotFoundError(f"Could not load MEI file: {filepath}")
+    return piece
+
+
+def _load_piece(filepath: Path) -> Any:
+    """Return a parsed CRIM piece from the shared score cache."""
+    if not filepath.exists():
+        raise FileNotFoundError(f"Could not load MEI file: {filepath}")
+    return get_score_cache().get_or_load(
+        "crim_piece",
+        filepath,
+        _import_piece,
+        size_estimate=lambda path, _: path.stat().st_size * _CRIM_PIECE_SIZE_FACTOR,
+    )
+
+
+def _detailed_notes(piece: Any) -> pd.DataFrame:
+    """Return a piece's note dataframe with numbered parts and detailed index."""
     nr = piece.notes()
     nr = piece.numberParts(nr)
-    nr = piece.detailIndex(nr)
-    return piece, nr
+    return piece.detailIndex(nr)
+
+
+def _crim_frame(
+    filepath: Path, analysis: str, compute: Callable[[Any], pd.DataFrame], **params: Any
+) -> pd.DataFrame:
+    """Return a CRIM dataframe from the artifact store, or compute it from the piece.
+
+    A stored frame avoids parsing the score with music21 at all, so repeated
+    requests are fast across restarts and worker processes.
+    """
+    return load_artifact(
+        analysis,
+        filepath,
+        lambda: compute(_load_piece(filepath)),
+        fmt="npz",
+        params=params,
+        libraries=_CRIM_LIBRARIES,
+    )
 
 
 def get_notes(filename: str) -> dict[str, Any]:
@@ -525,7 +1078,7 @@ def get_notes(filename: str) -> dict[str, Any]:
         - filename: The input filename
     """
     filepath = get_mei_filepath(filename)
-    _, nr = _load_piece_with_details(filepath)
+    nr = _crim_frame(filepath, "crim_notes", _detailed_notes)
 
     return {
         "filename": filename,
@@ -555,8 +1108,12 @@ def get_melodic_intervals(filename: str, kind: str = "d") -> dict[str, Any]:
         - filename: The input filename
     """
     filepath = get_mei_filepath(filename)
-    piece, nr = _load_piece_with_details(filepath)
-    mel = piece.melodic(df=nr, kind=kind)
+    mel = _crim_frame(
+        filepath,
+        "crim_melodic_intervals",
+        lambda piece: piece.melodic(df=_detailed_notes(piece), kind=kind),
+        kind=kind,
+    )
 
     return {
         "filename": filename,
@@ -583,8 +1140,11 @@ def get_harmonic_intervals(filename: str) -> dict[str, Any]:
         - filename: The input filename
     """
     filepath = get_mei_filepath(filename)
-    piece, nr = _load_piece_with_details(filepath)
-    har = piece.harmonic(df=nr)
+    har = _crim_frame(
+        filepath,
+        "crim_harmonic_intervals",
+        lambda piece: piece.harmonic(df=_detailed_notes(piece)),
+    )
 
     return {
         "filename": filename,
@@ -600,6 +1160,7 @@ def get_melodic_ngrams(
     kind: str = "d",
     entries: bool = False,
     include_note_ids: bool = False,
+    engine: str = "crim",
 ) -> dict[str, Any]:
     """Extract melodic n-grams from an MEI file using CRIM Intervals.
 
@@ -622,6 +1183,10 @@ def get_melodic_ngrams(
         include_note_ids: If True, also include occurrence-level note-ID spans.
             This is more expensive than returning the pattern table alone and is
             best reserved for targeted highlighting workflows. (default: False)
+        engine: N-gram engine to use:
+            - 'crim' (default): CRIM Intervals on a parsed music21 score
+            - 'numpy': native engine reading the MEI directly; much faster,
+              same results, but without entry filtering
 
     Returns:
         Dictionary containing:
@@ -630,10 +1195,13 @@ def get_melodic_ngrams(
         - kind: The interval type used
         - entries: Whether entry filtering was applied
         - include_note_ids: Whether note-ID matches were included
+        - engine: The n-gram engine used
         - filename: The input filename
     """
     filepath = get_mei_filepath(filename)
-    mel_ngrams = _load_melodic_ngram_dataframe(filepath, n=n, kind=kind, entries=entries)
+    mel_ngrams = _load_melodic_ngram_dataframe(
+        filepath, n=n, kind=kind, entries=entries, engine=engine
+    )
     mel_ngrams_as_strings = mel_ngrams.map(_pattern_to_string)
 
     result = {
@@ -642,13 +1210,16 @@ def get_melodic_ngrams(
         "kind": kind,
         "entries": entries,
         "include_note_ids": include_note_ids,
+        "engine": engine,
         "melodic_ngrams": mel_ngrams_as_strings.to_csv(index=True)
         if not mel_ngrams_as_strings.empty
         else "No melodic n-grams found",
     }
 
     if include_note_ids:
-        result["melodic_ngram_note_ids"] = _build_note_id_matches(filepath, mel_ngrams, n)
+        result["melodic_ngram_note_ids"] = _build_note_id_matches(
+            _load_score_index(filepath), mel_ngrams, n
+        )
 
     return result
 
@@ -660,6 +1231,7 @@ def count_melodic_ngrams(
     entries: bool = False,
     combine_unisons: bool | None = None,
     compound: bool = False,
+    engine: str = "crim",
 ) -> dict[str, Any]:
     """Count melodic n-gram occurrences and rank patterns by frequency.
 
@@ -675,6 +1247,8 @@ def count_melodic_ngrams(
         combine_unisons: Whether CRIM should combine repeated unisons before
             melodic interval extraction. ``None`` uses the default CRIM path.
         compound: Whether to use compound intervals.
+        engine: N-gram engine, 'crim' (default) or the faster native 'numpy'
+            engine, which does not support entry filtering.
 
     Returns:
         Dictionary containing:
@@ -684,26 +1258,102 @@ def count_melodic_ngrams(
         - entries: Whether entry filtering was applied
         - combine_unisons: Whether unisons were combined
         - compound: Whether compound intervals were used
+        - engine: The n-gram engine used
         - pattern_counts: Ranked list of pattern/count records
     """
     filepath = get_mei_filepath(filename)
-    mel_ngrams = _load_melodic_ngram_dataframe(
+    params = {
+        "n": n,
+        "kind": kind,
+        "entries": entries,
+        "combine_unisons": combine_unisons,
+        "compound": compound,
+        "engine": engine,
+    }
+    pattern_counts = load_artifact(
+        "melodic_ngram_counts",
         filepath,
-        n=n,
+        lambda: _melodic_ngram_analysis(filepath, include_matches=False, **params)[
+            "pattern_counts"
+        ],
+        fmt="json",
+        params=params,
+        libraries=_CRIM_LIBRARIES + ("numpy",),
+    )
+
+    return {
+        "filename": filename,
+        **params,
+        "pattern_counts": pattern_counts,
+    }
+
+
+def count_melodic_ngrams_range(
+    filename: str,
+    n_min: int = 2,
+    n_max: int = 8,
+    kind: str = "d",
+    entries: bool = False,
+    combine_unisons: bool | None = None,
+    compound: bool = False,
+    engine: str = "crim",
+) -> dict[str, Any]:
+    """Count and rank melodic n-grams for a range of lengths in one call.
+
+    Melodic intervals are computed once and every length from ``n_min`` to
+    ``n_max`` is counted from them, so a sweep costs little more than its
+    longest n. Each length's counts match ``count_melodic_ngrams``.
+
+    Args:
+        filename: Name of the MEI file (e.g., "Bach_BWV_0772.mei").
+        n_min: Shortest n-gram length to count.
+        n_max: Longest n-gram length to count.
+        kind: Interval representation used for melodic intervals.
+        entries: Whether to restrict results to entry-filtered n-grams.
+        combine_unisons: Whether CRIM should combine repeated unisons before
+            melodic interval extraction. ``None`` uses the default CRIM path.
+        compound: Whether to use compound intervals.
+        engine: N-gram engine, 'crim' (default) or the faster native 'numpy'
+            engine, which does not support entry filtering.
+
+    Returns:
+        Dictionary containing:
+        - filename: The input filename
+        - n_min: The shortest n-gram length counted
+        - n_max: The longest n-gram length counted
+        - kind: The interval type used
+        - entries: Whether entry filtering was applied
+        - combine_unisons: Whether unisons were combined
+        - compound: Whether compound intervals were used
+        - engine: The n-gram engine used
+        - ngram_counts: One record per length, each with n and its ranked
+          pattern_counts
+    """
+    filepath = get_mei_filepath(filename)
+    counts_by_n = _count_melodic_ngram_range(
+        filepath,
+        n_min=n_min,
+        n_max=n_max,
         kind=kind,
         entries=entries,
         combine_unisons=combine_unisons,
         compound=compound,
+        engine=engine,
     )
 
     return {
         "filename": filename,
-        "n": n,
+        "n_min": n_min,
+        "n_max": n_max,
         "kind": kind,
         "entries": entries,
         "combine_unisons": combine_unisons,
         "compound": compound,
-        "pattern_counts": _count_patterns(mel_ngrams),
+        "engine": engine,
+        "ngram_counts": [
+            {"n": n, "pattern_counts": pattern_counts}
+            for n, pattern_counts in counts_by_n.items()
+        ],
     }
 
 
@@ -748,7 +1398,7 @@ def resolve_note_ids_for_highlight(
     filepath = get_mei_filepath(filename)
     return {
         "filename": filename,
-        "spans": _resolve_note_id_spans(filepath, spans),
+        "spans": _resolve_note_id_spans(_load_score_index(filepath), spans),
     }
 
 
@@ -790,7 +1440,7 @@ def get_melodic_ngram_matches(
         - matches_by_pattern: Mapping of pattern strings to occurrence records
     """
     filepath = get_mei_filepath(filename)
-    mel_ngrams = _load_melodic_ngram_dataframe(
+    analysis = _melodic_ngram_analysis(
         filepath,
         n=n,
         kind=kind,
@@ -799,7 +1449,7 @@ def get_melodic_ngram_matches(
         compound=compound,
     )
     grouped_matches = _group_matches_by_pattern(
-        _build_note_id_matches(filepath, mel_ngrams, n),
+        analysis["matches"],
         patterns=patterns,
     )
 
@@ -824,8 +1474,9 @@ def get_first_occur_melodic_ngrams(
 ) -> dict[str, Any]:
     """Extract first-occurrence melodic n-gram patterns from an MEI file.
 
-    This computes melodic n-gram counts, groups note-id matches by pattern,
-    then keeps the first occurrence of each unique pattern across all parts.
+    This computes melodic n-gram counts and note-id matches from one n-gram
+    table, then keeps the first occurrence of each unique pattern across all
+    parts.
 
     Args:
         filename: Name of the MEI file (e.g., "Bach_BWV_0772.mei").
@@ -858,50 +1509,18 @@ def get_first_occur_melodic_ngrams(
     Raises:
         FileNotFoundError: If the MEI file cannot be loaded.
     """
-    counts_result = count_melodic_ngrams(
-        filename=filename,
-        n=n,
-        kind=kind,
-        combine_unisons=combine_unisons,
-        compound=compound,
-    )
-    pattern_counts = counts_result["pattern_counts"]
-    count_by_pattern = {
-        record["pattern_string"]: record["count"] for record in pattern_counts
-    }
-
-    matches_result = get_melodic_ngram_matches(
-        filename=filename,
+    filepath = get_mei_filepath(filename)
+    analysis = _melodic_ngram_analysis(
+        filepath,
         n=n,
         kind=kind,
-        patterns=[record["pattern_string"] for record in pattern_counts],
+        entries=False,
         combine_unisons=combine_unisons,
         compound=compound,
     )
-
-    pattern_records: list[dict[str, Any]] = []
-    for pattern_string, matches in matches_result["matches_by_pattern"].items():
-        if not matches:
-            continue
-
-        first_match = matches[0]
-        start_q = float(first_match["start_offset"])
-        duration = float(first_match["duration"])
-        pattern_records.append(
-            {
-                "pattern": first_match["pattern"],
-                "pattern_string": pattern_string,
-                "count": count_by_pattern.get(pattern_string, len(matches)),
-                "start_q": start_q,
-                "duration": duration,
-                "end_q": start_q + duration,
-                "column": first_match["column"],
-                "note_ids": first_match["note_ids"],
-            }
-        )
-
-    pattern_records.sort(
-        key=lambda record: (record["start_q"], str(record["column"]), record["pattern_string"])
+    pattern_records = _first_occurrences(
+        analysis["pattern_counts"],
+        analysis["matches"],
     )
 
     return {
@@ -914,6 +1533,21 @@ def get_first_occur_melodic_ngrams(
     }
 
 
+def _cadence_frame(piece: Any) -> pd.DataFrame:
+    """Return a piece's predicted cadences with composer and title columns."""
+    # The piece is shared through the score cache and CRIM memoises its
+    # cadence frame, so build a new frame rather than adding columns in place.
+    cads = piece.cadences()
+    if cads.empty:
+        return cads.copy()
+    cads = cads.assign(
+        Composer=piece.metadata["composer"], Title=piece.metadata["title"]
+    )
+    return cads[
+        ["Composer", "Title", "Measure", "Beat", "Progress", "CadType", "Tone", "CVFs"]
+    ]
+
+
 def get_cadences(filename: str) -> dict[str, Any]:
     """Extract predicted cadences from an MEI file using CRIM Intervals.
 
@@ -930,35 +1564,32 @@ def get_cadences(filename: str) -> dict[str, Any]:
         - filename: The input filename
     """
     filepath = get_mei_filepath(filename)
-    piece = importScore(str(filepath))
-    if piece is None:
-        raise FileNotFoundError(f"Could not load MEI file: {filepath}")
+    # Store the whole outcome, so pieces whose cadences cannot be detected are
+    # not parsed again on every request either.
+    result = load_artifact(
+        "cadences",
+        filepath,
+        lambda: _cadences_outcome(filepath),
+        fmt="json",
+        libraries=_CRIM_LIBRARIES,
+    )
+    return {"filename": filename, **result}
+
 
+def _cadences_outcome(filepath: Path) -> dict[str, str]:
+    """Return the ``cadences`` entry of ``get_cadences`` for one score."""
     try:
-        cads = piece.cadences()
+        cads = _cadence_frame(_load_piece(filepath))
     except (ValueError, KeyError) as e:
         # Cadence detection may fail for non-Renaissance music or unusual textures
         return {
-            "filename": filename,
             "cadences": f"Cadence detection not supported for this piece. "
             f"This tool is optimised for Renaissance counterpoint (15th-17th century vocal polyphony). "
             f"Error: {str(e)}",
         }
 
-    # Check if any cadences were found before adding metadata columns
+    # Check if any cadences were found
     if cads.empty:
-        return {
-            "filename": filename,
-            "cadences": "No cadences found",
-        }
-
-    cads["Composer"] = piece.metadata["composer"]
-    cads["Title"] = piece.metadata["title"]
-    cads = cads[
-        ["Composer", "Title", "Measure", "Beat", "Progress", "CadType", "Tone", "CVFs"]
-    ]
+        return {"cadences": "No cadences found"}
 
-    return {
-        "filename": filename,
-        "cadences": cads.to_csv(index=False),
-    }
+    return {"cadences": cads.to_csv(index=False)}
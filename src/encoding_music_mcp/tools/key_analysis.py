@@ -1,31 +1,67 @@
-"""MEI key analysis tool using music21."""
+"""MEI key analysis tool using music21 or a native NumPy engine."""
 
+import xml.etree.ElementTree as ET
+from itertools import pairwise
+from pathlib import Path
 from typing import Any
 
+import numpy as np
 from music21 import converter
 
 from .helpers import get_mei_filepath
+from .key_engine import KEY_NAMES, key_correlations, normalise_profile, validate_engine
+from .visualisation.weighted_note_distribution import _load_pitch_class_table
 
-__all__ = ["analyze_key"]
+__all__ = ["analyze_key", "analyze_key_windows"]
 
 
-def analyze_key(filename: str) -> dict[str, Any]:
-    """Analyze the key of a piece using music21.
+def analyze_key(
+    filename: str,
+    engine: str = "music21",
+    profile: str = "aarden",
+) -> dict[str, Any]:
+    """Analyze the key of a piece with the Krumhansl-Schmuckler algorithm.
 
     Returns the key name and a confidence factor based on music21's
-    key analysis algorithm.
+    key analysis algorithm, computed either by music21 itself or by the
+    native NumPy engine.
 
     Args:
         filename: Name of the MEI file (e.g., "Bach_BWV_0772.mei")
+        engine: "music21" parses the score with music21; "numpy" correlates the
+            cached duration-weighted pitch-class distribution with all 24 key
+            profiles in one matrix product, without a music21 parse. The
+            numpy engine falls back to music21 when it finds no notes.
+        profile: Key-profile family: "aarden" (music21's default),
+            "krumhansl", "simple", "bellman", or "temperley". music21's
+            aliases such as "kessler" or "key.temperley" are also accepted.
 
     Returns:
         Dictionary containing:
         - Key Name: The detected key (e.g., "C major", "a minor")
         - Confidence Factor: Correlation coefficient (0.0-1.0)
     """
+    engine = validate_engine(engine)
+    profile = normalise_profile(profile)
     filepath = get_mei_filepath(filename)
+
+    if engine == "numpy":
+        if not filepath.exists():
+            raise FileNotFoundError(f"MEI file not found: {filename}")
+        durations, _ = _load_pitch_class_table(filepath).window(None, None)
+        distribution = durations.sum(axis=0)
+        # Files the table cannot read notes from (such as movement wrappers
+        # that only XInclude other files) are left to music21.
+        if distribution.any():
+            correlations = key_correlations(distribution, profile)
+            best = int(np.argmax(correlations))
+            return {
+                "Key Name": KEY_NAMES[best],
+                "Confidence Factor": float(correlations[best]),
+            }
+
     score = converter.parse(str(filepath))
-    key_analysis = score.analyze("key")
+    key_analysis = score.analyze(f"key.{profile}")
 
     analysis_dict = {
         "Key Name": str(key_analysis),
@@ -33,3 +69,117 @@ def analyze_key(filename: str) -> dict[str, Any]:
     }
 
     return analysis_dict
+
+
+def _no_notes_error(filename: str, filepath: Path) -> ValueError:
+    """Return the error for a score without notes, naming any included files."""
+    included = [
+        element.get("href")
+        for element in ET.parse(filepath).iter()
+        if element.tag.rsplit("}", 1)[-1] == "include" and element.get("href")
+    ]
+    if included:
+        return ValueError(
+            f"MEI file {filename} has no notes of its own; it includes "
+            f"{', '.join(included)}. Analyse those files instead."
+        )
+    return ValueError(f"No sounding notes found in MEI file: {filename}")
+
+
+def analyze_key_windows(
+    filename: str,
+    window_measures: int = 4,
+    hop_measures: int = 1,
+    profile: str = "aarden",
+) -> dict[str, Any]:
+    """Trace local keys through a piece over sliding windows of measures.
+
+    Each window's duration-weighted pitch-class distribution is the difference
+    of two rows of the score's cached cumulative table, and every window is
+    correlated with all 24 key profiles in one batched matrix product.
+
+    Args:
+        filename: Name of the MEI file (e.g., "Bach_BWV_0772.mei")
+        window_measures: Number of measures in each window.
+        hop_measures: Number of measures between window starts.
+        profile: Key-profile family, as for ``analyze_key``.
+
+    Returns:
+        Dictionary containing:
+        - filename: The input filename
+        - window_measures: The window length used
+        - hop_measures: The hop used
+        - profile: The key-profile family used
+        - global_key: Key and correlation of the whole piece
+        - window_count: Number of windows
+        - windows: One record per window with start_measure, end_measure,
+          key, and correlation (key is None for windows without notes).
+          Windows advance by measure position; a start or end measure
+          without a numeric ``n`` is reported as None. The last window is
+          aligned to the final measure.
+        - key_changes: Windows whose key differs from the previous window's
+    """
+    if window_measures < 1:
+        raise ValueError("window_measures must be at least 1")
+    if hop_measures < 1:
+        raise ValueError("hop_measures must be at least 1")
+    profile = normalise_profile(profile)
+    filepath = get_mei_filepath(filename)
+    if not filepath.exists():
+        raise FileNotFoundError(f"MEI file not found: {filename}")
+
+    table = _load_pitch_class_table(filepath)
+    cumulative = table.durations.sum(axis=1)
+    measure_count = len(table.measure_numbers)
+    if not cumulative[-1].any():
+        raise _no_notes_error(filename, filepath)
+
+    span = min(window_measures, measure_count)
+    starts = np.arange(0, measure_count - span + 1, hop_measures)
+    if starts[-1] + span < measure_count:
+        # Align one more window to the end so the last measures are covered.
+        starts = np.append(starts, measure_count - span)
+    distributions = cumulative[starts + span] - cumulative[starts]
+    correlations = key_correlations(np.vstack((distributions, cumulative[-1])), profile)
+    best = correlations.argmax(axis=1)
+    best_correlations = correlations[np.arange(len(best)), best]
+    sounding = np.append(distributions.any(axis=1), True)
+
+    windows = [
+        {
+            "start_measure": table.measure_label(start),
+            "end_measure": table.measure_label(start + span - 1),
+            "key": KEY_NAMES[key] if has_notes else None,
+            "correlation": float(correlation) if has_notes else 0.0,
+        }
+        for start, key, correlation, has_notes in zip(
+            starts.tolist(),
+            best[:-1].tolist(),
+            best_correlations[:-1].tolist(),
+            sounding[:-1].tolist(),
+            strict=True,
+        )
+    ]
+    keyed = [window for window in windows if window["key"] is not None]
+    key_changes = [
+        {
+            "start_measure": window["start_measure"],
+            "from_key": previous["key"],
+            "to_key": window["key"],
+        }
+        for previous, window in pairwise(keyed)
+        if window["key"] != previous["key"]
+    ]
+    return {
+        "filename": filename,
+        "window_measures": window_measures,
+        "hop_measures": hop_measures,
+        "profile": profile,
+        "global_key": {
+            "key": KEY_NAMES[int(best[-1])],
+            "correlation": float(best_correlations[-1]),
+        },
+        "window_count": len(windows),
+        "windows": windows,
+        "key_changes": key_changes,
+    }
@@ -0,0 +1,148 @@
+"""Native NumPy Krumhansl-Schmuckler key-finding engine.
+
+music21 finds keys by correlating a duration-weighted pitch-class
+distribution with 24 rotated key profiles. This module does the same without
+building a music21 stream: the profiles of a family form one (24, 12)
+matrix, and a stack of centred distributions is correlated with all 24 keys
+in a single matrix product, so whole scores and many windows cost the same
+call.
+"""
+
+from functools import lru_cache
+from typing import Any
+
+import numpy as np
+
+__all__ = [
+    "ENGINES",
+    "KEY_NAMES",
+    "KEY_PROFILES",
+    "key_correlations",
+    "normalise_profile",
+    "profile_matrix",
+    "validate_engine",
+]
+
+ENGINES = ("music21", "numpy")
+
+# Major and minor weights per family, as in music21.analysis.discrete.
+KEY_PROFILES: dict[str, tuple[tuple[float, ...], tuple[float, ...]]] = {
+    "aarden": (
+        (17.7661, 0.145624, 14.9265, 0.160186, 19.8049, 11.3587)
+        + (0.291248, 22.062, 0.145624, 8.15494, 0.232998, 4.95122),
+        (18.2648, 0.737619, 14.0499, 16.8599, 0.702494, 14.4362)
+        + (0.702494, 18.6161, 4.56621, 1.93186, 7.37619, 1.75623),
+    ),
+    "bellman": (
+        (16.80, 0.86, 12.95, 1.41, 13.49, 11.93, 1.25, 20.28, 1.80, 8.04, 0.62, 10.57),
+        (18.16, 0.69, 12.99, 13.34, 1.07, 11.15, 1.38, 21.07, 7.49, 1.53, 0.92, 10.21),
+    ),
+    "krumhansl": (
+        (6.35, 2.23, 3.48, 2.33, 4.38, 4.09, 2.52, 5.19, 2.39, 3.66, 2.29, 2.88),
+        (6.33, 2.68, 3.52, 5.38, 2.60, 3.53, 2.54, 4.75, 3.98, 2.69, 3.34, 3.17),
+    ),
+    "simple": (
+        (2, 0, 1, 0, 1, 1, 0, 2, 0, 1, 0, 1),
+        (2, 0, 1, 1, 0, 1, 0, 2, 1, 0, 0.5, 0.5),
+    ),
+    "temperley": (
+        (0.748, 0.060, 0.488, 0.082, 0.670, 0.460)
+        + (0.096, 0.715, 0.104, 0.366, 0.057, 0.400),
+        (0.712, 0.084, 0.474, 0.618, 0.049, 0.460)
+        + (0.105, 0.747, 0.404, 0.067, 0.133, 0.330),
+    ),
+}
+
+# music21's method identifiers for each family; "key" is its default.
+_PROFILE_ALIASES = {
+    "key": "aarden",
+    "essen": "aarden",
+    "aarden-essen": "aarden",
+    "aardenessen": "aarden",
+    "budge": "bellman",
+    "bellman-budge": "bellman",
+    "bellmanbudge": "bellman",
+    "schmuckler": "krumhansl",
+    "krumhansl-schmuckler": "krumhansl",
+    "krumhanslschmuckler": "krumhansl",
+    "kessler": "krumhansl",
+    "krumhansl-kessler": "krumhansl",
+    "krumhanslkessler": "krumhansl",
+    "weight": "simple",
+    "simple-weight": "simple",
+    "simpleweight": "simple",
+    "kostka": "temperley",
+    "payne": "temperley",
+    "temperley-kostka-payne": "temperley",
+    "temperleykostkapayne": "temperley",
+}
+
+# Rows of the profile matrix: 12 major keys by tonic pitch class, then 12
+# minor keys, spelled as music21 spells the winning tonic.
+KEY_NAMES = tuple(
+    f"{tonic} major"
+    for tonic in ("C", "C#", "D", "E-", "E", "F", "F#", "G", "A-", "A", "B-", "B")
+) + tuple(
+    f"{tonic} minor"
+    for tonic in ("c", "c#", "d", "e-", "e", "f", "f#", "g", "g#", "a", "b-", "b")
+)
+
+
+def validate_engine(engine: str) -> str:
+    """Return a validated key-analysis engine name."""
+    if engine not in ENGINES:
+        raise ValueError(
+            f"Unknown key engine {engine!r}; expected one of {', '.join(ENGINES)}"
+        )
+    return engine
+
+
+def normalise_profile(profile: str) -> str:
+    """Return the profile family for a music21 key-analysis identifier."""
+    name = profile.strip().lower().removeprefix("key.")
+    name = _PROFILE_ALIASES.get(name, name)
+    if name not in KEY_PROFILES:
+        raise ValueError(
+            f"Unknown key profile {profile!r}; expected one of "
+            f"{', '.join(sorted(KEY_PROFILES))}"
+        )
+    return name
+
+
+@lru_cache(maxsize=32)
+def profile_matrix(profile: str) -> np.ndarray:
+    """Return the (24, 12) matrix of centred, unit-length key profiles.
+
+    Row ``k`` for ``k < 12`` is the major profile rotated to tonic ``k``, and
+    row ``12 + k`` the minor profile, so a centred distribution's dot product
+    with a row is proportional to their Pearson correlation.
+    """
+    rows = []
+    for weights in KEY_PROFILES[normalise_profile(profile)]:
+        weights = np.asarray(weights, dtype=np.float64)
+        rows.extend(np.roll(weights, tonic) for tonic in range(12))
+    matrix = np.array(rows)
+    matrix -= matrix.mean(axis=1, keepdims=True)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix.flags.writeable = False
+    return matrix
+
+
+def key_correlations(distributions: Any, profile: str = "aarden") -> np.ndarray:
+    """Correlate pitch-class distributions with all 24 keys of a profile.
+
+    Args:
+        distributions: Array of shape (..., 12) of duration weights per pitch
+            class, starting at C.
+        profile: Profile family or music21 identifier (e.g., "krumhansl").
+
+    Returns:
+        Array of shape (..., 24) of Pearson correlations, ordered as
+        ``KEY_NAMES``. Flat distributions correlate 0 with every key, as in
+        music21.
+    """
+    distributions = np.asarray(distributions, dtype=np.float64)
+    centred = distributions - distributions.mean(axis=-1, keepdims=True)
+    norms = np.linalg.norm(centred, axis=-1, keepdims=True)
+    unit = np.divide(centred, norms, out=np.zeros_like(centred), where=norms > 0)
+    return unit @ profile_matrix(profile).T
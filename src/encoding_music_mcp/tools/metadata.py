@@ -1,8 +1,10 @@
 """MEI metadata extraction tool."""
 
 import xml.etree.ElementTree as ET
+from pathlib import Path
 from typing import Any
 
+from .artifact_store import load_artifact
 from .helpers import get_mei_filepath
 
 __all__ = ["get_mei_metadata"]
@@ -21,7 +23,13 @@ def get_mei_metadata(filename: str) -> dict[str, Any]:
         Dictionary containing metadata fields
     """
     filepath = get_mei_filepath(filename)
+    return load_artifact(
+        "mei_metadata", filepath, lambda: _read_metadata(filepath), fmt="json"
+    )
 
+
+def _read_metadata(filepath: Path) -> dict[str, Any]:
+    """Parse the metadata fields from an MEI header."""
     ns = {"mei": "http://www.music-encoding.org/ns/mei"}
     tree = ET.parse(filepath)
     root = tree.getroot()
@@ -0,0 +1,935 @@
+"""Native NumPy engine for melodic intervals and n-grams.
+
+The engine reads note and rest sequences straight from the MEI tree and
+reproduces the melodic n-gram frames built by CRIM Intervals, without parsing
+the score into music21 first. Interval labels are computed once per distinct
+(diatonic steps, semitones) pair and n-grams are windows over the resulting
+integer-coded sequences.
+"""
+
+import math
+import xml.etree.ElementTree as ET
+from collections.abc import Iterator
+from dataclasses import dataclass
+from fractions import Fraction
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from crim_intervals.main_objs import ImportedPiece
+from music21 import interval, meter
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .artifact_store import persistent
+from .score_cache import get_score_cache
+
+__all__ = [
+    "ENGINES",
+    "REST_CODE",
+    "MelodicScore",
+    "VoiceSequence",
+    "count_ngram_range",
+    "load_melodic_score",
+    "melodic_interval_codes",
+    "melodic_interval_sequences",
+    "melodic_ngram_frame",
+    "melodic_ngram_windows",
+    "melodic_part_intervals",
+    "validate_engine",
+]
+
+ENGINES = ("crim", "numpy")
+
+_MEI = "{http://www.music-encoding.org/ns/mei}"
+_XML_ID = "{http://www.w3.org/XML/1998/namespace}id"
+
+_STEP_INDEX = {"c": 0, "d": 1, "e": 2, "f": 3, "g": 4, "a": 5, "b": 6}
+_STEP_SEMITONES = (0, 2, 4, 5, 7, 9, 11)
+
+# Alterations for MEI @accid and @accid.ges values, as music21's MEI reader
+# interprets them (quarter-tone values included).
+_ACCID_ALTER = {
+    "s": 1.0,
+    "f": -1.0,
+    "ss": 2.0,
+    "x": 2.0,
+    "ff": -2.0,
+    "xs": 3.0,
+    "ts": 3.0,
+    "tf": -3.0,
+    "n": 0.0,
+    "nf": -1.0,
+    "ns": 1.0,
+    "su": 1.5,
+    "sd": 0.5,
+    "fu": -0.5,
+    "fd": -1.5,
+    "nu": 0.5,
+    "nd": -0.5,
+}
+_ACCID_GES_ALTER = {
+    key: _ACCID_ALTER[key]
+    for key in ("s", "f", "ss", "ff", "n", "su", "sd", "fu", "fd")
+}
+
+_DUR_QUARTERS = {
+    "maxima": 32.0,
+    "long": 16.0,
+    "breve": 8.0,
+    "1": 4.0,
+    "2": 2.0,
+    "4": 1.0,
+    "8": 0.5,
+    "16": 0.25,
+    "32": 0.125,
+    "64": 0.0625,
+    "128": 0.03125,
+    "256": 0.015625,
+}
+_CONTAINER_TAGS = {"beam", "tuplet", "bTrem", "fTrem"}
+_REST_TAGS = {"rest", "mRest", "space", "mSpace"}
+# Tick resolution used when notes carry no @dur.ppq; fine enough for a doubly
+# dotted 256th note.
+_MIN_TICKS_PER_QUARTER = 1024
+# Code used for melodic intervals that touch a rest.
+REST_CODE = -1
+
+
+@dataclass(frozen=True)
+class VoiceSequence:
+    """Notes and rests of one CRIM part in onset order.
+
+    Mirrors CRIM's part series: chords are reduced to their highest note, only
+    the first event at each offset is kept, and ``tied`` marks tie
+    continuations that CRIM drops before computing intervals.
+    """
+
+    offset: np.ndarray
+    is_rest: np.ndarray
+    diatonic: np.ndarray
+    ps: np.ndarray
+    tied: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.offset)
+
+    @property
+    def nbytes(self) -> int:
+        """Return the memory held by the sequence arrays."""
+        return sum(
+            array.nbytes
+            for array in (self.offset, self.is_rest, self.diatonic, self.ps, self.tied)
+        )
+
+
+@dataclass(frozen=True)
+class MelodicScore:
+    """Per-part note sequences plus the metric grid CRIM uses for locations.
+
+    Attributes:
+        voices: Note sequences for each CRIM part label ("1", "2", ...).
+        measure_starts: Offsets of the regular measure grid of the first part.
+        barline_offsets: Sorted union of every part's measure grid.
+        time_signature_offsets: Per part, offsets at which time signatures
+            take effect.
+        beat_durations: Per part, beat length in quarter notes for each time
+            signature.
+    """
+
+    voices: dict[str, VoiceSequence]
+    measure_starts: np.ndarray
+    barline_offsets: np.ndarray
+    time_signature_offsets: dict[str, np.ndarray]
+    beat_durations: dict[str, np.ndarray]
+
+    def locations(self, offsets: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Return CRIM's (measure, beat) labels for the given offsets.
+
+        Measures follow the first part's grid. Like CRIM's ``beats()``, a beat
+        is measured from the latest barline of any part and divided by the
+        beat unit of the first part with a note or rest at that offset.
+        """
+        offsets = np.asarray(offsets, dtype=np.float64)
+        measure_idx = np.searchsorted(self.measure_starts, offsets, side="right") - 1
+        measure_idx = np.clip(measure_idx, 0, None)
+        barline_idx = np.searchsorted(self.barline_offsets, offsets, side="right") - 1
+        barlines = self.barline_offsets[np.clip(barline_idx, 0, None)]
+
+        beat_duration = np.full(len(offsets), np.nan)
+        for label, voice in self.voices.items():
+            event_offsets = _melodic_events(voice, combine_unisons=False)[0]
+            pending = np.isnan(beat_duration) & np.isin(offsets, event_offsets)
+            if not pending.any():
+                continue
+            signature_idx = (
+                np.searchsorted(
+                    self.time_signature_offsets[label], offsets[pending], side="right"
+                )
+                - 1
+            )
+            beat_duration[pending] = self.beat_durations[label][
+                np.clip(signature_idx, 0, None)
+            ]
+        beats = (offsets - barlines) / beat_duration + 1
+        return (measure_idx + 1).astype(np.float64), beats
+
+    @property
+    def nbytes(self) -> int:
+        """Return the memory held by the score arrays."""
+        return sum(voice.nbytes for voice in self.voices.values()) + sum(
+            array.nbytes
+            for array in (
+                self.measure_starts,
+                self.barline_offsets,
+                *self.time_signature_offsets.values(),
+                *self.beat_durations.values(),
+            )
+        )
+
+
+@lru_cache(maxsize=64)
+def _time_signature(count: str, unit: str) -> tuple[float, float]:
+    """Return (bar length, beat length) in quarter notes for a meter."""
+    signature = meter.TimeSignature(f"{count}/{unit}")
+    return (
+        float(signature.barDuration.quarterLength),
+        float(signature.beatDuration.quarterLength),
+    )
+
+
+def _ticks_per_quarter(score: ET.Element) -> int:
+    """Return a tick resolution that represents every duration exactly."""
+    resolution = _MIN_TICKS_PER_QUARTER
+    for element in score.iter():
+        if element.tag in (f"{_MEI}scoreDef", f"{_MEI}staffDef") and element.get("ppq"):
+            resolution = math.lcm(resolution, int(element.get("ppq")))
+        elif (
+            element.tag in (f"{_MEI}tuplet", f"{_MEI}tupletSpan")
+            and element.get("num", "").isdigit()
+        ):
+            resolution = math.lcm(resolution, int(element.get("num")))
+    return resolution
+
+
+def _staff_ppq(score: ET.Element) -> dict[str, int]:
+    """Return @ppq for each staff, inheriting the score-level default."""
+    score_def = score.find(f"{_MEI}scoreDef")
+    default_ppq = int(score_def.get("ppq", "0")) if score_def is not None else 0
+    staff_ppq: dict[str, int] = {}
+    for staff_def in score.iter(f"{_MEI}staffDef"):
+        if staff_def.get("n"):
+            staff_ppq[staff_def.get("n")] = int(staff_def.get("ppq", default_ppq))
+    return staff_ppq
+
+
+def _duration_ticks(
+    element: ET.Element,
+    ppq: int,
+    resolution: int,
+    tuplet_scale: Fraction,
+) -> int | None:
+    """Return an element's duration in ticks, or ``None`` when it has none.
+
+    Durations follow music21's reading of @dur, @dots, and enclosing tuplets;
+    @dur.ppq, which is rounded inside tuplets, is only a fallback.
+    """
+    quarters = _DUR_QUARTERS.get(element.get("dur", ""))
+    if quarters is None:
+        dur_ppq = element.get("dur.ppq")
+        if dur_ppq is None or not ppq:
+            return None
+        return int(dur_ppq) * resolution // ppq
+    dots = int(element.get("dots", "0"))
+    value = Fraction(quarters) * (2 - Fraction(1, 2**dots)) * tuplet_scale
+    return round(value * resolution)
+
+
+def _tie_attributes(score: ET.Element) -> dict[str, str]:
+    """Return the effective @tie value per ``xml:id``, as music21 assigns it.
+
+    Each ``<tie>`` marks its start with ``i`` and its end with ``t``; a later
+    ``<tie>`` overwrites an earlier one, and the result is appended to any
+    @tie already on the element.
+    """
+    from_ties: dict[str, str] = {}
+    for tie in score.iter(f"{_MEI}tie"):
+        start, end = tie.get("startid"), tie.get("endid")
+        if start is not None and end is not None:
+            from_ties[start.lstrip("#")] = "i"
+            from_ties[end.lstrip("#")] = "t"
+    return from_ties
+
+
+def _tuplet_span_attributes(score: ET.Element) -> dict[str, dict[str, str]]:
+    """Return the <tupletSpan> attributes music21 attaches to each ``xml:id``.
+
+    Spans with a @plist scale every listed element directly. Spans with only
+    @startid and @endid mark a ``search`` range that is resolved per layer by
+    :func:`_apply_tuplet_searches`. Later spans overwrite earlier ones.
+    """
+    span_attributes: dict[str, dict[str, str]] = {}
+    for span in score.iter(f"{_MEI}tupletSpan"):
+        ratio = {"num": span.get("num", "1"), "numbase": span.get("numbase", "1")}
+        if span.get("plist") is not None:
+            for xml_id in span.get("plist").split():
+                span_attributes.setdefault(xml_id.lstrip("#"), {}).update(ratio)
+        elif span.get("startid") is not None and span.get("endid") is not None:
+            for search, xml_id in (
+                ("start", span.get("startid")),
+                ("end", span.get("endid")),
+            ):
+                span_attributes.setdefault(xml_id.lstrip("#"), {}).update(
+                    ratio, search=search
+                )
+    return span_attributes
+
+
+def _span_marker(
+    element: ET.Element,
+    span_attributes: dict[str, dict[str, str]],
+    tuplet_scale: Fraction,
+) -> tuple[Fraction, tuple[str, Fraction] | None]:
+    """Return an element's tuplet scale and its span search marker, if any."""
+    attributes = span_attributes.get(element.get(_XML_ID, ""))
+    if attributes is None:
+        return tuplet_scale, None
+    ratio = Fraction(int(attributes["numbase"]), int(attributes["num"]))
+    if "search" in attributes:
+        return tuplet_scale, (attributes["search"], ratio)
+    return tuplet_scale * ratio, None
+
+
+def _apply_tuplet_searches(events: list[tuple[Any, ...]]) -> list[tuple[Any, ...]]:
+    """Scale events between <tupletSpan> start and end markers in one layer.
+
+    This follows music21's guess for spans without a @plist: every note, rest,
+    and chord from the start element through the end element is scaled.
+    """
+    scaled: list[tuple[Any, ...]] = []
+    ratio: Fraction | None = None
+    for event in events:
+        marker = event[8]
+        if marker is not None and marker[0] == "start":
+            ratio = marker[1]
+        if ratio is not None:
+            event = (round(event[0] * ratio), *event[1:])
+            if marker is not None and marker[0] == "end":
+                ratio = None
+        scaled.append(event)
+    return scaled
+
+
+def _is_tie_continuation(element: ET.Element, from_ties: dict[str, str]) -> bool | None:
+    """Return whether a note or chord continues a tie (``None`` if untied)."""
+    value = element.get("tie", "") + from_ties.get(element.get(_XML_ID, ""), "")
+    if not value:
+        return None
+    return not ("i" in value and "m" not in value and "t" not in value)
+
+
+def _note_pitch(element: ET.Element) -> tuple[int, float, float]:
+    """Return (diatonic number, pitch space, alter) for an MEI note."""
+    step = _STEP_INDEX.get(element.get("pname", "c").lower(), 0)
+    octave = int(element.get("oct", "4"))
+    alter = _ACCID_ALTER.get(element.get("accid", ""), 0.0)
+    # CRIM unwraps the first <accid> of an editorial <supplied> before import.
+    accids = [
+        child if child.tag == f"{_MEI}accid" else child.find(f"{_MEI}accid")
+        for child in element
+        if child.tag in (f"{_MEI}accid", f"{_MEI}supplied")
+    ]
+    for accid in accids:
+        if accid is None:
+            continue
+        if accid.get("accid.ges") is not None:
+            alter = _ACCID_GES_ALTER.get(accid.get("accid.ges"), alter)
+        elif accid.get("accid") is not None:
+            alter = _ACCID_ALTER.get(accid.get("accid"), alter)
+    if element.get("accid.ges") is not None:
+        alter = _ACCID_GES_ALTER.get(element.get("accid.ges"), alter)
+    diatonic = octave * 7 + step + 1
+    ps = (octave + 1) * 12 + _STEP_SEMITONES[step] + alter
+    return diatonic, ps, alter
+
+
+def _layer_events(
+    element: ET.Element,
+    ppq: int,
+    resolution: int,
+    from_ties: dict[str, str],
+    span_attributes: dict[str, dict[str, str]],
+    tuplet_scale: Fraction = Fraction(1),
+) -> list[tuple[Any, ...]]:
+    """Return one event row per note, rest, or chord in a layer element.
+
+    Rows are (ticks, grace, rest, diatonic, ps, tied, measure rest, chord,
+    tuplet search marker).
+    """
+    events: list[tuple[Any, ...]] = []
+    for child in element:
+        tag = child.tag.removeprefix(_MEI)
+        if tag in _CONTAINER_TAGS:
+            scale = tuplet_scale
+            if tag == "tuplet":
+                scale *= Fraction(
+                    int(child.get("numbase", "1")), int(child.get("num", "1"))
+                )
+            events.extend(
+                _layer_events(child, ppq, resolution, from_ties, span_attributes, scale)
+            )
+            continue
+
+        scale, search = _span_marker(child, span_attributes, tuplet_scale)
+        if tag in _REST_TAGS:
+            ticks = _duration_ticks(child, ppq, resolution, scale)
+            if ticks is None:
+                if tag not in ("mRest", "mSpace"):
+                    continue
+                events.append(
+                    (resolution, False, True, 0, 0.0, False, True, False, None)
+                )
+            else:
+                events.append((ticks, False, True, 0, 0.0, False, False, False, search))
+            continue
+
+        if tag == "note":
+            pitched = [child]
+        elif tag == "chord":
+            pitched = child.findall(f"{_MEI}note")
+        else:
+            continue
+        ticks = _duration_ticks(child, ppq, resolution, scale)
+        if ticks is None or not pitched:
+            continue
+
+        pitches = [_note_pitch(note) for note in pitched]
+        top = max(range(len(pitches)), key=lambda index: (pitches[index][1], -index))
+        diatonic, ps, _ = pitches[top]
+        tied = _is_tie_continuation(child, from_ties) if tag == "chord" else None
+        if tied is None:
+            tied = _is_tie_continuation(pitched[top], from_ties)
+        grace = child.get("grace") is not None
+        events.append(
+            (
+                0 if grace else ticks,
+                grace,
+                False,
+                diatonic,
+                ps,
+                bool(tied),
+                False,
+                tag == "chord",
+                search,
+            )
+        )
+    return events
+
+
+def _iter_score_elements(
+    element: ET.Element, depth: int = 0
+) -> Iterator[tuple[ET.Element, int]]:
+    """Yield the scoreDef and measure elements music21 imports, in order.
+
+    Each element comes with its <section> nesting depth. Like music21's MEI
+    reader, only measures that are direct children of a <section> are read, so
+    alternative endings and editorial apparatus are skipped.
+    """
+    for child in element:
+        if child.tag == f"{_MEI}scoreDef" or (
+            child.tag == f"{_MEI}measure" and element.tag == f"{_MEI}section"
+        ):
+            yield child, depth
+        elif child.tag == f"{_MEI}section":
+            yield from _iter_score_elements(child, depth + 1)
+
+
+def _build_melodic_score(filepath: Path) -> MelodicScore:
+    """Parse an MEI file into CRIM-compatible note sequences and metric grid."""
+    root = ET.parse(filepath).getroot()
+    score = root.find(f".//{_MEI}music//{_MEI}score")
+    if score is None:
+        score = root
+    resolution = _ticks_per_quarter(score)
+    staff_ppq = _staff_ppq(score)
+    from_ties = _tie_attributes(score)
+    span_attributes = _tuplet_span_attributes(score)
+
+    staff_numbers: list[str] = []
+    first_score_def = score.find(f".//{_MEI}scoreDef")
+    if first_score_def is not None:
+        for staff_def in first_score_def.iter(f"{_MEI}staffDef"):
+            if staff_def.get("n") and staff_def.get("n") not in staff_numbers:
+                staff_numbers.append(staff_def.get("n"))
+
+    columns: dict[str, list[list[Any]]] = {}
+    staff_ticks: dict[str, int] = {}
+    signatures: dict[str, list[tuple[int, float, float]]] = {}
+    # Time signatures waiting for the next measure, as (depth, bar, beat).
+    pending_signatures: list[tuple[int, float, float]] = []
+    active_bar: float | None = None
+    sequence = 0
+
+    for element, depth in _iter_score_elements(score):
+        if element.tag == f"{_MEI}scoreDef":
+            if element.get("meter.count") is not None:
+                bar, beat = _time_signature(
+                    element.get("meter.count"), element.get("meter.unit")
+                )
+                pending_signatures.append((depth, bar, beat))
+                active_bar = bar
+            continue
+
+        # Signatures from outer sections are inserted into the measure last,
+        # so they win over inner ones at the same offset.
+        pending_signature = None
+        if pending_signatures:
+            outermost = min(depth for depth, _, _ in pending_signatures)
+            pending_signature = [
+                (bar, beat)
+                for depth, bar, beat in pending_signatures
+                if depth == outermost
+            ][-1]
+            pending_signatures = []
+
+        staves: dict[str, list[list[tuple[Any, ...]]]] = {}
+        for staff in element.findall(f"{_MEI}staff"):
+            staff_n = staff.get("n", "")
+            if staff_n not in staff_numbers:
+                staff_numbers.append(staff_n)
+            staves[staff_n] = [
+                _apply_tuplet_searches(
+                    _layer_events(
+                        layer,
+                        staff_ppq.get(staff_n, 0),
+                        resolution,
+                        from_ties,
+                        span_attributes,
+                    )
+                )
+                for layer in staff.findall(f"{_MEI}layer")
+            ]
+
+        def layer_length(events: list[tuple[Any, ...]], fill: int | None) -> int:
+            return sum(
+                fill if fill is not None and event[6] else event[0] for event in events
+            )
+
+        bar_lengths = [
+            max((layer_length(layer, None) for layer in layers), default=0)
+            for layers in staves.values()
+        ]
+        max_bar = max(bar_lengths, default=0)
+        # music21 gives @dur-less <mRest> elements the length of the longest
+        # staff, or the meter's bar length when every staff is a measure rest.
+        if (
+            max_bar == resolution
+            and active_bar is not None
+            and active_bar * resolution != max_bar
+        ):
+            target = round(active_bar * resolution)
+        else:
+            target = max_bar
+
+        for staff_n in staff_numbers:
+            start = staff_ticks.get(staff_n, 0)
+            if pending_signature is not None:
+                signatures.setdefault(staff_n, []).append((start, *pending_signature))
+            part_columns = columns.setdefault(staff_n, [[] for _ in range(8)])
+            layers = staves.get(staff_n)
+            if layers is None:
+                layers = [[(target, False, True, 0, 0.0, False, True, False, None)]]
+            length = 0
+            for layer in layers:
+                position = start
+                for (
+                    ticks,
+                    grace,
+                    rest,
+                    diatonic,
+                    ps,
+                    tied,
+                    measure_rest,
+                    chord,
+                    _,
+                ) in layer:
+                    for column, value in zip(
+                        part_columns,
+                        (position, grace, rest, diatonic, ps, tied, chord, sequence),
+                        strict=True,
+                    ):
+                        column.append(value)
+                    sequence += 1
+                    position += target if measure_rest else ticks
+                length = max(length, position - start)
+            staff_ticks[staff_n] = start + length
+
+    voices: dict[str, VoiceSequence] = {}
+    for label, staff_n in enumerate(staff_numbers, start=1):
+        ticks, grace, rest, diatonic, ps, tied, chord, order = (
+            np.asarray(column)
+            for column in columns.get(staff_n, [[] for _ in range(8)])
+        )
+        keep = np.zeros(0, dtype=np.int64)
+        if len(ticks):
+            # Sort like music21's flattened part: offset, grace notes first,
+            # then insertion order.
+            sort_order = np.lexsort((order, ~grace.astype(bool), ticks))
+            # CRIM indexes a chord by its top note, whose offset is relative
+            # to the chord (0.0); it keeps the first event at each index value.
+            index_ticks = np.where(chord[sort_order].astype(bool), 0, ticks[sort_order])
+            _, first = np.unique(index_ticks, return_index=True)
+            keep = sort_order[first]
+            ticks = index_ticks[first]
+        voices[str(label)] = VoiceSequence(
+            offset=ticks.astype(np.float64) / resolution,
+            is_rest=rest[keep].astype(bool),
+            diatonic=diatonic[keep].astype(np.int32),
+            ps=ps[keep].astype(np.float64),
+            tied=tied[keep].astype(bool),
+        )
+
+    grids: dict[str, np.ndarray] = {}
+    signature_offsets: dict[str, np.ndarray] = {}
+    beat_durations: dict[str, np.ndarray] = {}
+    for label, staff_n in enumerate(staff_numbers, start=1):
+        part_signatures = signatures.get(staff_n, [])
+        if not part_signatures or part_signatures[0][0] > 0:
+            # music21 assumes 4/4 until the first time signature.
+            part_signatures.insert(0, (0, 4.0, 1.0))
+        signature_ticks = np.array([ticks for ticks, _, _ in part_signatures])
+        bar_ticks = [round(bar * resolution) for _, bar, _ in part_signatures]
+        # CRIM re-barlines each flattened part from its time signatures,
+        # starting a new measure every bar length of the signature in force
+        # at its downbeat.
+        grid: list[int] = []
+        position = 0
+        while position < staff_ticks.get(staff_n, 0) or not grid:
+            grid.append(position)
+            signature_idx = (
+                int(np.searchsorted(signature_ticks, position, side="right")) - 1
+            )
+            position += max(bar_ticks[signature_idx], 1)
+        grids[str(label)] = np.asarray(grid, dtype=np.float64) / resolution
+        signature_offsets[str(label)] = signature_ticks.astype(np.float64) / resolution
+        beat_durations[str(label)] = np.array(
+            [beat for _, _, beat in part_signatures], dtype=np.float64
+        )
+
+    return MelodicScore(
+        voices=voices,
+        measure_starts=grids.get("1", np.zeros(1)),
+        barline_offsets=np.unique(np.concatenate([np.zeros(1), *grids.values()])),
+        time_signature_offsets=signature_offsets,
+        beat_durations=beat_durations,
+    )
+
+
+def load_melodic_score(filepath: Path) -> MelodicScore:
+    """Return the cached native note sequences for an MEI file."""
+    if not filepath.exists():
+        raise FileNotFoundError(f"MEI file not found: {filepath}")
+    return get_score_cache().get_or_load(
+        "melodic_score",
+        filepath,
+        persistent("melodic_score", _build_melodic_score),
+        size_estimate=lambda _, melodic_score: melodic_score.nbytes,
+    )
+
+
+def _normalise_kind(kind: str) -> str:
+    """Return CRIM's single-letter interval kind ('q', 'd', 'z', or 'c')."""
+    kind = kind[0].lower() if kind else "q"
+    kind = {"s": "c"}.get(kind, kind)
+    if kind not in ("q", "d", "z", "c"):
+        raise ValueError(f"Unsupported interval kind: {kind!r}")
+    return kind
+
+
+@lru_cache(maxsize=4096)
+def _interval_label(kind: str, compound: bool, steps: int, semitones: float) -> str:
+    """Return CRIM's directed melodic interval label for one interval."""
+    generic = steps + 1 if steps >= 0 else steps - 1
+    cell = interval.intervalFromGenericAndChromatic(generic, semitones)
+    if kind == "q":
+        if compound:
+            return ImportedPiece._qualityDirectedCompound(cell)
+        return ImportedPiece._qualityDirectedSimple(cell)
+    if kind == "c":
+        return str(cell.semitones) if compound else str(cell.semitones % 12)
+    label = (
+        cell.directedName[1:]
+        if compound
+        else ImportedPiece._noQualityDirectedSemiSimple(cell)
+    )
+    return ImportedPiece._zeroIndexIntervals(label) if kind == "z" else label
+
+
+def _melodic_events(
+    voice: VoiceSequence, combine_unisons: bool | None
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Return the (offset, rest, diatonic, ps) events CRIM measures between."""
+    keep = ~voice.tied
+    offset = voice.offset[keep]
+    is_rest = voice.is_rest[keep]
+    diatonic = voice.diatonic[keep]
+    ps = voice.ps[keep]
+    if combine_unisons is not None and len(offset):
+        # CRIM's notes() drops repeated rests and, optionally, repeated pitches.
+        previous_rest = np.concatenate(([False], is_rest[:-1]))
+        keep = ~(is_rest & previous_rest)
+        offset, is_rest, diatonic, ps = (
+            offset[keep],
+            is_rest[keep],
+            diatonic[keep],
+            ps[keep],
+        )
+        if combine_unisons and len(offset):
+            repeated = np.zeros(len(offset), dtype=bool)
+            repeated[1:] = (
+                ~is_rest[1:]
+                & ~is_rest[:-1]
+                & (diatonic[1:] == diatonic[:-1])
+                & (ps[1:] == ps[:-1])
+            )
+            keep = ~repeated
+            offset, is_rest, diatonic, ps = (
+                offset[keep],
+                is_rest[keep],
+                diatonic[keep],
+                ps[keep],
+            )
+    return offset, is_rest, diatonic, ps
+
+
+def melodic_interval_codes(
+    voice: VoiceSequence,
+    kind: str,
+    compound: bool,
+    combine_unisons: bool | None = None,
+    vocabulary: dict[str, int] | None = None,
+) -> tuple[np.ndarray, np.ndarray, dict[str, int]]:
+    """Return integer-coded melodic intervals for one part.
+
+    Intervals are attached to the offset of their first note, as CRIM does
+    with ``end=False``. Intervals that start or end on a rest get
+    ``REST_CODE``.
+
+    Args:
+        voice: Part note sequence from :func:`load_melodic_score`.
+        kind: Interval kind ('q', 'd', 'z', or 'c').
+        compound: Whether to keep compound intervals.
+        combine_unisons: ``None`` for CRIM's default melodic path, otherwise
+            whether repeated pitches are merged first.
+        vocabulary: Optional label-to-code mapping to extend, so several parts
+            share one code space.
+
+    Returns:
+        Tuple of (offsets, codes, vocabulary).
+    """
+    kind = _normalise_kind(kind)
+    vocabulary = {} if vocabulary is None else vocabulary
+    offset, is_rest, diatonic, ps = _melodic_events(voice, combine_unisons)
+    if len(offset) < 2:
+        return offset[:0], np.zeros(0, dtype=np.int64), vocabulary
+
+    touches_rest = is_rest[:-1] | is_rest[1:]
+    steps = (diatonic[1:] - diatonic[:-1]).astype(np.int64)
+    semitones = ps[1:] - ps[:-1]
+    pairs = np.stack((steps, semitones), axis=1)[~touches_rest]
+    codes = np.full(len(steps), REST_CODE, dtype=np.int64)
+    if len(pairs):
+        unique_pairs, inverse = np.unique(pairs, axis=0, return_inverse=True)
+        unique_codes = np.empty(len(unique_pairs), dtype=np.int64)
+        for index, (step, semitone) in enumerate(unique_pairs.tolist()):
+            label = _interval_label(kind, compound, int(step), semitone)
+            unique_codes[index] = vocabulary.setdefault(label, len(vocabulary))
+        codes[~touches_rest] = unique_codes[inverse.reshape(-1)]
+    return offset[:-1], codes, vocabulary
+
+
+def melodic_ngram_windows(
+    melodic_score: MelodicScore,
+    n: int,
+    kind: str,
+    combine_unisons: bool | None = None,
+    compound: bool = False,
+) -> tuple[dict[str, tuple[np.ndarray, np.ndarray]], list[str]]:
+    """Return the rest-free melodic n-gram windows of every part.
+
+    Returns:
+        Tuple of (per-part ``(offsets, windows)`` where each window row holds
+        ``n`` interval codes, labels indexed by code).
+    """
+    if n < 1:
+        raise ValueError("n must be at least 1")
+    parts, labels = melodic_part_intervals(
+        melodic_score, kind, combine_unisons, compound
+    )
+    part_windows: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+    for label, (offsets, codes) in parts.items():
+        if len(codes) < n:
+            part_windows[label] = (offsets[:0], np.zeros((0, n), dtype=np.int64))
+            continue
+        windows = sliding_window_view(codes, n)
+        valid = np.flatnonzero((windows != REST_CODE).all(axis=1))
+        part_windows[label] = (offsets[valid], windows[valid])
+    return part_windows, labels
+
+
+def melodic_ngram_frame(
+    melodic_score: MelodicScore,
+    n: int,
+    kind: str,
+    combine_unisons: bool | None = None,
+    compound: bool = False,
+) -> pd.DataFrame:
+    """Build a detail-indexed melodic n-gram frame shaped like CRIM's.
+
+    Rows are indexed by (Measure, Beat, Offset) of each n-gram's first note,
+    columns are part labels, and cells are tuples of interval labels or ``""``.
+    N-grams never span a rest.
+    """
+    part_windows, labels = melodic_ngram_windows(
+        melodic_score, n, kind, combine_unisons, compound
+    )
+    label_array = np.empty(len(labels), dtype=object)
+    label_array[:] = labels
+    frame = pd.DataFrame(
+        {
+            label: pd.Series(
+                [tuple(label_array[row].tolist()) for row in windows],
+                index=offsets,
+                dtype=object,
+            )
+            if len(windows)
+            else pd.Series([], index=pd.Index([], dtype=np.float64))
+            for label, (offsets, windows) in part_windows.items()
+        }
+    )
+    frame = frame.sort_index().fillna("")
+    offsets = frame.index.to_numpy(dtype=np.float64)
+    measures, beats = melodic_score.locations(offsets)
+    frame.index = pd.MultiIndex.from_arrays(
+        [measures, beats, offsets], names=["Measure", "Beat", "Offset"]
+    )
+    return frame
+
+
+def count_ngram_range(
+    sequences: list[np.ndarray],
+    labels: list[str],
+    n_min: int,
+    n_max: int,
+) -> dict[int, list[dict[str, Any]]]:
+    """Count n-grams of every length from ``n_min`` to ``n_max`` in one sweep.
+
+    ``sequences`` hold one array of interval codes per part, indexing the
+    distinct ``labels``; ``REST_CODE`` marks intervals that touch a rest.
+    Parts are joined with rest separators so no window spans two parts. The
+    id of each n-gram is derived from the id of its (n-1)-gram prefix and one
+    more code, then re-densified, so every length costs one linear pass.
+
+    Returns:
+        Mapping of n to ranked pattern/count records, in the same form and
+        order as ``count_melodic_ngrams``.
+    """
+    if n_min < 1 or n_max < n_min:
+        raise ValueError("n-gram lengths must satisfy 1 <= n_min <= n_max")
+    separator = np.array([REST_CODE], dtype=np.int64)
+    codes = np.concatenate(
+        [separator]
+        + [
+            part
+            for sequence in sequences
+            for part in (np.asarray(sequence, dtype=np.int64), separator)
+        ]
+    )
+    label_array = np.empty(len(labels), dtype=object)
+    label_array[:] = labels
+    radix = len(labels) + 1
+
+    ids = codes
+    valid = codes != REST_CODE
+    counts_by_n: dict[int, list[dict[str, Any]]] = {}
+    for n in range(1, n_max + 1):
+        if n > 1:
+            tail = codes[n - 1 :]
+            # (prefix id, next code) pairs are unique per pattern; re-densify
+            # so the ids stay below the number of windows.
+            _, ids = np.unique(ids[:-1] * radix + tail + 1, return_inverse=True)
+            ids = ids.reshape(-1)
+            valid = valid[:-1] & (tail != REST_CODE)
+        if n < n_min:
+            continue
+
+        positions = np.flatnonzero(valid)
+        _, first, counts = np.unique(
+            ids[positions], return_index=True, return_counts=True
+        )
+        records = []
+        for start, count in zip(
+            positions[first].tolist(), counts.tolist(), strict=True
+        ):
+            pattern = label_array[codes[start : start + n]].tolist()
+            records.append(
+                {
+                    "pattern": pattern,
+                    "pattern_string": "_".join(pattern),
+                    "count": count,
+                }
+            )
+        records.sort(key=lambda record: (-record["count"], record["pattern_string"]))
+        counts_by_n[n] = records
+    return counts_by_n
+
+
+def melodic_interval_sequences(
+    melodic_score: MelodicScore,
+    kind: str,
+    combine_unisons: bool | None = None,
+    compound: bool = False,
+) -> tuple[list[np.ndarray], list[str]]:
+    """Return per-part interval codes sharing one label vocabulary.
+
+    Returns:
+        Tuple of (codes per part, labels indexed by code).
+    """
+    parts, labels = melodic_part_intervals(
+        melodic_score, kind, combine_unisons, compound
+    )
+    return [codes for _, codes in parts.values()], labels
+
+
+def melodic_part_intervals(
+    melodic_score: MelodicScore,
+    kind: str,
+    combine_unisons: bool | None = None,
+    compound: bool = False,
+) -> tuple[dict[str, tuple[np.ndarray, np.ndarray]], list[str]]:
+    """Return the integer-coded melodic intervals of every part.
+
+    Returns:
+        Tuple of (per-part ``(offsets, codes)`` with ``REST_CODE`` for
+        intervals touching a rest, labels indexed by code).
+    """
+    # CRIM's default melodic path always reports compound intervals.
+    compound = True if combine_unisons is None else compound
+    vocabulary: dict[str, int] = {}
+    parts = {}
+    for label, voice in melodic_score.voices.items():
+        offsets, codes, vocabulary = melodic_interval_codes(
+            voice, kind, compound, combine_unisons, vocabulary
+        )
+        parts[label] = (offsets, codes)
+    return parts, list(vocabulary)
+
+
+def validate_engine(engine: str) -> str:
+    """Return a validated n-gram engine name."""
+    if engine not in ENGINES:
+        raise ValueError(
+            f"Unknown n-gram engine {engine!r}; expected one of {', '.join(ENGINES)}"
+        )
+    return engine
@@ -1,7 +1,15 @@
 """Notation display tool using MCP Apps extension with Verovio."""
 
+import asyncio
+import hashlib
+import json
+import os
+import re
 import xml.etree.ElementTree as ET
+from collections.abc import Callable
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Any
 
 import verovio
 from mcp.types import TextContent
@@ -10,7 +18,11 @@ from fastmcp import Context
 from fastmcp.server.elicitation import CancelledElicitation, DeclinedElicitation
 from fastmcp.tools.tool import ToolResult
 
+from .artifact_store import content_hash, load_artifact
 from .helpers import get_mei_collections, get_mei_filepath, register_uploaded_mei_from_path
+from .prefetch import get_prefetcher
+from .score_cache import ScoreCache, get_score_cache
+from .toolkit_pool import get_toolkit_pool
 
 # Resolve the Verovio resource path from the installed package.
 # The verovio __init__.py sets this via importlib.resources, but that can
@@ -45,16 +57,110 @@ _VEROVIO_OPTIONS = {
     "pageMarginTop": 20,
     "pageMarginBottom": 20,
 }
+_OPTIONS_KEY = json.dumps(_VEROVIO_OPTIONS, sort_keys=True)
+# Libraries whose versions key stored notation pages.
+_VEROVIO_LIBRARIES = ("verovio",)
+_DEFAULT_SVG_CACHE_MB = 64
+
+
+def _svg_budget_from_env() -> int:
+    """Read the rendered-page cache budget in megabytes from ``MCP_SVG_CACHE_MB``."""
+    budget_mb = int(os.environ.get("MCP_SVG_CACHE_MB", str(_DEFAULT_SVG_CACHE_MB)))
+    return max(budget_mb, 0) * 1024 * 1024
+
+
+# In-memory tier for rendered pages and page counts; the artifact store is the
+# disk tier beneath it.
+_SVG_PAGES = ScoreCache(max_bytes=_svg_budget_from_env())
+
+
+# A measure, or a whole <ending> with the measures inside it. Endings are kept
+# or dropped as a unit so that no empty volta is left behind.
+_MEASURE_UNIT_RE = re.compile(
+    r"<ending\b.*?</ending\s*>|<measure\b[^>]*?(?:/>|>.*?</measure\s*>)", re.DOTALL
+)
+_MEASURE_N_RE = re.compile(r"<measure\b[^>]*?\sn\s*=\s*([\"'])(.*?)\1", re.DOTALL)
+# The leading digits of a measure number such as "12a".
+_LEADING_DIGITS_RE = re.compile(r"\s*(\d*)")
+
+
+@dataclass(frozen=True)
+class _MeasureIndex:
+    """An MEI document's text with the span and numbers of each measure unit."""
+
+    text: str
+    spans: list[tuple[int, int]]
+    numbers: list[list[int]]
+
+    def slice(self, start: int, end: int) -> str:
+        """Return the document without measure units outside [start, end].
+
+        Everything between measures, including scoreDef and staffDef changes
+        that take effect before ``start``, is kept verbatim.
+        """
+        parts = []
+        cursor = 0
+        for (span_start, span_end), numbers in zip(
+            self.spans, self.numbers, strict=True
+        ):
+            if not any(start <= n <= end for n in numbers):
+                parts.append(self.text[cursor:span_start])
+                cursor = span_end
+        parts.append(self.text[cursor:])
+        return "".join(parts)
+
+    def has_measures(self, start: int, end: int) -> bool:
+        """Return whether any measure is numbered within [start, end]."""
+        return any(start <= n <= end for numbers in self.numbers for n in numbers)
+
+
+def _build_measure_index(filepath: Path) -> _MeasureIndex:
+    """Find each measure unit in an MEI file without parsing the XML.
+
+    A document with a measure number that is not an integer gets an empty
+    index, so callers fall back to ``_filter_measures``.
+    """
+    text = filepath.read_text(encoding="utf-8")
+    spans = []
+    numbers = []
+    for match in _MEASURE_UNIT_RE.finditer(text):
+        try:
+            unit_numbers = [
+                int(n or 0) for _, n in _MEASURE_N_RE.findall(match.group())
+            ]
+        except ValueError:
+            return _MeasureIndex(text, [], [])
+        spans.append(match.span())
+        numbers.append(unit_numbers or [0])
+    return _MeasureIndex(text, spans, numbers)
+
+
+def _load_measure_index(filepath: Path) -> _MeasureIndex:
+    """Return the cached measure index for an MEI file."""
+    return get_score_cache().get_or_load(
+        "measure_index", filepath, _build_measure_index
+    )
+
+
+def _measure_number(value: str) -> int:
+    """Return the leading integer of a measure number, or 0 if it has none."""
+    return int(_LEADING_DIGITS_RE.match(value).group(1) or 0)
 
 
 def _filter_measures(mei_data: str, start: int, end: int) -> str:
-    """Return MEI XML containing only measures in [start, end]."""
+    """Return MEI XML containing only measures in [start, end].
+
+    Used for documents the text index cannot slice, such as ones with
+    prefixed MEI element names or measure numbers like "12a".
+    """
     root = ET.fromstring(mei_data)
     for section in root.findall(f".//{_MEI_TAG}section"):
-        for measure in section.findall(f"{_MEI_TAG}measure"):
-            n = int(measure.get("n", 0))
-            if n < start or n > end:
-                section.remove(measure)
+        section[:] = [
+            child
+            for child in section
+            if child.tag != f"{_MEI_TAG}measure"
+            or start <= _measure_number(child.get("n", "")) <= end
+        ]
     return '<?xml version="1.0" encoding="UTF-8"?>\n' + ET.tostring(
         root, encoding="unicode"
     )
@@ -62,7 +168,9 @@ def _filter_measures(mei_data: str, start: int, end: int) -> str:
 
 def _create_toolkit(mei_data: str) -> verovio.toolkit:
     """Create a Verovio toolkit loaded with MEI data."""
-    tk = verovio.toolkit()
+    # Fonts are loaded by setResourcePath; the default lookup fails off the
+    # main thread.
+    tk = verovio.toolkit(False)
     tk.setResourcePath(_VEROVIO_RESOURCE_PATH)
     tk.setOptions(_VEROVIO_OPTIONS)
     if not tk.loadData(mei_data):
@@ -74,6 +182,176 @@ def _create_toolkit(mei_data: str) -> verovio.toolkit:
     return tk
 
 
+def _load_toolkit(
+    filepath: Path, start_measure: int | None, end_measure: int | None
+) -> verovio.toolkit:
+    """Create a toolkit for a score, limited to a measure range if given."""
+    if start_measure is None:
+        return _create_toolkit(filepath.read_text(encoding="utf-8"))
+    index = _load_measure_index(filepath)
+    if not index.spans:
+        return _create_toolkit(_filter_measures(index.text, start_measure, end_measure))
+    return _create_toolkit(index.slice(start_measure, end_measure))
+
+
+def _with_toolkit(
+    filepath: Path,
+    start_measure: int | None,
+    end_measure: int | None,
+    use: Callable[[verovio.toolkit], Any],
+) -> Any:
+    """Call ``use`` with the pooled toolkit for a score and measure range."""
+    key = (content_hash(filepath), start_measure, end_measure, _OPTIONS_KEY)
+    with get_toolkit_pool().acquire(
+        key, lambda: _load_toolkit(filepath, start_measure, end_measure)
+    ) as tk:
+        return use(tk)
+
+
+def _layout_params(start_measure: int | None, end_measure: int | None) -> dict:
+    """Return the parameters that determine a score's page layout."""
+    return {
+        "start_measure": start_measure,
+        "end_measure": end_measure,
+        "options": _VEROVIO_OPTIONS,
+    }
+
+
+def _page_count(
+    filepath: Path, start_measure: int | None, end_measure: int | None
+) -> int:
+    """Return the number of pages in a score or measure range."""
+    return _SVG_PAGES.get_or_load(
+        f"page_count:{start_measure}:{end_measure}",
+        filepath,
+        lambda path: load_artifact(
+            "notation_page_count",
+            path,
+            lambda: _with_toolkit(
+                path, start_measure, end_measure, lambda tk: tk.getPageCount()
+            ),
+            fmt="json",
+            params=_layout_params(start_measure, end_measure),
+            libraries=_VEROVIO_LIBRARIES,
+        ),
+        size_estimate=lambda _path, _count: 64,
+    )
+
+
+def _page_svg(
+    filepath: Path, start_measure: int | None, end_measure: int | None, page: int
+) -> str:
+    """Return one rendered page from memory, from disk, or from Verovio."""
+    return _SVG_PAGES.get_or_load(
+        f"svg:{start_measure}:{end_measure}:{page}",
+        filepath,
+        lambda path: load_artifact(
+            "notation_svg",
+            path,
+            lambda: _with_toolkit(
+                path,
+                start_measure,
+                end_measure,
+                lambda tk: _normalise_svg_text(tk.renderToSVG(page)),
+            ),
+            fmt="svg",
+            params={**_layout_params(start_measure, end_measure), "page": page},
+            libraries=_VEROVIO_LIBRARIES,
+        ),
+        size_estimate=lambda _path, svg: len(svg),
+    )
+
+
+def _render_page(
+    filepath: Path, start_measure: int | None, end_measure: int | None, page: int
+) -> tuple[str, int, int]:
+    """Return one page of notation, rendering it only on a cache miss.
+
+    Returns:
+        The normalised SVG, the page rendered after clamping, and the page count.
+    """
+    total_pages = _page_count(filepath, start_measure, end_measure)
+    page = max(1, min(page, total_pages))
+    return _page_svg(filepath, start_measure, end_measure, page), page, total_pages
+
+
+def _prefetch_adjacent_pages(
+    filepath: Path,
+    start_measure: int | None,
+    end_measure: int | None,
+    page: int,
+    total_pages: int,
+) -> None:
+    """Render the pages either side of ``page`` into the cache in the background."""
+    for neighbour in (page + 1, page - 1):
+        if 1 <= neighbour <= total_pages:
+            get_prefetcher().submit(
+                ("svg", str(filepath), start_measure, end_measure, neighbour),
+                lambda neighbour=neighbour: _page_svg(
+                    filepath, start_measure, end_measure, neighbour
+                ),
+            )
+
+
+def _prefetch_next_range(filepath: Path, start_measure: int, end_measure: int) -> None:
+    """Render the first page of the equally long measure range that follows."""
+    next_start = end_measure + 1
+    next_end = end_measure + 1 + (end_measure - start_measure)
+    if not _load_measure_index(filepath).has_measures(next_start, next_end):
+        return
+
+    def render_first_page() -> None:
+        _page_count(filepath, next_start, next_end)
+        _page_svg(filepath, next_start, next_end, 1)
+
+    get_prefetcher().submit(
+        ("svg", str(filepath), next_start, next_end, 1), render_first_page
+    )
+
+
+def _highlight_page_map(
+    filepath: Path,
+    start_measure: int | None,
+    end_measure: int | None,
+    note_ids: list[str],
+) -> dict[str, int]:
+    """Return the page of each note ID, or 0 for IDs not in the layout."""
+    unique_ids = sorted(set(note_ids))
+    digest = hashlib.sha256("\n".join(unique_ids).encode("utf-8")).hexdigest()
+    return _SVG_PAGES.get_or_load(
+        f"highlight_pages:{start_measure}:{end_measure}:{digest}",
+        filepath,
+        lambda path: load_artifact(
+            "notation_highlight_pages",
+            path,
+            lambda: _with_toolkit(
+                path,
+                start_measure,
+                end_measure,
+                lambda tk: {
+                    note_id: tk.getPageWithElement(note_id) for note_id in unique_ids
+                },
+            ),
+            fmt="json",
+            params={**_layout_params(start_measure, end_measure), "note_ids": digest},
+            libraries=_VEROVIO_LIBRARIES,
+        ),
+        size_estimate=lambda _path, pages: 64 * (len(pages) + 1),
+    )
+
+
+def _group_highlights_by_page(
+    note_ids: list[str], page_map: dict[str, int]
+) -> list[dict[str, Any]]:
+    """Return the highlighted note IDs on each page, in page order."""
+    by_page: dict[int, list[str]] = {}
+    for note_id in dict.fromkeys(note_ids):
+        page = page_map.get(note_id, 0)
+        if page:
+            by_page.setdefault(page, []).append(note_id)
+    return [{"page": page, "note_ids": ids} for page, ids in sorted(by_page.items())]
+
+
 def _normalise_svg_text(svg: str) -> str:
     """Replace fragile Unicode text and preserve SVG text spacing."""
     normalised = (
@@ -154,6 +432,21 @@ async def _resolve_notation_filename(
     )
 
 
+async def _resolve_notation_file(
+    filename: str | None, ctx: Context | None
+) -> tuple[str, Path]:
+    """Return the filename and path of the score to render, eliciting if needed."""
+    should_elicit = ctx is not None and (
+        filename is None or not get_mei_filepath(filename).exists()
+    )
+    filename = await _resolve_notation_filename(filename, ctx, should_elicit)
+    filepath = get_mei_filepath(filename)
+
+    if not filepath.exists():
+        raise FileNotFoundError(f"MEI file not found: {filename}")
+    return filename, filepath
+
+
 async def show_notation(
     filename: str | None = None,
     start_measure: int | None = None,
@@ -175,27 +468,19 @@ async def show_notation(
     Returns:
         ToolResult with SVG notation for the MCP App viewer
     """
-    should_elicit = ctx is not None and (
-        filename is None or not get_mei_filepath(filename).exists()
-    )
-    filename = await _resolve_notation_filename(filename, ctx, should_elicit)
-    filepath = get_mei_filepath(filename)
+    filename, filepath = await _resolve_notation_file(filename, ctx)
 
-    if not filepath.exists():
-        raise FileNotFoundError(f"MEI file not found: {filename}")
-
-    mei_data = filepath.read_text(encoding="utf-8")
-
-    if start_measure is not None:
-        if end_measure is None:
-            end_measure = start_measure
-        mei_data = _filter_measures(mei_data, start_measure, end_measure)
+    if start_measure is None:
+        end_measure = None
+    elif end_measure is None:
+        end_measure = start_measure
 
-    tk = _create_toolkit(mei_data)
-    total_pages = tk.getPageCount()
-
-    page = max(1, min(page, total_pages))
-    svg = _normalise_svg_text(tk.renderToSVG(page))
+    # Cache misses lay out on a thread; the pool reuses layouts across pages.
+    with get_prefetcher().foreground():
+        svg, page, total_pages = await asyncio.to_thread(
+            _render_page, filepath, start_measure, end_measure, page
+        )
+    _prefetch_adjacent_pages(filepath, start_measure, end_measure, page, total_pages)
 
     if start_measure is not None:
         measure_text = (
@@ -228,15 +513,44 @@ async def show_notation_highlight(
     highlight_note_ids: list[str],
     start_measure: int | None = None,
     end_measure: int | None = None,
-    page: int = 1,
+    page: int | None = None,
     ctx: Context | None = None,
 ) -> ToolResult:
     """Display notation with a supplied set of highlighted note IDs.
 
     Call this tool once for the requested excerpt and let the widget handle
     navigation across all pages. Avoid making one tool call per page unless
-    the user explicitly asks for a specific page number.
+    the user explicitly asks for a specific page number. Without a page, the
+    page containing the first highlighted note is shown, and
+    ``highlight_pages`` lists the pages that contain highlighted notes.
     """
+    filename, filepath = await _resolve_notation_file(filename, ctx)
+    if start_measure is None:
+        end_measure = None
+    elif end_measure is None:
+        end_measure = start_measure
+
+    page_map: dict[str, int] = {}
+    if highlight_note_ids:
+        with get_prefetcher().foreground():
+            page_map = await asyncio.to_thread(
+                _highlight_page_map,
+                filepath,
+                start_measure,
+                end_measure,
+                highlight_note_ids,
+            )
+    highlight_pages = _group_highlights_by_page(highlight_note_ids, page_map)
+    if page is None:
+        page = next(
+            (
+                page_map[note_id]
+                for note_id in highlight_note_ids
+                if page_map.get(note_id)
+            ),
+            1,
+        )
+
     result = await show_notation(
         filename=filename,
         start_measure=start_measure,
@@ -247,6 +561,20 @@ async def show_notation_highlight(
 
     structured = dict(result.structured_content or {})
     structured["highlight_note_ids"] = highlight_note_ids
+    structured["highlight_pages"] = highlight_pages
+    for entry in highlight_pages:
+        if entry["page"] != structured["page"]:
+            get_prefetcher().submit(
+                ("svg", str(filepath), start_measure, end_measure, entry["page"]),
+                lambda target=entry["page"]: _page_svg(
+                    filepath, start_measure, end_measure, target
+                ),
+            )
+    if "start_measure" in structured:
+        # Highlight workflows tend to step through a piece range by range.
+        _prefetch_next_range(
+            filepath, structured["start_measure"], structured["end_measure"]
+        )
 
     return ToolResult(
         content=result.content,
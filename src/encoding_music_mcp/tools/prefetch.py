@@ -0,0 +1,117 @@
+"""Background prefetching of work a client is likely to request next.
+
+The notation widget pages through a score one page at a time, so after
+serving page k the next request is almost always page k+1 or k-1. Jobs
+submitted here render such pages into the cache on one background thread.
+Jobs only start while no foreground request is running, so they never
+compete with a client for the CPU, and at most ``MCP_PREFETCH_PAGES`` jobs
+are queued at once; further submissions are dropped.
+"""
+
+import os
+from collections.abc import Callable, Hashable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from threading import Condition
+from typing import Any
+
+__all__ = [
+    "Prefetcher",
+    "get_prefetcher",
+]
+
+_DEFAULT_MAX_PENDING = 16
+
+
+class Prefetcher:
+    """Run deduplicated background jobs when no foreground work is running."""
+
+    def __init__(self, max_pending: int):
+        self.max_pending = max_pending
+        self._pending: set[Hashable] = set()
+        self._foreground = 0
+        self._completed = 0
+        self._dropped = 0
+        self._state = Condition()
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="prefetch"
+        )
+
+    @contextmanager
+    def foreground(self) -> Iterator[None]:
+        """Mark a client request as running; queued jobs wait until it ends."""
+        with self._state:
+            self._foreground += 1
+        try:
+            yield
+        finally:
+            with self._state:
+                self._foreground -= 1
+                self._state.notify_all()
+
+    def submit(self, key: Hashable, job: Callable[[], Any]) -> bool:
+        """Queue ``job`` unless the same key is queued or the queue is full.
+
+        Args:
+            key: Identity of the job, used to skip duplicates.
+            job: Callable run on the background thread; its result and any
+                exception are discarded.
+
+        Returns:
+            Whether the job was queued.
+        """
+        with self._state:
+            if key in self._pending:
+                return False
+            if len(self._pending) >= self.max_pending:
+                self._dropped += 1
+                return False
+            self._pending.add(key)
+        self._executor.submit(self._run, key, job)
+        return True
+
+    def _run(self, key: Hashable, job: Callable[[], Any]) -> None:
+        with self._state:
+            self._state.wait_for(lambda: self._foreground == 0)
+        try:
+            job()
+        except Exception:  # noqa: BLE001, S110 - a real request reports it
+            pass
+        finally:
+            with self._state:
+                self._pending.discard(key)
+                self._completed += 1
+                self._state.notify_all()
+
+    def wait_idle(self, timeout: float | None = None) -> bool:
+        """Block until every queued job has finished.
+
+        Returns:
+            ``False`` if ``timeout`` seconds passed first.
+        """
+        with self._state:
+            return self._state.wait_for(lambda: not self._pending, timeout)
+
+    def stats(self) -> dict[str, int]:
+        """Return queue occupancy and job counters."""
+        with self._state:
+            return {
+                "pending": len(self._pending),
+                "completed": self._completed,
+                "dropped": self._dropped,
+                "foreground": self._foreground,
+                "max_pending": self.max_pending,
+            }
+
+
+def _max_pending_from_env() -> int:
+    """Read the prefetch queue limit from ``MCP_PREFETCH_PAGES``."""
+    return int(os.environ.get("MCP_PREFETCH_PAGES", str(_DEFAULT_MAX_PENDING)))
+
+
+_PREFETCHER = Prefetcher(max_pending=_max_pending_from_env())
+
+
+def get_prefetcher() -> Prefetcher:
+    """Return the shared process-wide prefetcher."""
+    return _PREFETCHER
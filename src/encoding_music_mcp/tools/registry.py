@@ -5,13 +5,21 @@ from fastmcp.server.apps import AppConfig
 from ..server import mcp
 from .metadata import get_mei_metadata
 from .discovery import list_available_mei_files
-from .key_analysis import analyze_key
+from .key_analysis import analyze_key, analyze_key_windows
+from .batch import batch_analyze
+from .corpus_index import (
+    find_repeated_melodic_passages,
+    search_melodic_pattern,
+    search_similar_melodic_patterns,
+)
+from .imitation import detect_imitation
 from .intervals import (
     get_notes,
     get_melodic_intervals,
     get_harmonic_intervals,
     get_melodic_ngrams,
     count_melodic_ngrams,
+    count_melodic_ngrams_range,
     resolve_note_ids_for_highlight,
     get_melodic_ngram_matches,
     get_first_occur_melodic_ngrams,
@@ -27,41 +35,53 @@ from .visualisation.voice_ranges import plot_voice_ranges
 from .visualisation.weighted_note_distribution import plot_weighted_note_distribution
 from .visualisation.melodic_ngram_heatmap import plot_melodic_ngram_heatmap
 from .visualisation.sonority_ngram_progress import plot_sonority_ngram_progress
+from .single_flight import coalesce, filename_is_known
+from .worker_pool import offload
 
 # Register all tools here
-# To add a new tool: import it, then add mcp.tool()(your_tool) below
+# To add a new tool: import it, then add mcp.tool()(your_tool) below.
+# Wrap CPU-bound CRIM Intervals and music21 tools in offload(...) so that in
+# HTTP mode they run in the worker process pool, not on the server, and in
+# coalesce(...) so identical concurrent calls share one computation.
 mcp.tool()(list_available_mei_files)
 mcp.tool()(register_mei_file_from_path)
 mcp.tool()(get_mei_metadata)
-mcp.tool()(analyze_key)
-mcp.tool()(get_notes)
-mcp.tool()(get_melodic_intervals)
-mcp.tool()(get_harmonic_intervals)
-mcp.tool()(get_melodic_ngrams)
-mcp.tool()(count_melodic_ngrams)
-mcp.tool()(resolve_note_ids_for_highlight)
-mcp.tool()(get_melodic_ngram_matches)
-mcp.tool()(get_cadences)
+mcp.tool()(coalesce(offload(analyze_key)))
+mcp.tool()(coalesce(offload(analyze_key_windows)))
+mcp.tool()(coalesce(offload(get_notes)))
+mcp.tool()(coalesce(offload(get_melodic_intervals)))
+mcp.tool()(coalesce(offload(get_harmonic_intervals)))
+mcp.tool()(coalesce(offload(get_melodic_ngrams)))
+mcp.tool()(coalesce(offload(count_melodic_ngrams)))
+mcp.tool()(coalesce(offload(count_melodic_ngrams_range, max_concurrency=2)))
+mcp.tool()(coalesce(offload(resolve_note_ids_for_highlight)))
+mcp.tool()(coalesce(offload(get_melodic_ngram_matches)))
+mcp.tool()(coalesce(offload(search_melodic_pattern)))
+mcp.tool()(coalesce(offload(search_similar_melodic_patterns)))
+mcp.tool()(coalesce(offload(find_repeated_melodic_passages)))
+mcp.tool()(coalesce(offload(detect_imitation)))
+mcp.tool()(coalesce(offload(get_cadences, max_concurrency=2, timeout=600)))
+mcp.tool()(batch_analyze)
 mcp.tool(
     app=AppConfig(resource_uri="ui://notation/view.html"),
-)(show_notation)
+)(coalesce(show_notation, shareable=filename_is_known))
 mcp.tool(
     app=AppConfig(resource_uri="ui://notation/highlight.html"),
-)(show_notation_highlight)
+)(coalesce(show_notation_highlight, shareable=filename_is_known))
 mcp.tool(
     app=AppConfig(resource_uri="ui://voice-ranges/view.html"),
-)(plot_voice_ranges)
+)(coalesce(offload(plot_voice_ranges)))
 mcp.tool(
     app=AppConfig(resource_uri="ui://weighted-note-distribution/view.html"),
-)(plot_weighted_note_distribution)
+)(coalesce(offload(plot_weighted_note_distribution)))
 mcp.tool(
     app=AppConfig(resource_uri="ui://melodic-ngram-heatmap/view.html"),
-)(plot_melodic_ngram_heatmap)
+)(coalesce(offload(plot_melodic_ngram_heatmap, max_concurrency=2)))
 mcp.tool(
     app=AppConfig(resource_uri="ui://sonority-ngram-progress/view.html"),
-)(plot_sonority_ngram_progress)
-mcp.tool()(get_first_occur_melodic_ngrams)
+)(coalesce(offload(plot_sonority_ngram_progress, max_concurrency=2)))
+mcp.tool()(coalesce(offload(get_first_occur_melodic_ngrams)))
 mcp.tool()(load_audio_resource)
 mcp.tool(
     app=AppConfig(resource_uri="ui://play_excerpt/v2.html"),
-)(play_excerpt)
+)(coalesce(play_excerpt, shareable=filename_is_known))
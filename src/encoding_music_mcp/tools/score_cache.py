@@ -0,0 +1,170 @@
+"""Process-wide cache for parsed scores and per-score analysis artifacts."""
+
+import os
+from collections import OrderedDict
+from collections.abc import Callable
+from concurrent.futures import Future
+from pathlib import Path
+from threading import Lock
+from typing import Any
+
+__all__ = [
+    "ScoreCache",
+    "file_fingerprint",
+    "get_score_cache",
+]
+
+_DEFAULT_BUDGET_MB = 512
+
+
+def file_fingerprint(filepath: Path) -> tuple[str, int, int]:
+    """Return a cache key that changes whenever the file on disk changes.
+
+    The key combines the resolved path with the modification time and size, so
+    re-registered uploads and edited files are parsed again rather than served
+    from a stale entry.
+    """
+    resolved = Path(filepath).resolve()
+    try:
+        stat = resolved.stat()
+    except FileNotFoundError as exc:
+        raise FileNotFoundError(f"MEI file not found: {filepath}") from exc
+    return str(resolved), stat.st_mtime_ns, stat.st_size
+
+
+class ScoreCache:
+    """LRU cache of per-file artifacts bounded by an approximate memory budget.
+
+    Entries are keyed by an artifact ``kind`` (for example ``"crim_piece"``)
+    and the file fingerprint. Each entry carries an estimated size in bytes;
+    least recently used entries are evicted once the total exceeds the budget.
+    Threads that miss on an entry another thread is already loading wait for
+    that load rather than repeating it.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[
+            tuple[str, tuple[str, int, int]], tuple[Any, int]
+        ] = OrderedDict()
+        self._loading: dict[tuple[str, tuple[str, int, int]], Future[Any]] = {}
+        self._total_bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = Lock()
+
+    def get_or_load(
+        self,
+        kind: str,
+        filepath: Path,
+        loader: Callable[[Path], Any],
+        size_estimate: Callable[[Path, Any], int] | None = None,
+    ) -> Any:
+        """Return the cached artifact for a file, loading it on a miss.
+
+        Args:
+            kind: Name of the artifact, so several artifacts can share a file.
+            filepath: Path of the score the artifact is derived from.
+            loader: Callable that builds the artifact from ``filepath``.
+            size_estimate: Optional callable returning the approximate size in
+                bytes of a loaded artifact. Defaults to the file size.
+
+        Returns:
+            The cached or newly loaded artifact.
+        """
+        fingerprint = file_fingerprint(filepath)
+        key = (kind, fingerprint)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry[0]
+            loading = self._loading.get(key)
+            if loading is None:
+                self._misses += 1
+                loading = self._loading[key] = Future()
+                owner = True
+            else:
+                self._hits += 1
+                owner = False
+        if not owner:
+            return loading.result()
+
+        try:
+            value = loader(filepath)
+            size = size_estimate(filepath, value) if size_estimate else fingerprint[2]
+            self._store(key, value, max(int(size), 1))
+        except BaseException as exc:
+            with self._lock:
+                del self._loading[key]
+            loading.set_exception(exc)
+            raise
+        with self._lock:
+            del self._loading[key]
+        loading.set_result(value)
+        return value
+
+    def _store(
+        self,
+        key: tuple[str, tuple[str, int, int]],
+        value: Any,
+        size: int,
+    ) -> None:
+        """Insert an entry and evict older entries that exceed the budget."""
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._total_bytes -= previous[1]
+
+            # Drop stale fingerprints for the same file and artifact kind.
+            kind, (path, _, _) = key
+            for stale_key in [
+                existing
+                for existing in self._entries
+                if existing[0] == kind and existing[1][0] == path
+            ]:
+                self._total_bytes -= self._entries.pop(stale_key)[1]
+
+            self._entries[key] = (value, size)
+            self._total_bytes += size
+            while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted_size
+                self._evictions += 1
+
+    def stats(self) -> dict[str, int]:
+        """Return hit, miss, eviction, and occupancy counters."""
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "entries": len(self._entries),
+                "estimated_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def clear(self) -> None:
+        """Remove every entry and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+            self._hits = 0
+            self._misses = 0
+            self._evictions = 0
+
+
+def _budget_from_env() -> int:
+    """Read the cache budget in megabytes from ``MCP_SCORE_CACHE_MB``."""
+    budget_mb = int(os.environ.get("MCP_SCORE_CACHE_MB", str(_DEFAULT_BUDGET_MB)))
+    return max(budget_mb, 0) * 1024 * 1024
+
+
+_SCORE_CACHE = ScoreCache(max_bytes=_budget_from_env())
+
+
+def get_score_cache() -> ScoreCache:
+    """Return the shared process-wide score cache."""
+    return _SCORE_CACHE
@@ -0,0 +1,122 @@
+"""Single-flight coalescing of identical in-flight tool calls.
+
+Widget re-mounts, client retries, and several users opening the same piece
+often send the same tool call while the first is still running. Tools wrapped
+with :func:`coalesce` share one computation between such calls: the first
+caller starts it, and identical calls that arrive before it finishes await the
+same result. Nothing is cached once the computation completes.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import inspect
+import json
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any
+
+from fastmcp import Context
+from fastmcp.utilities.types import find_kwarg_by_type
+
+from .helpers import get_mei_filepath
+
+__all__ = ["coalesce", "filename_is_known", "in_flight_count"]
+
+
+@dataclass
+class _Flight:
+    """A shared computation and the number of callers awaiting it."""
+
+    task: asyncio.Future[Any]
+    waiters: int = 0
+
+
+_IN_FLIGHT: dict[tuple[str, str], _Flight] = {}
+
+
+def in_flight_count() -> int:
+    """Return the number of distinct computations currently being shared."""
+    return len(_IN_FLIGHT)
+
+
+def filename_is_known(arguments: dict[str, Any]) -> bool:
+    """Return whether a call names an existing score, so needs no elicitation.
+
+    Tools that ask the user to choose a score when ``filename`` is missing or
+    unknown must not share that conversation with another client.
+    """
+    filename = arguments.get("filename")
+    return filename is not None and get_mei_filepath(filename).exists()
+
+
+def _flight_key(
+    name: str, arguments: dict[str, Any], context_parameter: str | None
+) -> tuple[str, str]:
+    """Return the key identifying calls that can share one computation."""
+    shared = {
+        parameter: value
+        for parameter, value in arguments.items()
+        if parameter != context_parameter
+    }
+    return name, json.dumps(shared, sort_keys=True, default=repr)
+
+
+async def _join(flight: _Flight) -> Any:
+    """Await a shared computation, cancelling it when every caller has left."""
+    flight.waiters += 1
+    try:
+        return await asyncio.shield(flight.task)
+    finally:
+        flight.waiters -= 1
+        if flight.waiters == 0 and not flight.task.done():
+            flight.task.cancel()
+
+
+def coalesce(
+    fn: Callable[..., Awaitable[Any]],
+    shareable: Callable[[dict[str, Any]], bool] | None = None,
+) -> Callable[..., Awaitable[Any]]:
+    """Wrap an async tool so identical concurrent calls share one computation.
+
+    Calls are identical when they have the same tool name and the same
+    arguments after defaults are applied; an MCP context argument is ignored.
+    The computation is cancelled only when every caller awaiting it has been
+    cancelled, so one client's cancellation does not fail the others.
+
+    Args:
+        fn: Async tool function, such as one returned by ``offload``.
+        shareable: Optional predicate on the bound arguments; calls for which
+            it returns ``False`` always run on their own.
+
+    Returns:
+        Async tool function with the same name, docstring, and signature.
+    """
+    signature = inspect.signature(fn)
+    context_parameter = find_kwarg_by_type(fn, Context)
+
+    @functools.wraps(fn)
+    async def run_tool(*args: Any, **kwargs: Any) -> Any:
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        if shareable is not None and not shareable(bound.arguments):
+            return await fn(*args, **kwargs)
+
+        key = _flight_key(fn.__name__, bound.arguments, context_parameter)
+        flight = _IN_FLIGHT.get(key)
+        if flight is None or flight.task.get_loop() is not asyncio.get_running_loop():
+            flight = _Flight(asyncio.ensure_future(fn(*args, **kwargs)))
+            _IN_FLIGHT[key] = flight
+
+            def _land(task: asyncio.Future[Any], key=key, flight=flight) -> None:
+                if _IN_FLIGHT.get(key) is flight:
+                    del _IN_FLIGHT[key]
+                if not task.cancelled():
+                    # Mark the outcome as retrieved even if every caller left.
+                    task.exception()
+
+            flight.task.add_done_callback(_land)
+        return await _join(flight)
+
+    return run_tool
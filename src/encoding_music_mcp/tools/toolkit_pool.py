@@ -0,0 +1,118 @@
+"""Pool of loaded Verovio toolkits shared between notation requests.
+
+Loading an MEI file into Verovio and laying it out costs far more than
+rendering one page of the result, so toolkits are kept loaded between calls
+and reused for later pages of the same score and measure range. Each toolkit
+is used by one thread at a time, and the least recently used toolkits are
+dropped once more than ``MCP_VEROVIO_TOOLKITS`` are resident.
+"""
+
+import os
+from collections import OrderedDict
+from collections.abc import Callable, Hashable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Any
+
+__all__ = [
+    "ToolkitPool",
+    "get_toolkit_pool",
+]
+
+_DEFAULT_MAX_TOOLKITS = 8
+
+
+@dataclass
+class _PooledToolkit:
+    """A toolkit slot, loaded lazily under its own lock."""
+
+    toolkit: Any = None
+    lock: Lock = field(default_factory=Lock)
+
+
+class ToolkitPool:
+    """LRU pool of loaded toolkits, each guarded by its own lock.
+
+    Keys identify everything that affects a toolkit's layout, such as the
+    score's content hash, the measure range, and the rendering options.
+    """
+
+    def __init__(self, max_toolkits: int):
+        self.max_toolkits = max_toolkits
+        self._entries: OrderedDict[Hashable, _PooledToolkit] = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = Lock()
+
+    @contextmanager
+    def acquire(self, key: Hashable, load: Callable[[], Any]) -> Iterator[Any]:
+        """Hold the toolkit for ``key``, loading it on a miss.
+
+        Concurrent callers with the same key wait for one load and then take
+        turns; callers with different keys do not block each other. A toolkit
+        evicted while in use stays valid until it is released.
+
+        Args:
+            key: Hashable identity of the loaded toolkit.
+            load: Callable returning a newly loaded toolkit.
+
+        Yields:
+            The loaded toolkit, for exclusive use inside the ``with`` block.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = _PooledToolkit()
+                self._entries[key] = entry
+                self._misses += 1
+                while len(self._entries) > max(self.max_toolkits, 0):
+                    self._entries.popitem(last=False)
+                    self._evictions += 1
+            else:
+                self._entries.move_to_end(key)
+                self._hits += 1
+
+        with entry.lock:
+            if entry.toolkit is None:
+                try:
+                    entry.toolkit = load()
+                except BaseException:
+                    with self._lock:
+                        if self._entries.get(key) is entry:
+                            del self._entries[key]
+                    raise
+            yield entry.toolkit
+
+    def stats(self) -> dict[str, int]:
+        """Return hit, miss, eviction, and occupancy counters."""
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "toolkits": len(self._entries),
+                "max_toolkits": self.max_toolkits,
+            }
+
+    def clear(self) -> None:
+        """Drop every pooled toolkit and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._hits = 0
+            self._misses = 0
+            self._evictions = 0
+
+
+def _max_toolkits_from_env() -> int:
+    """Read the resident toolkit cap from ``MCP_VEROVIO_TOOLKITS``."""
+    return int(os.environ.get("MCP_VEROVIO_TOOLKITS", str(_DEFAULT_MAX_TOOLKITS)))
+
+
+_TOOLKIT_POOL = ToolkitPool(max_toolkits=_max_toolkits_from_env())
+
+
+def get_toolkit_pool() -> ToolkitPool:
+    """Return the shared process-wide toolkit pool."""
+    return _TOOLKIT_POOL
@@ -8,12 +8,7 @@ from fastmcp.tools.tool import ToolResult
 from mcp.types import TextContent
 
 from ..helpers import get_mei_filepath
-from ..intervals import (
-    _build_note_id_matches,
-    _build_part_note_events,
-    _count_patterns,
-    _load_melodic_ngram_dataframe,
-)
+from ..intervals import _load_score_index, _melodic_ngram_analysis
 from ..metadata import get_mei_metadata
 
 __all__ = ["plot_melodic_ngram_heatmap"]
@@ -66,27 +61,28 @@ def _build_score_payload(
     entries: bool,
     combine_unisons: bool | None,
     compound: bool,
+    engine: str = "crim",
 ) -> dict[str, Any]:
     """Build n-gram counts, matches, and staff rows for one score."""
     filepath = get_mei_filepath(filename)
     metadata = get_mei_metadata(filename)
-    mel_ngrams = _load_melodic_ngram_dataframe(
+    analysis = _melodic_ngram_analysis(
         filepath,
         n=n,
         kind=kind,
         entries=entries,
         combine_unisons=combine_unisons,
         compound=compound,
+        engine=engine,
     )
-    part_events = _build_part_note_events(filepath)
+    score_index = _load_score_index(filepath)
 
     rows: list[dict[str, Any]] = []
-    for staff in sorted(part_events.keys(), key=lambda value: int(value) if value.isdigit() else value):
-        events = part_events[staff]
-        end_q = max(
-            (float(event["offset"]) + float(event["duration"]) for event in events),
-            default=0.0,
-        )
+    for staff in sorted(
+        score_index.parts.keys(),
+        key=lambda value: int(value) if value.isdigit() else value,
+    ):
+        end_q = score_index.parts[staff].end_q
         rows.append(
             {
                 "id": f"{filename}::{staff}",
@@ -103,8 +99,8 @@ def _build_score_payload(
         "title": metadata.get("title") or filename,
         "composer": metadata.get("composer"),
         "rows": rows,
-        "pattern_counts": _count_patterns(mel_ngrams),
-        "matches": _build_note_id_matches(filepath, mel_ngrams, n),
+        "pattern_counts": analysis["pattern_counts"],
+        "matches": analysis["matches"],
     }
 
 
@@ -117,6 +113,7 @@ def _build_heatmap_payload(
     top_n: int,
     combine_unisons: bool | None,
     compound: bool,
+    engine: str = "crim",
 ) -> dict[str, Any]:
     """Build the structured payload consumed by the heatmap app."""
     if n < 1:
@@ -133,6 +130,7 @@ def _build_heatmap_payload(
             entries=entries,
             combine_unisons=combine_unisons,
             compound=compound,
+            engine=engine,
         )
         for score_filename in resolved_filenames
     ]
@@ -222,6 +220,7 @@ def _build_heatmap_payload(
         "top_n": top_n,
         "combine_unisons": combine_unisons,
         "compound": compound,
+        "engine": engine,
         "patterns": patterns,
         "rows": rows,
         "occurrences": occurrences,
@@ -239,13 +238,15 @@ def plot_melodic_ngram_heatmap(
     top_n: int = 2,
     combine_unisons: bool | None = None,
     compound: bool = False,
+    engine: str = "crim",
 ) -> ToolResult:
     """Plot top melodic n-gram occurrences as per-staff timeline rectangles.
 
     The tool ranks melodic n-gram patterns by total occurrence count across all
     supplied scores, keeps the top ``top_n`` patterns, and returns one heatmap
     row for every staff/part in every score. Each occurrence is drawn from its
-    start offset to the end offset of the matched pattern.
+    start offset to the end offset of the matched pattern. ``engine="numpy"``
+    computes the n-grams natively from the MEI instead of through CRIM.
     """
     structured = _build_heatmap_payload(
         filename=filename,
@@ -256,6 +257,7 @@ def plot_melodic_ngram_heatmap(
         top_n=top_n,
         combine_unisons=combine_unisons,
         compound=compound,
+        engine=engine,
     )
 
     description = (
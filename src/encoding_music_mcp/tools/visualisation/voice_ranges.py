@@ -10,7 +10,9 @@ from typing import Any
 from fastmcp.tools.tool import ToolResult
 from mcp.types import TextContent
 
-from ..intervals import get_notes
+from ..artifact_store import load_artifact
+from ..helpers import get_mei_filepath
+from ..intervals import _CRIM_LIBRARIES, get_notes
 from ..metadata import get_mei_metadata
 
 __all__ = ["plot_voice_ranges"]
@@ -51,6 +53,21 @@ def _midi_to_note_name(midi: int) -> str:
 
 def _extract_staff_ranges(filename: str) -> tuple[dict[str, Any], list[dict[str, Any]]]:
     """Return score metadata and per-staff pitch-range summaries."""
+    stored = load_artifact(
+        "voice_ranges",
+        get_mei_filepath(filename),
+        lambda: list(_compute_staff_ranges(filename)),
+        fmt="json",
+        params={"filename": filename},
+        libraries=_CRIM_LIBRARIES,
+    )
+    return stored[0], stored[1]
+
+
+def _compute_staff_ranges(
+    filename: str,
+) -> tuple[dict[str, Any], list[dict[str, Any]]]:
+    """Derive score metadata and per-staff pitch ranges from the notes table."""
     notes_payload = get_notes(filename)
     notes_csv = notes_payload["notes"]
     metadata_payload = get_mei_metadata(filename)
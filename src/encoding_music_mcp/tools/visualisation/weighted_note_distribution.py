@@ -3,13 +3,25 @@
 from __future__ import annotations
 
 import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from fractions import Fraction
+from pathlib import Path
 from typing import Any
 
+import numpy as np
 from fastmcp.tools.tool import ToolResult
 from mcp.types import TextContent
 
+from ..artifact_store import persistent
 from ..helpers import get_mei_filepath
 from ..metadata import get_mei_metadata
+from ..ngram_engine import (
+    _MIN_TICKS_PER_QUARTER,
+    _duration_ticks,
+    _staff_ppq,
+    _ticks_per_quarter,
+)
+from ..score_cache import get_score_cache
 
 __all__ = ["plot_weighted_note_distribution"]
 
@@ -56,6 +68,7 @@ _PITCH_CLASS_LABELS = {
     10: "B-",
     11: "B",
 }
+_PITCH_CLASS_INDEX = {label: index for index, label in _PITCH_CLASS_LABELS.items()}
 _PITCH_CLASS_BASES = {
     "c": 0,
     "d": 2,
@@ -107,28 +120,62 @@ def _note_pitch_class(note: ET.Element) -> str | None:
     if not pname:
         return None
 
-    accidental = note.get("accid.ges") or note.get("accid")
+    # Like music21, gestural accidentals win over written ones, and a child
+    # <accid> element over the note's own @accid.
+    accidental = note.get("accid.ges")
+    accid_element = note.find("mei:accid", _MEI_NS)
+    if not accidental and accid_element is not None:
+        accidental = accid_element.get("accid.ges") or accid_element.get("accid")
     if not accidental:
-        accid_element = note.find("mei:accid", _MEI_NS)
-        accidental = accid_element.get("accid") if accid_element is not None else None
+        accidental = note.get("accid")
 
     semitone = (_PITCH_CLASS_BASES[pname.lower()] + _accidental_offset(accidental)) % 12
     return _PITCH_CLASS_LABELS[semitone]
 
 
-def _iter_weighted_events(element: ET.Element) -> list[tuple[int, list[str]]]:
+def _event_weight(
+    element: ET.Element, ppq: int, resolution: int, tuplet_scale: Fraction
+) -> float | None:
+    """Return a note or chord's duration weight, or ``None`` when it has none.
+
+    ``@dur.ppq`` is used when present. Otherwise the weight is read from
+    ``@dur``, ``@dots``, and enclosing tuplets and expressed in the staff's
+    ``@ppq`` (or in ``resolution`` ticks per quarter when the score declares
+    none), so scores encoded without ``@dur.ppq`` are weighted on one scale.
+    """
+    dur_ppq = element.get("dur.ppq")
+    if dur_ppq is not None:
+        return int(dur_ppq)
+    if element.get("grace") is not None:
+        return None
+    ticks = _duration_ticks(element, ppq, resolution, tuplet_scale)
+    if ticks is None:
+        return None
+    return ticks * (ppq or resolution) / resolution
+
+
+def _iter_weighted_events(
+    element: ET.Element,
+    ppq: int = 0,
+    resolution: int = _MIN_TICKS_PER_QUARTER,
+    tuplet_scale: Fraction = Fraction(1),
+) -> list[tuple[float, list[str]]]:
     """Flatten one MEI layer subtree into duration/pitch-class events."""
     tag = element.tag.rsplit("}", 1)[-1]
 
     if tag in {"beam", "tuplet", "bTrem", "fTrem"}:
-        events: list[tuple[int, list[str]]] = []
+        if tag == "tuplet":
+            tuplet_scale *= Fraction(
+                int(element.get("numbase", "1")), int(element.get("num", "1"))
+            )
+        events: list[tuple[float, list[str]]] = []
         for child in list(element):
-            events.extend(_iter_weighted_events(child))
+            events.extend(_iter_weighted_events(child, ppq, resolution, tuplet_scale))
         return events
 
     if tag == "chord":
-        dur_ppq = element.get("dur.ppq")
-        if dur_ppq is None:
+        weight = _event_weight(element, ppq, resolution, tuplet_scale)
+        if weight is None:
             return []
 
         pitch_classes = [
@@ -138,14 +185,14 @@ def _iter_weighted_events(element: ET.Element) -> list[tuple[int, list[str]]]:
         ]
         if not pitch_classes:
             return []
-        return [(int(dur_ppq), pitch_classes)]
+        return [(weight, pitch_classes)]
 
     if tag == "note":
-        dur_ppq = element.get("dur.ppq")
+        weight = _event_weight(element, ppq, resolution, tuplet_scale)
         pitch_class = _note_pitch_class(element)
-        if dur_ppq is None or pitch_class is None:
+        if weight is None or pitch_class is None:
             return []
-        return [(int(dur_ppq), [pitch_class])]
+        return [(weight, [pitch_class])]
 
     return []
 
@@ -181,41 +228,184 @@ def _resolve_filenames(
     return deduped
 
 
+@dataclass(frozen=True)
+class _PitchClassTable:
+    """Cumulative pitch-class durations and note counts of one score.
+
+    Row ``m`` of each array holds the totals of the first ``m`` measures in
+    document order, per staff and pitch class, so the totals of any run of
+    measures are the difference of two rows.
+
+    Attributes:
+        staves: Staff ``n`` values in order of first appearance.
+        measure_numbers: Measure ``n`` values in document order, or 0 for
+            measures whose ``n`` is not numeric.
+        numbered: Whether each measure has a numeric ``n``.
+        durations: Cumulative duration weights (see ``_event_weight``), shaped
+            (measures + 1, staves, 12).
+        counts: Cumulative note counts with the same shape.
+    """
+
+    staves: list[str]
+    measure_numbers: np.ndarray
+    numbered: np.ndarray
+    durations: np.ndarray
+    counts: np.ndarray
+
+    @property
+    def nbytes(self) -> int:
+        """Return the memory held by the table arrays."""
+        return (
+            self.measure_numbers.nbytes
+            + self.numbered.nbytes
+            + self.durations.nbytes
+            + self.counts.nbytes
+        )
+
+    def measure_label(self, row: int) -> int | None:
+        """Return the ``n`` of the measure in a row, or ``None`` if not numeric."""
+        return int(self.measure_numbers[row]) if self.numbered[row] else None
+
+    def window(
+        self, start_measure: int | None, end_measure: int | None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Return (durations, counts) per staff for measures in the window.
+
+        Measures are selected by their ``n`` attribute, inclusively, as in
+        ``show_notation``. ``None`` leaves that side of the window open.
+        Measures without a numeric ``n`` cannot be placed in a bounded window,
+        so they only count when both sides are open.
+        """
+        numbers = self.measure_numbers
+        selected = np.ones(len(numbers), dtype=bool)
+        if start_measure is not None or end_measure is not None:
+            selected &= self.numbered
+        if start_measure is not None:
+            selected &= numbers >= start_measure
+        if end_measure is not None:
+            selected &= numbers <= end_measure
+        # Each run of selected measures costs one subtraction; scores number
+        # measures in order, so a window is usually a single run.
+        edges = np.flatnonzero(
+            np.diff(np.concatenate(([0], selected.view(np.int8), [0])))
+        )
+        firsts, lasts = edges[0::2], edges[1::2]
+        return (
+            (self.durations[lasts] - self.durations[firsts]).sum(axis=0),
+            (self.counts[lasts] - self.counts[firsts]).sum(axis=0),
+        )
+
+
+def _measure_number(measure: ET.Element) -> int | None:
+    """Return a measure's ``n`` value, or ``None`` when it is not numeric."""
+    n = measure.get("n", "")
+    return int(n) if n.lstrip("-").isdigit() else None
+
+
+def _build_pitch_class_table(filepath: Path) -> _PitchClassTable:
+    """Walk an MEI file once and accumulate its pitch-class table."""
+    root = ET.parse(filepath).getroot()
+    score = root.find(".//mei:score", _MEI_NS)
+    staff_ppq = _staff_ppq(score) if score is not None else {}
+    resolution = _ticks_per_quarter(score) if score is not None else 1
+
+    staves: dict[str, int] = {}
+    measure_numbers: list[int | None] = []
+    rows: list[int] = []
+    staff_indices: list[int] = []
+    pitch_classes: list[int] = []
+    weights: list[float] = []
+    for position, measure in enumerate(root.findall(".//mei:measure", _MEI_NS), 1):
+        measure_numbers.append(_measure_number(measure))
+        for staff in measure.findall("mei:staff", _MEI_NS):
+            staff_n = staff.get("n", "?")
+            staff_index = staves.setdefault(staff_n, len(staves))
+            ppq = staff_ppq.get(staff_n, 0)
+            for layer in staff.findall("mei:layer", _MEI_NS):
+                for child in list(layer):
+                    for weight, labels in _iter_weighted_events(child, ppq, resolution):
+                        for pitch_class in labels:
+                            rows.append(position)
+                            staff_indices.append(staff_index)
+                            pitch_classes.append(_PITCH_CLASS_INDEX[pitch_class])
+                            weights.append(weight)
+
+    shape = (len(measure_numbers) + 1, len(staves), 12)
+    durations = np.zeros(shape, dtype=np.float64)
+    counts = np.zeros(shape, dtype=np.int64)
+    index = (np.array(rows, dtype=np.int64), staff_indices, pitch_classes)
+    np.add.at(durations, index, np.array(weights, dtype=np.float64))
+    np.add.at(counts, index, 1)
+    return _PitchClassTable(
+        staves=list(staves),
+        measure_numbers=np.array(
+            [0 if number is None else number for number in measure_numbers],
+            dtype=np.int64,
+        ),
+        numbered=np.array(
+            [number is not None for number in measure_numbers], dtype=bool
+        ),
+        durations=np.cumsum(durations, axis=0),
+        counts=np.cumsum(counts, axis=0),
+    )
+
+
+def _load_pitch_class_table(filepath: Path) -> _PitchClassTable:
+    """Return the cached pitch-class table for an MEI file."""
+    return get_score_cache().get_or_load(
+        "pitch_class_table",
+        filepath,
+        persistent("pitch_class_table", _build_pitch_class_table, version=3),
+        size_estimate=lambda _, table: table.nbytes,
+    )
+
+
 def _build_score_groups(
     filename: str,
     group_by_staff: bool,
+    start_measure: int | None = None,
+    end_measure: int | None = None,
 ) -> tuple[dict[str, Any], dict[str, dict[str, float]], dict[str, int]]:
-    """Compute weighted pitch-class totals for one score."""
+    """Compute weighted pitch-class totals for one score or measure window."""
     filepath = get_mei_filepath(filename)
     if not filepath.exists():
         raise FileNotFoundError(f"MEI file not found: {filename}")
 
     metadata = get_mei_metadata(filename)
-    root = ET.parse(filepath).getroot()
+    table = _load_pitch_class_table(filepath)
+    durations, counts = table.window(start_measure, end_measure)
+
+    title = metadata.get("title") or filename
+    if group_by_staff:
+        groups = [
+            (f"{title} - Staff {staff_n}", durations[index], counts[index])
+            for index, staff_n in enumerate(table.staves)
+        ]
+    elif table.staves:
+        groups = [(title, durations.sum(axis=0), counts.sum(axis=0))]
+    else:
+        groups = []
 
     group_totals: dict[str, dict[str, float]] = {}
     note_counts: dict[str, int] = {}
-    for measure in root.findall(".//mei:measure", _MEI_NS):
-        for staff in measure.findall("mei:staff", _MEI_NS):
-            staff_n = staff.get("n", "?")
-            if group_by_staff:
-                group_label = f"{metadata.get('title') or filename} - Staff {staff_n}"
-            else:
-                group_label = metadata.get("title") or filename
-            totals = group_totals.setdefault(
-                group_label,
-                {pitch_class: 0.0 for pitch_class in _PITCH_CLASS_LABELS.values()},
+    for group_label, weights, group_counts in groups:
+        group_totals[group_label] = {
+            _PITCH_CLASS_LABELS[index]: weight
+            for index, weight in enumerate(weights.tolist())
+        }
+        note_counts[group_label] = int(group_counts.sum())
+
+    if not group_totals or all(
+        sum(values.values()) == 0 for values in group_totals.values()
+    ):
+        if start_measure is not None or end_measure is not None:
+            window = (
+                f"{'start' if start_measure is None else start_measure}-"
+                f"{'end' if end_measure is None else end_measure}"
+            )
+            raise ValueError(
+                f"No sounding notes found in measures {window} of MEI file: {filename}"
             )
-            note_counts.setdefault(group_label, 0)
-
-            for layer in staff.findall("mei:layer", _MEI_NS):
-                for child in list(layer):
-                    for dur_ppq, pitch_classes in _iter_weighted_events(child):
-                        for pitch_class in pitch_classes:
-                            totals[pitch_class] += float(dur_ppq)
-                            note_counts[group_label] += 1
-
-    if not group_totals or all(sum(values.values()) == 0 for values in group_totals.values()):
         raise ValueError(f"No sounding notes found in MEI file: {filename}")
 
     metadata_payload = {
@@ -232,10 +422,18 @@ def _build_weighted_note_payload(
     pitch_class_order: str,
     group_by_staff: bool,
     limit_to_active: bool,
+    start_measure: int | None = None,
+    end_measure: int | None = None,
 ) -> dict[str, Any]:
     """Compute score-level or staff-level weighted pitch-class summaries."""
     resolved_filenames = _resolve_filenames(filename, filenames)
     order = _order_for_name(pitch_class_order)
+    if (
+        start_measure is not None
+        and end_measure is not None
+        and start_measure > end_measure
+    ):
+        raise ValueError("start_measure must not be greater than end_measure")
 
     score_metadata: list[dict[str, Any]] = []
     group_totals: dict[str, dict[str, float]] = {}
@@ -245,6 +443,8 @@ def _build_weighted_note_payload(
         metadata_payload, score_groups, score_counts = _build_score_groups(
             filename=score_filename,
             group_by_staff=group_by_staff,
+            start_measure=start_measure,
+            end_measure=end_measure,
         )
         score_metadata.append(metadata_payload)
         group_totals.update(score_groups)
@@ -291,7 +491,7 @@ def _build_weighted_note_payload(
         }
         composer = ", ".join(sorted(composers)) if composers else None
 
-    return {
+    payload = {
         "filename": resolved_filenames[0],
         "filenames": resolved_filenames,
         "score_count": len(score_metadata),
@@ -305,6 +505,10 @@ def _build_weighted_note_payload(
         "radial_max": radial_max,
         "traces": traces,
     }
+    if start_measure is not None or end_measure is not None:
+        payload["start_measure"] = start_measure
+        payload["end_measure"] = end_measure
+    return payload
 
 
 def plot_weighted_note_distribution(
@@ -313,13 +517,21 @@ def plot_weighted_note_distribution(
     pitch_class_order: str = "fifths",
     group_by_staff: bool = False,
     limit_to_active: bool = True,
+    start_measure: int | None = None,
+    end_measure: int | None = None,
 ) -> ToolResult:
     """Plot a duration-weighted pitch-class radar chart for one or more MEI scores.
 
-    Each note contributes its duration weight (``dur.ppq``) to its pitch class,
-    so sustained tones count more than brief passing notes. By default the tool
+    Each note contributes its duration weight (``dur.ppq``, or ``@dur`` and
+    ``@dots`` where that is missing) to its pitch class, so sustained tones
+    count more than brief passing notes. By default the tool
     combines each score into one polygon and orders pitch classes by the circle
     of fifths, mirroring the notebook example shared by the user.
+
+    ``start_measure`` and ``end_measure`` restrict the chart to an inclusive
+    range of measure numbers; either may be omitted to leave that side open.
+    Each score's cumulative per-measure table is cached, so windows cost a
+    subtraction rather than another pass over the MEI file.
     """
     structured = _build_weighted_note_payload(
         filename=filename,
@@ -327,6 +539,8 @@ def plot_weighted_note_distribution(
         pitch_class_order=pitch_class_order,
         group_by_staff=group_by_staff,
         limit_to_active=limit_to_active,
+        start_measure=start_measure,
+        end_measure=end_measure,
     )
 
     trace_count = len(structured["traces"])
@@ -336,6 +550,11 @@ def plot_weighted_note_distribution(
         f"{'' if score_count == 1 else 's'} with {trace_count} trace"
         f"{'' if trace_count == 1 else 's'} in {structured['pitch_class_order']} order."
     )
+    if start_measure is not None or end_measure is not None:
+        description += (
+            f" Measures {'start' if start_measure is None else start_measure}"
+            f" to {'end' if end_measure is None else end_measure}."
+        )
 
     return ToolResult(
         content=[TextContent(type="text", text=description)],
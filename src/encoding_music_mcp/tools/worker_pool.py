@@ -0,0 +1,278 @@
+"""Bounded pool of worker processes for CPU-bound tools.
+
+CRIM Intervals and music21 are pure Python, so a slow analysis running on a
+server thread still holds the GIL and delays ``/health`` and every other
+client. Tools wrapped with :func:`offload` run in long-lived worker processes
+instead, with a per-tool concurrency limit and timeout. A worker whose call
+times out or is cancelled by the client is killed and replaced on demand.
+
+The pool is only enabled by :func:`configure_tool_workers`, which the server
+calls in HTTP mode. Until then, wrapped tools run on a thread as before.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import inspect
+import multiprocessing
+import os
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import nullcontext
+from dataclasses import dataclass
+from multiprocessing.connection import Connection
+from multiprocessing.process import BaseProcess
+from typing import Any
+
+from .helpers import (
+    get_mei_filepath,
+    get_uploaded_mei_files,
+    register_uploaded_mei_from_path,
+    remove_uploaded_mei,
+)
+from .score_cache import get_score_cache
+
+__all__ = [
+    "ToolWorkerPool",
+    "configure_tool_workers",
+    "get_tool_worker_pool",
+    "offload",
+]
+
+_DEFAULT_TIMEOUT_S = 300.0
+
+
+def _default_timeout() -> float:
+    """Read the default tool timeout in seconds from ``MCP_TOOL_TIMEOUT``."""
+    return float(os.environ.get("MCP_TOOL_TIMEOUT", str(_DEFAULT_TIMEOUT_S)))
+
+
+def _sync_uploads(uploads: dict[str, str]) -> None:
+    """Mirror the server's uploaded-file registrations in a worker."""
+    for filename in set(get_uploaded_mei_files()) - set(uploads):
+        remove_uploaded_mei(filename)
+    for filename, path in uploads.items():
+        if str(get_mei_filepath(filename)) != path:
+            register_uploaded_mei_from_path(path, filename)
+
+
+def _uploads_snapshot() -> dict[str, str]:
+    """Return the current uploaded filenames and their source paths."""
+    return {
+        filename: str(get_mei_filepath(filename))
+        for filename in get_uploaded_mei_files()
+    }
+
+
+def _worker_main(connection: Connection, cache_bytes: int) -> None:
+    """Serve ``(fn, kwargs, uploads)`` requests until the pipe closes."""
+    get_score_cache().max_bytes = cache_bytes
+    while True:
+        try:
+            fn, kwargs, uploads = connection.recv()
+        except EOFError:
+            return
+        try:
+            _sync_uploads(uploads)
+            reply = (True, fn(**kwargs))
+        except Exception as exc:  # noqa: BLE001 - re-raised in the server
+            reply = (False, exc)
+        try:
+            connection.send(reply)
+        except Exception as exc:  # noqa: BLE001 - unpicklable result or error
+            connection.send((False, RuntimeError(f"{type(exc).__name__}: {exc}")))
+
+
+@dataclass
+class _Worker:
+    """One worker process and the server's end of its pipe."""
+
+    process: BaseProcess
+    connection: Connection
+
+    def kill(self) -> None:
+        """Stop the worker immediately, abandoning any call in progress.
+
+        The pipe is left open for a thread that may still be waiting on it,
+        which sees end-of-file once the process has gone; the caller closes
+        it afterwards (see :meth:`ToolWorkerPool._discard`).
+        """
+        self.process.kill()
+        self.process.join()
+
+
+class ToolWorkerPool:
+    """Run functions in at most ``max_workers`` reusable worker processes.
+
+    Workers are started lazily with the ``spawn`` method, so the server's
+    threads are never forked, and stay alive between calls so each keeps its
+    own warm score cache. The server's score cache budget
+    (``MCP_SCORE_CACHE_MB``) is divided between the workers, so a full pool
+    holds about as much as one cache rather than ``max_workers`` of them.
+    """
+
+    def __init__(self, max_workers: int):
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.max_workers = max_workers
+        self._slots = asyncio.Semaphore(max_workers)
+        self._idle: list[_Worker] = []
+        self._context = multiprocessing.get_context("spawn")
+        # One thread per busy worker waits on its pipe.
+        self._receivers = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="tool-worker"
+        )
+
+    def _start_worker(self) -> _Worker:
+        server_end, worker_end = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(worker_end, get_score_cache().max_bytes // self.max_workers),
+            name="encoding-music-mcp-worker",
+            daemon=True,
+        )
+        process.start()
+        worker_end.close()
+        return _Worker(process, server_end)
+
+    def _checkout(self) -> _Worker:
+        while self._idle:
+            worker = self._idle.pop()
+            if worker.process.is_alive():
+                return worker
+            worker.connection.close()
+        return self._start_worker()
+
+    async def run(
+        self,
+        fn: Callable[..., Any],
+        kwargs: dict[str, Any],
+        timeout: float | None = None,
+    ) -> Any:
+        """Call ``fn(**kwargs)`` in a worker process and return its result.
+
+        Args:
+            fn: Module-level function to call; it is pickled by reference.
+            kwargs: Picklable keyword arguments for ``fn``.
+            timeout: Seconds to wait before killing the worker, or ``None``
+                to wait indefinitely.
+
+        Returns:
+            The function's return value. Exceptions raised by ``fn`` are
+            re-raised here.
+        """
+        async with self._slots:
+            worker = self._checkout()
+            receiving: Future[Any] | None = None
+            try:
+                worker.connection.send((fn, kwargs, _uploads_snapshot()))
+                receiving = self._receivers.submit(worker.connection.recv)
+                ok, payload = await asyncio.wait_for(
+                    asyncio.wrap_future(receiving), timeout
+                )
+            except TimeoutError:
+                self._discard(worker, receiving)
+                raise TimeoutError(
+                    f"{fn.__name__} did not finish within {timeout:g} seconds"
+                ) from None
+            except EOFError:
+                self._discard(worker, receiving)
+                raise RuntimeError(
+                    f"Worker process exited while running {fn.__name__}"
+                ) from None
+            except BaseException:
+                # Cancelled by the client: stop the computation as well.
+                self._discard(worker, receiving)
+                raise
+            self._idle.append(worker)
+        if not ok:
+            raise payload
+        return payload
+
+    @staticmethod
+    def _discard(worker: _Worker, receiving: Future[Any] | None) -> None:
+        """Kill a worker and close its pipe once no thread is reading it."""
+        worker.kill()
+        if receiving is None:
+            worker.connection.close()
+        else:
+            # Runs at once if the receiver has already returned.
+            receiving.add_done_callback(lambda _: worker.connection.close())
+
+    def stop_idle(self) -> None:
+        """Stop every idle worker; busy workers carry on and are kept."""
+        while self._idle:
+            worker = self._idle.pop()
+            worker.kill()
+            worker.connection.close()
+
+    def shutdown(self) -> None:
+        """Stop every idle worker and release the pool's threads."""
+        self.stop_idle()
+        self._receivers.shutdown(wait=False)
+
+
+_POOL: ToolWorkerPool | None = None
+
+
+def configure_tool_workers(max_workers: int | None = None) -> ToolWorkerPool | None:
+    """Enable the shared worker pool, or disable it with ``max_workers=0``.
+
+    Args:
+        max_workers: Number of worker processes. Defaults to
+            ``MCP_TOOL_WORKERS``, or to the CPU count when that is unset.
+
+    Returns:
+        The new pool, or ``None`` when offloading is disabled.
+    """
+    global _POOL
+    if max_workers is None:
+        max_workers = int(os.environ.get("MCP_TOOL_WORKERS", str(os.cpu_count() or 1)))
+    if _POOL is not None:
+        _POOL.shutdown()
+    _POOL = ToolWorkerPool(max_workers) if max_workers > 0 else None
+    return _POOL
+
+
+def get_tool_worker_pool() -> ToolWorkerPool | None:
+    """Return the shared worker pool, or ``None`` when it is not enabled."""
+    return _POOL
+
+
+def offload(
+    fn: Callable[..., Any],
+    max_concurrency: int | None = None,
+    timeout: float | None = None,
+) -> Callable[..., Any]:
+    """Wrap a synchronous tool so it runs in the shared worker pool.
+
+    The wrapper keeps the tool's name, docstring, and signature, so FastMCP
+    builds the same schema for it.
+
+    Args:
+        fn: Synchronous, module-level tool function.
+        max_concurrency: Maximum number of concurrent calls of this tool, or
+            ``None`` for no per-tool limit beyond the pool size.
+        timeout: Seconds before a call is abandoned and its worker killed.
+            Defaults to ``MCP_TOOL_TIMEOUT`` (300 seconds). Only enforced
+            when the worker pool is enabled.
+
+    Returns:
+        Async tool function.
+    """
+    signature = inspect.signature(fn)
+    limit = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+
+    @functools.wraps(fn)
+    async def run_tool(*args: Any, **kwargs: Any) -> Any:
+        arguments = signature.bind(*args, **kwargs).arguments
+        async with limit or nullcontext():
+            pool = get_tool_worker_pool()
+            if pool is None:
+                return await asyncio.to_thread(fn, **arguments)
+            return await pool.run(
+                fn, arguments, _default_timeout() if timeout is None else timeout
+            )
+
+    return run_tool
@@ -0,0 +1,17 @@
+"""Shared test fixtures."""
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def isolated_artifact_dirs(tmp_path_factory, monkeypatch):
+    """Give every test empty on-disk artifact and index stores.
+
+    Both default to shared directories under the system temp directory, so
+    without this a test could read artifacts left by an earlier run or by
+    another checkout, and a stale entry could hide a broken builder. Tests
+    that need a particular directory can still set the variables themselves.
+    """
+    root = tmp_path_factory.mktemp("stores")
+    monkeypatch.setenv("MCP_ARTIFACT_DIR", str(root / "artifacts"))
+    monkeypatch.setenv("MCP_INDEX_DIR", str(root / "index"))
@@ -0,0 +1,219 @@
+"""Tests for the persistent analysis artifact store."""
+
+from concurrent.futures import ThreadPoolExecutor
+from fractions import Fraction
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.encoding_music_mcp.tools.artifact_store import (
+    ArtifactStore,
+    content_hash,
+    get_artifact_store,
+    persistent,
+)
+from src.encoding_music_mcp.tools.helpers import get_mei_filepath
+from src.encoding_music_mcp.tools.intervals import (
+    _crim_frame,
+    get_melodic_intervals,
+    get_notes,
+)
+from src.encoding_music_mcp.tools.ngram_engine import _build_melodic_score
+from src.encoding_music_mcp.tools.score_cache import get_score_cache
+
+
+def _score(tmp_path, text="<mei/>"):
+    path = tmp_path / "score.mei"
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+def test_artifact_store_reuses_stored_results(tmp_path):
+    """A second request for the same analysis is read back from disk."""
+    path = _score(tmp_path)
+    builds = []
+
+    def build():
+        builds.append(1)
+        return {"counts": np.arange(4, dtype=np.int32), "label": "x"}
+
+    first = ArtifactStore(tmp_path / "store").load_or_build("demo", path, build)
+    # A fresh instance stands in for a restarted or separate worker process.
+    second = ArtifactStore(tmp_path / "store").load_or_build("demo", path, build)
+
+    assert len(builds) == 1
+    assert second["label"] == "x"
+    assert np.array_equal(second["counts"], first["counts"])
+    assert second["counts"].dtype == np.int32
+    assert ArtifactStore(tmp_path / "store").stats()["artifacts"] == 1
+
+
+def test_artifact_store_keys_on_content_and_params(tmp_path):
+    """Edited scores and different parameters never reuse an artifact."""
+    path = _score(tmp_path)
+    store = ArtifactStore(tmp_path / "store")
+    builds = []
+
+    def build():
+        builds.append(1)
+        return len(builds)
+
+    assert store.load_or_build("demo", path, build, fmt="json", params={"n": 3}) == 1
+    assert store.load_or_build("demo", path, build, fmt="json", params={"n": 4}) == 2
+    assert store.load_or_build("demo", path, build, fmt="json", params={"n": 3}) == 1
+
+    path.write_text("<mei><music/></mei>", encoding="utf-8")
+    assert store.load_or_build("demo", path, build, fmt="json", params={"n": 3}) == 3
+
+
+def test_artifact_store_rebuilds_unreadable_artifacts(tmp_path):
+    """A corrupt artifact file is rebuilt rather than raised."""
+    path = _score(tmp_path)
+    store = ArtifactStore(tmp_path / "store")
+    store.load_or_build("demo", path, lambda: {"a": np.zeros(3)})
+    for artifact in (tmp_path / "store" / "demo").iterdir():
+        artifact.write_bytes(b"not an npz file")
+
+    rebuilt = store.load_or_build("demo", path, lambda: {"a": np.ones(3)})
+
+    assert np.array_equal(rebuilt["a"], np.ones(3))
+
+
+def test_artifact_store_round_trips_native_event_tables(tmp_path):
+    """Stored melodic scores equal freshly built ones, field by field."""
+    filepath = get_mei_filepath("Bach_BWV_0772.mei")
+    store = ArtifactStore(tmp_path / "store")
+    fresh = _build_melodic_score(filepath)
+    store.load_or_build("melodic_score", filepath, lambda: fresh)
+
+    stored = store.load_or_build(
+        "melodic_score", filepath, lambda: pytest.fail("artifact was rebuilt")
+    )
+
+    assert type(stored) is type(fresh)
+    assert stored.voices.keys() == fresh.voices.keys()
+    for part, voice in fresh.voices.items():
+        assert np.array_equal(stored.voices[part].offset, voice.offset)
+        assert np.array_equal(stored.voices[part].ps, voice.ps)
+        assert np.array_equal(stored.voices[part].tied, voice.tied)
+    assert np.array_equal(stored.barline_offsets, fresh.barline_offsets)
+    assert stored.locations(voice.offset)[0].tolist() == (
+        fresh.locations(voice.offset)[0].tolist()
+    )
+
+
+def test_artifact_store_round_trips_mixed_type_frames(tmp_path):
+    """Object columns mixing strings, numbers, and NaN are stored exactly."""
+    path = _score(tmp_path)
+    index = pd.MultiIndex.from_arrays(
+        [[1.0, 1.0, 2.0], [1.0, 2.5, 1.0]], names=["Measure", "Beat"]
+    )
+    frame = pd.DataFrame(
+        {"Superius": ["P5", 3, np.nan], "Bassus": [0.5, 1.5, 2.0]}, index=index
+    )
+    frame["Superius"] = frame["Superius"].astype(object)
+
+    store = ArtifactStore(tmp_path / "store")
+    store.load_or_build("mixed", path, lambda: frame)
+    restored = ArtifactStore(tmp_path / "store").load_or_build(
+        "mixed", path, lambda: pytest.fail("frame was not stored")
+    )
+
+    pd.testing.assert_frame_equal(restored, frame)
+
+
+def test_artifact_store_skips_frames_that_cannot_be_stored(tmp_path):
+    """Values JSON cannot hold without pickling are recomputed each time."""
+    path = _score(tmp_path)
+    store = ArtifactStore(tmp_path / "store")
+    frame = pd.DataFrame({"duration": [Fraction(1, 3)]})
+
+    assert store.load_or_build("fractions", path, lambda: frame) is frame
+    assert store.stats()["artifacts"] == 0
+
+
+def test_crim_frames_are_stored():
+    """CRIM Intervals results are written to the store and read back from it."""
+    result = get_notes("Bach_BWV_0772.mei")
+    get_melodic_intervals("Bach_BWV_0772.mei", kind="q")
+
+    analyses = get_artifact_store().stats()["analyses"]
+    assert {"crim_notes", "crim_melodic_intervals"} <= set(analyses)
+    filepath = get_mei_filepath("Bach_BWV_0772.mei")
+    stored = _crim_frame(
+        filepath, "crim_notes", lambda piece: pytest.fail("frame was not stored")
+    )
+    assert stored.to_csv(index=True) == result["notes"]
+
+
+def test_artifact_store_evicts_oldest_artifacts_over_its_limit(tmp_path):
+    """Once the store outgrows ``max_bytes``, the oldest artifacts are deleted."""
+    path = _score(tmp_path)
+    store = ArtifactStore(tmp_path / "store", max_bytes=2500)
+    for n in range(3):
+        store.load_or_build(
+            "demo", path, lambda: "x" * 1000, fmt="json", params={"n": n}
+        )
+
+    stats = store.stats()
+    files = list((tmp_path / "store" / "demo").iterdir())
+    builds = []
+    store.load_or_build(
+        "demo", path, lambda: builds.append(1), fmt="json", params={"n": 0}
+    )
+
+    assert stats["artifacts"] == 2
+    assert stats["bytes"] <= 2500
+    assert len(files) == 2
+    assert builds == [1]
+
+
+def test_artifact_keys_include_the_package_version(tmp_path):
+    """Upgrading this package never reuses artifacts from an older release."""
+    _, record = ArtifactStore(tmp_path / "store")._key(
+        "demo", _score(tmp_path), {}, ("numpy",), 1
+    )
+
+    assert set(record["versions"]) == {"encoding-music-mcp", "numpy"}
+
+
+def test_artifact_store_keeps_one_index_connection_per_thread(tmp_path):
+    """Lookups reuse their thread's connection; other threads open their own."""
+    path = _score(tmp_path)
+    store = ArtifactStore(tmp_path / "store")
+    store.load_or_build("demo", path, lambda: 1, fmt="json")
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        other = executor.submit(store._connect).result()
+        counted = executor.submit(lambda: store.stats()["artifacts"]).result()
+
+    assert store._connect() is store._connect()
+    assert other is not store._connect()
+    assert counted == 1
+
+
+def test_persistent_loader_respects_disabled_store(tmp_path, monkeypatch):
+    """An empty ``MCP_ARTIFACT_DIR`` disables the store entirely."""
+    monkeypatch.setenv("MCP_ARTIFACT_DIR", "")
+    path = _score(tmp_path)
+
+    assert get_artifact_store() is None
+    assert persistent("demo", lambda filepath: filepath.name, fmt="json")(path) == (
+        "score.mei"
+    )
+
+
+def test_content_hash_keeps_one_digest_per_file(tmp_path):
+    """Digests live in the bounded score cache and follow file edits."""
+    path = _score(tmp_path)
+    entries = get_score_cache().stats()["entries"]
+    first = content_hash(path)
+
+    path.write_text("<mei><music/></mei>", encoding="utf-8")
+    second = content_hash(path)
+
+    assert first != second
+    assert content_hash(path) == second
+    # The edited file's digest replaced the stale one instead of adding to it.
+    assert get_score_cache().stats()["entries"] == entries + 1
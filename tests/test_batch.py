@@ -0,0 +1,144 @@
+"""Tests for the batch analysis tool."""
+
+import asyncio
+import multiprocessing
+import time
+
+import pytest
+
+from src.encoding_music_mcp.tools.batch import batch_analyze
+from src.encoding_music_mcp.tools.helpers import get_mei_collections
+from src.encoding_music_mcp.tools.key_analysis import analyze_key
+from src.encoding_music_mcp.tools.metadata import get_mei_metadata
+
+
+class _ProgressContext:
+    def __init__(self):
+        self.updates = []
+
+    async def report_progress(self, progress, total=None, message=None):
+        self.updates.append((progress, total))
+
+
+def test_batch_analyze_matches_per_file_results():
+    """Batched results should equal calling the tool on each file."""
+    filenames = ["Bach_BWV_0772.mei", "Bach_BWV_0773.mei", "Bach_BWV_0785.mei"]
+    ctx = _ProgressContext()
+
+    result = asyncio.run(
+        batch_analyze(
+            "analyze_key",
+            filenames=filenames,
+            params={"engine": "numpy"},
+            max_workers=2,
+            ctx=ctx,
+        )
+    )
+
+    assert result["tool"] == "analyze_key"
+    assert result["params"] == {"engine": "numpy"}
+    assert result["file_count"] == result["succeeded"] == 3
+    assert list(result["results"]) == filenames
+    for filename in filenames:
+        assert result["results"][filename] == analyze_key(filename, engine="numpy")
+    assert result["errors"] == {}
+    assert ctx.updates[0] == (0, 3)
+    assert ctx.updates[-1] == (3, 3)
+    assert [progress for progress, _ in ctx.updates] == [0, 1, 2, 3]
+
+
+def test_batch_analyze_collection_records_errors():
+    """Collections are expanded and a missing file is reported, not raised."""
+    bach = get_mei_collections()["bach_inventions"]
+
+    result = asyncio.run(
+        batch_analyze(
+            "get_mei_metadata",
+            filenames=["nonexistent_file.mei"],
+            collection="bach_inventions",
+            max_workers=2,
+        )
+    )
+
+    assert result["file_count"] == len(bach) + 1
+    assert result["succeeded"] == len(bach)
+    assert result["results"][bach[0]] == get_mei_metadata(bach[0])
+    assert list(result["errors"]) == ["nonexistent_file.mei"]
+    assert result["errors"]["nonexistent_file.mei"].startswith("FileNotFoundError")
+
+
+def test_batch_analyze_invalid_arguments():
+    """Unknown tools, parameters, and collections should raise ValueError."""
+    with pytest.raises(ValueError, match="tool"):
+        asyncio.run(batch_analyze("show_notation", filenames=["Bach_BWV_0772.mei"]))
+    with pytest.raises(ValueError, match="parameter"):
+        asyncio.run(
+            batch_analyze(
+                "analyze_key", filenames=["Bach_BWV_0772.mei"], params={"n": 4}
+            )
+        )
+    with pytest.raises(ValueError, match="collection"):
+        asyncio.run(batch_analyze("analyze_key", collection="mozart"))
+    with pytest.raises(ValueError):
+        asyncio.run(batch_analyze("analyze_key"))
+
+
+def test_batch_analyze_cancellation_does_not_wait_for_workers():
+    """Cancelling a batch returns at once and stops its worker processes."""
+    before = set(multiprocessing.active_children())
+
+    async def cancel_running_batch():
+        task = asyncio.create_task(
+            batch_analyze(
+                "analyze_key",
+                filenames=[
+                    "CRIM_Mass_0053_3.mei",
+                    "CRIM_Mass_0053_2.mei",
+                    "CRIM_Mass_0053_4.mei",
+                ],
+                max_workers=1,
+            )
+        )
+        await asyncio.sleep(1.0)
+        started = time.perf_counter()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return time.perf_counter() - started
+
+    assert asyncio.run(cancel_running_batch()) < 1.0
+    deadline = time.monotonic() + 10
+    while set(multiprocessing.active_children()) - before:
+        assert time.monotonic() < deadline, "batch workers were not stopped"
+        time.sleep(0.1)
+
+
+def test_concurrent_batches_share_the_worker_limit(monkeypatch):
+    """MCP_BATCH_WORKERS caps the worker processes of all batches together."""
+    monkeypatch.setenv("MCP_BATCH_WORKERS", "1")
+    before = set(multiprocessing.active_children())
+    peak = 0
+
+    async def run_two_batches():
+        nonlocal peak
+        batches = asyncio.gather(
+            batch_analyze(
+                "get_mei_metadata",
+                filenames=["Bach_BWV_0772.mei", "Bach_BWV_0773.mei"],
+                max_workers=4,
+            ),
+            batch_analyze(
+                "get_mei_metadata", filenames=["Bach_BWV_0785.mei"], max_workers=4
+            ),
+        )
+        while not batches.done():
+            peak = max(peak, len(set(multiprocessing.active_children()) - before))
+            await asyncio.sleep(0.05)
+        return await batches
+
+    first, second = asyncio.run(run_two_batches())
+
+    assert first["succeeded"] == 2
+    assert second["succeeded"] == 1
+    assert peak == 1
+    assert not set(multiprocessing.active_children()) - before
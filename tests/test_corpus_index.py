@@ -0,0 +1,296 @@
+"""Tests for the corpus-wide melodic suffix-array index."""
+
+import asyncio
+import inspect
+import os
+
+import numpy as np
+import pytest
+
+from src.encoding_music_mcp.server import mcp
+from src.encoding_music_mcp.tools import corpus_index
+from src.encoding_music_mcp.tools.corpus_index import (
+    _myers_distances,
+    _suffix_array,
+    find_repeated_melodic_passages,
+    get_melodic_suffix_index,
+    search_melodic_pattern,
+    search_similar_melodic_patterns,
+)
+from src.encoding_music_mcp.tools.helpers import get_mei_filepath
+from src.encoding_music_mcp.tools.intervals import get_melodic_ngram_matches
+
+CORPUS = ["Bach_BWV_0772.mei", "Bach_BWV_0773.mei", "CRIM_Model_0001.mei"]
+
+
+@pytest.fixture
+def small_corpus(tmp_path, monkeypatch):
+    """Index a copy of a few scores in a temporary index directory."""
+    paths = {}
+    for filename in CORPUS:
+        path = tmp_path / filename
+        path.write_bytes(get_mei_filepath(filename).read_bytes())
+        paths[filename] = path
+
+    def corpus_files():
+        return {
+            filename: (str(path), path.stat().st_mtime_ns, path.stat().st_size)
+            for filename, path in paths.items()
+        }
+
+    monkeypatch.setenv("MCP_INDEX_DIR", str(tmp_path / "index"))
+    monkeypatch.setattr(corpus_index, "_corpus_files", corpus_files)
+    monkeypatch.setattr(corpus_index, "_INDEXES", {})
+    return paths
+
+
+def test_suffix_array_matches_sorted_suffixes():
+    """Prefix doubling and binary-lifted LCPs agree with a direct sort."""
+    tokens = np.array([2, 0, 1, 0, 1, 0, 5, 2, 0, 1, 6])
+    suffix_array, lcp = _suffix_array(tokens)
+
+    expected = sorted(range(len(tokens)), key=lambda i: tokens[i:].tolist())
+    assert suffix_array.tolist() == expected
+    for rank in range(1, len(tokens)):
+        left = tokens[suffix_array[rank - 1] :].tolist()
+        right = tokens[suffix_array[rank] :].tolist()
+        common = 0
+        while common < min(len(left), len(right)) and left[common] == right[common]:
+            common += 1
+        assert lcp[rank] == common
+
+
+@pytest.mark.parametrize(
+    ("filename", "n"),
+    [("Bach_BWV_0772.mei", 4), ("Bach_BWV_0772.mei", 9), ("CRIM_Model_0001.mei", 6)],
+)
+def test_search_matches_per_file_ngram_matches(small_corpus, filename, n):
+    """Corpus search of any length returns the per-file tool's occurrences."""
+    expected = get_melodic_ngram_matches(filename, n=n)["matches_by_pattern"]
+    for pattern, expected_records in list(expected.items())[:10]:
+        result = search_melodic_pattern(pattern, filenames=[filename], limit=1000)
+
+        assert result["n"] == n
+        assert result["total_occurrences"] == len(expected_records)
+        assert [
+            {
+                key: value
+                for key, value in occurrence.items()
+                if key not in {"filename", "pattern_string"}
+            }
+            for occurrence in result["occurrences"]
+        ] == expected_records
+
+
+def test_search_reports_per_file_counts(small_corpus):
+    """File counts cover every indexed file and sum to the total."""
+    result = search_melodic_pattern(
+        ["2", "2", "-3", "2"], include_note_ids=False, limit=1
+    )
+
+    assert result["indexed_files"] == len(CORPUS)
+    assert result["pattern_string"] == "2_2_-3_2"
+    assert (
+        sum(record["count"] for record in result["files"])
+        == result["total_occurrences"]
+    )
+    assert len(result["occurrences"]) == 1
+    assert result["truncated"] is (result["total_occurrences"] > 1)
+    assert "note_ids" not in result["occurrences"][0]
+
+
+def test_repeated_passages_are_maximal(small_corpus):
+    """Reported repeats match their lookups and cannot be extended."""
+    result = find_repeated_melodic_passages(
+        min_length=6, filenames=["Bach_BWV_0772.mei"], limit=5
+    )
+    lengths = [repeat["length"] for repeat in result["repeats"]]
+
+    assert lengths == sorted(lengths, reverse=True)
+    assert all(length >= 6 for length in lengths)
+    for repeat in result["repeats"]:
+        lookup = search_melodic_pattern(
+            repeat["pattern"], filenames=["Bach_BWV_0772.mei"], include_note_ids=False
+        )
+        assert lookup["total_occurrences"] == repeat["count"] >= 2
+        for extended in (["2"] + repeat["pattern"], repeat["pattern"] + ["2"]):
+            longer = search_melodic_pattern(
+                extended, filenames=["Bach_BWV_0772.mei"], include_note_ids=False
+            )
+            assert longer["total_occurrences"] < repeat["count"]
+
+
+def test_repeated_passages_by_count(small_corpus):
+    """Ranking by count puts the most frequent passages first."""
+    result = find_repeated_melodic_passages(min_length=3, sort_by="count", limit=5)
+    counts = [repeat["count"] for repeat in result["repeats"]]
+
+    assert counts == sorted(counts, reverse=True)
+    assert result["total_repeats"] >= len(result["repeats"])
+
+
+def test_index_is_reloaded_from_disk(small_corpus, monkeypatch):
+    """A persisted index is reused without re-analysing any file."""
+    built = get_melodic_suffix_index()
+    monkeypatch.setattr(corpus_index, "_INDEXES", {})
+
+    def fail(*args, **kwargs):
+        raise AssertionError("index should not be rebuilt")
+
+    monkeypatch.setattr(corpus_index, "_file_intervals", fail)
+    reloaded = get_melodic_suffix_index()
+
+    assert reloaded.filenames == built.filenames
+    assert reloaded.text.tolist() == built.text.tolist()
+    assert reloaded.suffix_array.tolist() == built.suffix_array.tolist()
+
+
+def test_index_refreshes_only_modified_files(small_corpus, monkeypatch):
+    """Changing one file re-analyses just that file."""
+    built = get_melodic_suffix_index()
+    path = small_corpus["Bach_BWV_0773.mei"]
+    path.write_bytes(path.read_bytes() + b"\n")
+
+    reindexed = []
+    file_intervals = corpus_index._file_intervals
+
+    def tracking(filepath, *args, **kwargs):
+        reindexed.append(filepath.name)
+        return file_intervals(filepath, *args, **kwargs)
+
+    monkeypatch.setattr(corpus_index, "_file_intervals", tracking)
+    refreshed = get_melodic_suffix_index()
+
+    assert reindexed == ["Bach_BWV_0773.mei"]
+    assert refreshed.text.tolist() == built.text.tolist()
+    assert refreshed.lcp.tolist() == built.lcp.tolist()
+
+
+def test_index_files_are_keyed_by_content_and_versions(small_corpus, monkeypatch):
+    """Touching a file reuses the index; an upgrade writes a new one in its place."""
+    get_melodic_suffix_index()
+    get_melodic_suffix_index(compound=True)
+    index_dir = small_corpus["Bach_BWV_0772.mei"].parent / "index"
+    built = sorted(index_dir.glob("*.npz"))
+
+    path = small_corpus["Bach_BWV_0773.mei"]
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    monkeypatch.setattr(corpus_index, "_INDEXES", {})
+    touched = corpus_index._corpus_digest(corpus_index._corpus_files())
+    get_melodic_suffix_index()
+    assert sorted(index_dir.glob("*.npz")) == built
+
+    monkeypatch.setattr(
+        corpus_index, "code_versions", lambda libraries: {"numpy": "upgraded"}
+    )
+    get_melodic_suffix_index()
+    upgraded = sorted(index_dir.glob("*.npz"))
+
+    assert len(built) == len(upgraded) == 2
+    assert touched[:32] in " ".join(path.name for path in built)
+    # Only the non-compound index was replaced.
+    assert len(set(built) & set(upgraded)) == 1
+
+
+def test_search_rejects_invalid_requests(small_corpus):
+    """Empty patterns, unknown collections, and bad options are rejected."""
+    with pytest.raises(ValueError):
+        search_melodic_pattern("")
+    with pytest.raises(ValueError):
+        search_melodic_pattern("2_2", collection="not_a_collection")
+    with pytest.raises(ValueError):
+        find_repeated_melodic_passages(min_length=0)
+    with pytest.raises(ValueError):
+        find_repeated_melodic_passages(sort_by="length_then_count")
+
+
+def _edit_distances(codes, tokens):
+    """Reference dynamic-programming edit distance ending at each token."""
+    previous = list(range(len(codes) + 1))
+    distances = []
+    for token in tokens:
+        row = [0]
+        for index, code in enumerate(codes, start=1):
+            row.append(
+                min(
+                    previous[index] + 1,
+                    row[index - 1] + 1,
+                    previous[index - 1] + (code != token),
+                )
+            )
+        distances.append(row[-1])
+        previous = row
+    return distances
+
+
+def test_myers_distances_match_dynamic_programming():
+    """The bit-parallel scan agrees with the textbook recurrence."""
+    rng = np.random.default_rng(7)
+    for _ in range(100):
+        codes = rng.integers(0, 3, int(rng.integers(1, 12))).tolist()
+        tokens = rng.integers(0, 4, int(rng.integers(1, 40))).tolist()
+        assert _myers_distances(codes, tokens).tolist() == _edit_distances(
+            codes, tokens
+        )
+
+
+def test_similar_search_finds_exact_occurrences_at_distance_zero(small_corpus):
+    """Exact occurrences are reported at distance zero."""
+    exact = search_melodic_pattern("2_2_-3_2", include_note_ids=False, limit=1000)
+    similar = search_similar_melodic_patterns(
+        "2_2_-3_2", max_distance=1, include_note_ids=False, limit=1000
+    )
+    at_zero = [match for match in similar["matches"] if match["distance"] == 0]
+
+    assert exact["total_occurrences"] > 0
+    assert similar["distance_counts"]["0"] == exact["total_occurrences"]
+    assert [
+        (match["filename"], match["column"], match["start_offset"]) for match in at_zero
+    ] == [
+        (occurrence["filename"], occurrence["column"], occurrence["start_offset"])
+        for occurrence in exact["occurrences"]
+    ]
+
+
+def test_similar_search_finds_altered_pattern(small_corpus):
+    """A pattern with one altered interval still finds the original passage."""
+    exact = search_melodic_pattern(
+        "2_2_2_-3_2", filenames=["Bach_BWV_0772.mei"], include_note_ids=False
+    )
+    first = exact["occurrences"][0]
+    similar = search_similar_melodic_patterns(
+        "2_2_2_-4_2", max_distance=1, filenames=["Bach_BWV_0772.mei"]
+    )
+    locations = {
+        (match["column"], match["start_offset"]): match for match in similar["matches"]
+    }
+    match = locations[(first["column"], first["start_offset"])]
+
+    assert match["distance"] == 1
+    assert match["pattern_string"] == "2_2_2_-3_2"
+    assert len(match["note_ids"]) == 6
+
+
+def test_similar_search_rejects_unbounded_distance(small_corpus):
+    """The distance must leave at least one exact piece of the pattern."""
+    with pytest.raises(ValueError):
+        search_similar_melodic_patterns("2_2_-3", max_distance=3)
+    with pytest.raises(ValueError):
+        search_similar_melodic_patterns("2_2_-3", max_distance=-1)
+
+
+@pytest.mark.parametrize(
+    "tool",
+    [
+        find_repeated_melodic_passages,
+        search_melodic_pattern,
+        search_similar_melodic_patterns,
+    ],
+)
+def test_corpus_tools_are_registered_to_run_in_workers(tool):
+    """Corpus searches are offloaded, so they never block the server's GIL."""
+    registered = {t.name: t for t in asyncio.run(mcp.list_tools())}[tool.__name__]
+
+    assert inspect.iscoroutinefunction(registered.fn)
+    assert inspect.unwrap(registered.fn) is tool
@@ -0,0 +1,90 @@
+"""Tests for FFT-based imitation detection."""
+
+import numpy as np
+import pytest
+
+from src.encoding_music_mcp.tools.helpers import get_mei_filepath
+from src.encoding_music_mcp.tools.imitation import (
+    _lag_counts,
+    _part_melodies,
+    _PartMelody,
+    detect_imitation,
+)
+from src.encoding_music_mcp.tools.ngram_engine import load_melodic_score
+
+
+def test_lag_counts_match_direct_counting():
+    """FFT cross-correlation should count coinciding symbols at every lag."""
+    melodies, _, _ = _part_melodies(
+        load_melodic_score(get_mei_filepath("CRIM_Model_0001.mei")), "d", None
+    )
+    leader, follower = melodies["1"], melodies["2"]
+    cell_count = 1 + max(int(leader.cells.max()), int(follower.cells.max()))
+    counts = _lag_counts(leader, follower, cell_count)
+
+    follower_symbols = dict(
+        zip(follower.cells.tolist(), follower.symbols.tolist(), strict=True)
+    )
+    for lag in list(range(-40, 41)) + [cell_count - 1]:
+        expected = sum(
+            symbol >= 0 and follower_symbols.get(cell + lag) == symbol
+            for cell, symbol in zip(
+                leader.cells.tolist(), leader.symbols.tolist(), strict=True
+            )
+        )
+        assert counts[lag % len(counts)] == expected
+
+
+def test_detect_imitation_finds_invention_answer():
+    """The left hand of Invention No. 1 answers the subject an octave lower."""
+    result = detect_imitation("Bach_BWV_0772.mei")
+
+    assert result["grid"] == 0.125
+    assert result["voice_pairs"][0] == {
+        "leader": "1",
+        "follower": "2",
+        "lag": 2.0,
+        "matched_intervals": 74,
+    }
+    first = result["entries"][0]
+    assert (first["leader"], first["follower"], first["lag"]) == ("1", "2", 2.0)
+    assert first["transposition"] == "-8"
+    assert first["transposition_semitones"] == -12.0
+    assert first["pattern_string"].startswith("2_2_2_-3_2_-3")
+    assert first["leader_start"] == {"measure": 1.0, "beat": 1.25, "offset": 0.25}
+    assert first["follower_start"] == {"measure": 1.0, "beat": 3.25, "offset": 2.25}
+    assert len(first["leader_note_ids"]) == first["note_count"]
+    assert len(first["follower_note_ids"]) == first["note_count"]
+    assert all(entry["note_count"] >= 6 for entry in result["entries"])
+
+
+def test_detect_imitation_respects_limits():
+    """max_lag bounds every entry's delay and limit truncates the entries."""
+    result = detect_imitation(
+        "CRIM_Model_0001.mei", max_lag=8, limit=2, include_note_ids=False
+    )
+
+    assert len(result["entries"]) == 2
+    assert result["truncated"] == (result["entry_count"] > 2)
+    assert all(entry["lag"] <= 8 for entry in result["entries"])
+    assert all("leader_note_ids" not in entry for entry in result["entries"])
+    assert all(pair["lag"] <= 8 for pair in result["voice_pairs"])
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [{"min_notes": 1}, {"max_lag": 0}, {"grid": -0.5}, {"kind": "x"}],
+)
+def test_detect_imitation_rejects_invalid_arguments(kwargs):
+    """Invalid arguments should raise ValueError."""
+    with pytest.raises(ValueError):
+        detect_imitation("Bach_BWV_0772.mei", **kwargs)
+
+
+def test_lag_counts_without_shared_symbols():
+    """Parts with no shared symbols never coincide."""
+    melodies, _, _ = _part_melodies(
+        load_melodic_score(get_mei_filepath("Bach_BWV_0772.mei")), "d", None
+    )
+    empty = _PartMelody(*(np.zeros(0, dtype=np.int64),) * 6)
+    assert not _lag_counts(melodies["1"], empty, 16).any()
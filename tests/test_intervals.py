@@ -1,5 +1,7 @@
 """Tests for MEI interval analysis tools."""
 
+import numpy as np
+import pandas as pd
 import pytest
 
 from src.encoding_music_mcp.tools.intervals import (
@@ -8,11 +10,22 @@ from src.encoding_music_mcp.tools.intervals import (
     get_harmonic_intervals,
     get_melodic_ngrams,
     count_melodic_ngrams,
+    count_melodic_ngrams_range,
     resolve_note_ids_for_highlight,
     get_melodic_ngram_matches,
     get_first_occur_melodic_ngrams,
     get_cadences,
+    _cadence_frame,
+    _load_melodic_ngram_dataframe,
+    _load_score_index,
+    _count_ngram_cells,
+    _melodic_ngram_analysis,
+    _ngram_cells,
+    _resolve_span_events,
+    _resolve_span_events_batch,
 )
+from src.encoding_music_mcp.tools.helpers import get_mei_filepath
+from src.encoding_music_mcp.tools.ngram_engine import REST_CODE, count_ngram_range
 
 
 def test_get_notes_bach():
@@ -233,6 +246,46 @@ def test_count_melodic_ngrams_returns_ranked_counts():
     assert first_pattern["count"] >= result["pattern_counts"][-1]["count"]
 
 
+@pytest.mark.parametrize("engine", ["crim", "numpy"])
+def test_count_melodic_ngrams_range_matches_single_lengths(engine):
+    """Test that a range sweep reproduces per-length count_melodic_ngrams."""
+    result = count_melodic_ngrams_range(
+        "Bach_BWV_0772.mei", n_min=2, n_max=5, engine=engine
+    )
+
+    assert [record["n"] for record in result["ngram_counts"]] == [2, 3, 4, 5]
+    for record in result["ngram_counts"]:
+        expected = count_melodic_ngrams(
+            "Bach_BWV_0772.mei", n=record["n"], engine=engine
+        )
+        assert record["pattern_counts"] == expected["pattern_counts"]
+
+
+def test_count_ngram_range_extends_windows_within_parts():
+    """Test incremental n-gram ids on a small coded sequence."""
+    sequences = [
+        np.array([0, 1, 0, 1]),
+        np.array([0, REST_CODE, 0, 1]),
+    ]
+
+    counts = count_ngram_range(sequences, ["2", "-2"], n_min=1, n_max=3)
+
+    assert counts[1] == [
+        {"pattern": ["2"], "pattern_string": "2", "count": 4},
+        {"pattern": ["-2"], "pattern_string": "-2", "count": 3},
+    ]
+    assert counts[2] == [
+        {"pattern": ["2", "-2"], "pattern_string": "2_-2", "count": 3},
+        {"pattern": ["-2", "2"], "pattern_string": "-2_2", "count": 1},
+    ]
+    assert counts[3] == [
+        {"pattern": ["-2", "2", "-2"], "pattern_string": "-2_2_-2", "count": 1},
+        {"pattern": ["2", "-2", "2"], "pattern_string": "2_-2_2", "count": 1},
+    ]
+    with pytest.raises(ValueError):
+        count_ngram_range(sequences, ["2", "-2"], n_min=3, n_max=2)
+
+
 def test_get_melodic_ngram_matches_groups_occurrences_by_pattern():
     """Test that melodic n-gram matches are keyed by pattern string."""
     result = get_melodic_ngram_matches("Bach_BWV_0772.mei", n=4, patterns=["2_2_2_-3"])
@@ -322,6 +375,155 @@ def test_resolve_note_ids_for_highlight_supports_offset_span():
     assert all(isinstance(note_id, str) for note_id in resolved["note_ids"])
 
 
+def test_score_index_is_cached_and_consistent():
+    """Test that one cached columnar score index serves every note lookup."""
+    filepath = get_mei_filepath("Bach_BWV_0772.mei")
+    score_index = _load_score_index(filepath)
+
+    assert _load_score_index(filepath) is score_index
+    assert set(score_index.parts) == {"1", "2"}
+    assert score_index.staff_ppq
+
+    for part_label, part in score_index.parts.items():
+        assert len(part.offset) == len(part.duration) == len(part.measure)
+        assert len(part.note_id_offsets) == len(part) + 1
+        assert (part.offset[1:] >= part.offset[:-1]).all(), "Onsets should be sorted"
+        event_indices = np.arange(len(part))
+        note_ids = score_index.event_note_ids(part_label, event_indices)
+        assert len(note_ids) == len(part.note_id_codes)
+        for note_id in note_ids:
+            located_part, event_index = score_index.note_id_events[note_id]
+            assert located_part == part_label
+            assert note_id in score_index.event_note_ids(
+                part_label, np.array([event_index])
+            )
+
+
+def test_batch_span_resolution_matches_single_span_resolution():
+    """Test that the batch resolver agrees with resolving spans one by one."""
+    score_index = _load_score_index(get_mei_filepath("Bach_BWV_0772.mei"))
+    part = score_index.parts["1"]
+    spans = [
+        {
+            "column": "1",
+            "start_measure": float(part.measure[idx]),
+            "start_beat": float(part.beat[idx]),
+            "start_offset": float(part.offset[idx]),
+            "note_count": 5,
+        }
+        for idx in range(0, len(part), 7)
+    ]
+    spans.extend(
+        [
+            {
+                "start_measure": 99.0,
+                "start_beat": 1.0,
+                "start_offset": 0.5,
+                "note_count": 3,
+            },
+            {"staff": "2", "start_q": 4.0, "note_count": 2},
+            {"start_q": 0.0, "end_q": 2.0},
+            {"start_measure": 2.0, "start_beat": 1.0},
+        ]
+    )
+
+    batch = _resolve_span_events_batch(score_index, spans)
+    single = [_resolve_span_events(score_index, span) for span in spans]
+
+    assert len(batch) == len(single)
+    for batch_selections, single_selections in zip(batch, single, strict=True):
+        assert [label for label, _ in batch_selections] == [
+            label for label, _ in single_selections
+        ]
+        for (_, batch_indices), (_, single_indices) in zip(
+            batch_selections, single_selections, strict=True
+        ):
+            assert batch_indices.tolist() == single_indices.tolist()
+
+
+def test_melodic_ngram_analysis_shares_one_traversal():
+    """Test that counts and matches from the fused pipeline agree."""
+    analysis = _melodic_ngram_analysis(
+        get_mei_filepath("Bach_BWV_0772.mei"), n=4, kind="d", entries=False
+    )
+
+    match_counts: dict[str, int] = {}
+    for match in analysis["matches"]:
+        match_counts[match["pattern_string"]] = (
+            match_counts.get(match["pattern_string"], 0) + 1
+        )
+    assert {
+        record["pattern_string"]: record["count"]
+        for record in analysis["pattern_counts"]
+    } == match_counts
+    assert not analysis["mel_ngrams"].empty
+
+
+def test_ngram_cells_keep_row_major_order_and_counts():
+    """Test vectorised cell stacking on a small detail-indexed frame."""
+    index = pd.MultiIndex.from_tuples(
+        [(1.0, 1.0, 0.0), (1.0, 2.0, 1.0), (2.0, 1.0, 4.0)],
+        names=["Measure", "Beat", "Offset"],
+    )
+    mel_ngrams = pd.DataFrame(
+        {
+            "1": [("2", "2"), "", ("-3", "2")],
+            "2": ["2, 2", ("2", "2"), ""],
+        },
+        index=index,
+    )
+
+    cells = _ngram_cells(mel_ngrams)
+
+    assert cells["column"].tolist() == ["1", "2", "2", "1"]
+    assert cells["offset"].tolist() == [0.0, 0.0, 1.0, 4.0]
+    assert cells["match_string"].tolist() == ["2_2", "2_2", "2_2", "-3_2"]
+    assert _count_ngram_cells(cells) == [
+        {"pattern": ["2", "2"], "pattern_string": "2_2", "count": 3},
+        {"pattern": ["-3", "2"], "pattern_string": "-3_2", "count": 1},
+    ]
+
+
+@pytest.mark.parametrize(
+    "filename,options",
+    [
+        ("Bach_BWV_0772.mei", {"n": 4, "kind": "d"}),
+        ("CRIM_Model_0001.mei", {"n": 3, "kind": "q", "combine_unisons": True}),
+        (
+            "CRIM_Model_0001.mei",
+            {"n": 2, "kind": "c", "combine_unisons": False, "compound": True},
+        ),
+    ],
+)
+def test_numpy_engine_matches_crim_frame(filename, options):
+    """Test that the native engine reproduces the CRIM n-gram frame."""
+    filepath = get_mei_filepath(filename)
+    crim = _load_melodic_ngram_dataframe(filepath, entries=False, **options)
+    native = _load_melodic_ngram_dataframe(
+        filepath, entries=False, engine="numpy", **options
+    )
+
+    pd.testing.assert_frame_equal(native, crim, check_exact=False)
+
+
+def test_count_melodic_ngrams_engines_agree():
+    """Test that ranked counts are identical for both engines."""
+    crim = count_melodic_ngrams("Bach_BWV_0772.mei", n=4)
+    native = count_melodic_ngrams("Bach_BWV_0772.mei", n=4, engine="numpy")
+
+    assert crim["engine"] == "crim"
+    assert native["engine"] == "numpy"
+    assert native["pattern_counts"] == crim["pattern_counts"]
+
+
+def test_numpy_engine_rejects_unsupported_options():
+    """Test engine validation and the CRIM-only entries filter."""
+    with pytest.raises(ValueError, match="engine"):
+        get_melodic_ngrams("Bach_BWV_0772.mei", engine="fortran")
+    with pytest.raises(ValueError, match="entries"):
+        get_melodic_ngrams("Bach_BWV_0772.mei", entries=True, engine="numpy")
+
+
 def test_get_first_occur_melodic_ngrams_bach():
     """Test first-occurrence melodic n-gram extraction for Bach BWV 0772."""
     result = get_first_occur_melodic_ngrams("Bach_BWV_0772.mei")
@@ -505,6 +707,38 @@ def test_get_cadences_morley():
     assert len(result["cadences"]) > 0, "Cadences should not be empty"
 
 
+def test_cadence_frame_leaves_cached_piece_unchanged():
+    """Adding composer and title columns must not touch a memoised frame."""
+
+    class _MemoisingPiece:
+        def __init__(self):
+            self.metadata = {"composer": "Morley", "title": "Canzonet"}
+            self.analyses = {
+                "Cadences": pd.DataFrame(
+                    {
+                        "Measure": [4],
+                        "Beat": [1.0],
+                        "Progress": [0.5],
+                        "CadType": ["Authentic"],
+                        "Tone": ["G"],
+                        "CVFs": ["CT"],
+                    }
+                )
+            }
+
+        def cadences(self):
+            return self.analyses["Cadences"]
+
+    piece = _MemoisingPiece()
+    columns = list(piece.cadences().columns)
+
+    frame = _cadence_frame(piece)
+
+    assert frame.iloc[0]["Composer"] == "Morley"
+    assert list(frame.columns[:2]) == ["Composer", "Title"]
+    assert list(piece.cadences().columns) == columns
+
+
 def test_get_cadences_contains_expected_columns():
     """Test that cadences contain expected column names."""
     result = get_cadences("Morley_1595_01_Go_ye_my_canzonettes.mei")
@@ -1,8 +1,19 @@
 """Tests for MEI key analysis tool."""
 
+import numpy as np
 import pytest
 
-from src.encoding_music_mcp.tools.key_analysis import analyze_key
+from src.encoding_music_mcp.tools.helpers import get_mei_filepath
+from src.encoding_music_mcp.tools.key_analysis import analyze_key, analyze_key_windows
+from src.encoding_music_mcp.tools.key_engine import (
+    KEY_NAMES,
+    KEY_PROFILES,
+    key_correlations,
+    normalise_profile,
+)
+from src.encoding_music_mcp.tools.visualisation.weighted_note_distribution import (
+    _load_pitch_class_table,
+)
 
 
 def test_analyze_key_bach():
@@ -93,3 +104,106 @@ def test_analyze_key_format():
 
     # Should start with a letter (the tonic)
     assert key_name[0].isalpha(), "Key name should start with a letter"
+
+
+@pytest.mark.parametrize(
+    "filename",
+    ["Bach_BWV_0772.mei", "Bach_BWV_0785.mei", "CRIM_Model_0001.mei"],
+)
+@pytest.mark.parametrize("profile", ["aarden", "krumhansl", "temperley"])
+def test_analyze_key_numpy_engine_matches_music21(filename, profile):
+    """The NumPy engine should reproduce music21's key and correlation."""
+    expected = analyze_key(filename, profile=profile)
+    result = analyze_key(filename, engine="numpy", profile=profile)
+
+    assert result["Key Name"] == expected["Key Name"]
+    assert result["Confidence Factor"] == pytest.approx(
+        expected["Confidence Factor"], abs=1e-6
+    )
+
+
+def test_analyze_key_numpy_engine_reads_scores_without_dur_ppq():
+    """Notes without @dur.ppq are weighted from @dur and @dots instead."""
+    expected = analyze_key("CRIM_Mass_0053_1.mei")
+    result = analyze_key("CRIM_Mass_0053_1.mei", engine="numpy")
+
+    assert result["Key Name"] == expected["Key Name"]
+    assert result["Confidence Factor"] == pytest.approx(
+        expected["Confidence Factor"], abs=1e-6
+    )
+
+
+def test_key_correlations_match_pearson():
+    """Batched correlations should equal Pearson r with each rotated profile."""
+    rng = np.random.default_rng(0)
+    distributions = rng.random((3, 4, 12))
+    correlations = key_correlations(distributions, "kessler")
+
+    assert correlations.shape == (3, 4, 24)
+    major, minor = KEY_PROFILES["krumhansl"]
+    for index in np.ndindex(distributions.shape[:-1]):
+        window = distributions[index]
+        for tonic in range(12):
+            for offset, weights in ((0, major), (12, minor)):
+                profile = np.roll(weights, tonic)
+                assert correlations[index][offset + tonic] == pytest.approx(
+                    np.corrcoef(window, profile)[0, 1]
+                )
+    assert not key_correlations(np.ones(12)).any()
+
+
+def test_analyze_key_rejects_unknown_engine_and_profile():
+    """Unknown engines and profile families should raise ValueError."""
+    with pytest.raises(ValueError, match="engine"):
+        analyze_key("Bach_BWV_0772.mei", engine="fast")
+    with pytest.raises(ValueError, match="profile"):
+        analyze_key("Bach_BWV_0772.mei", engine="numpy", profile="mozart")
+    assert normalise_profile("key.Bellman-Budge") == "bellman"
+    assert normalise_profile("key") == "aarden"
+
+
+def test_analyze_key_windows_match_per_window_analysis():
+    """Each batched window should equal a separate analysis of its measures."""
+    result = analyze_key_windows("Bach_BWV_0772.mei", window_measures=5, hop_measures=3)
+    table = _load_pitch_class_table(get_mei_filepath("Bach_BWV_0772.mei"))
+
+    assert (
+        result["global_key"]["key"]
+        == analyze_key("Bach_BWV_0772.mei", engine="numpy")["Key Name"]
+    )
+    spans = [(w["start_measure"], w["end_measure"]) for w in result["windows"]]
+    assert spans == [(1, 5), (4, 8), (7, 11), (10, 14), (13, 17), (16, 20), (18, 22)]
+    for window in result["windows"]:
+        durations, _ = table.window(window["start_measure"], window["end_measure"])
+        correlations = key_correlations(durations.sum(axis=0))
+        assert window["key"] == KEY_NAMES[int(correlations.argmax())]
+        assert window["correlation"] == pytest.approx(correlations.max())
+    # Invention No. 1 moves to the dominant before returning home.
+    assert result["windows"][0]["key"] == "C major"
+    assert "G major" in {change["to_key"] for change in result["key_changes"]}
+
+
+def test_analyze_key_windows_reads_scores_without_dur_ppq():
+    """Scores encoded without @dur.ppq still yield keyed windows."""
+    result = analyze_key_windows("CRIM_Mass_0053_1.mei", window_measures=8)
+
+    assert result["window_count"] > 1
+    assert all(window["key"] is not None for window in result["windows"])
+    numpy_key = analyze_key("CRIM_Mass_0053_1.mei", engine="numpy")["Key Name"]
+    assert result["global_key"]["key"] == numpy_key == "g minor"
+
+
+def test_analyze_key_windows_names_included_movements():
+    """Mass wrappers that only include movement files point to those files."""
+    with pytest.raises(ValueError, match="CRIM_Mass_0002_1.mei"):
+        analyze_key_windows("CRIM_Mass_0002.mei")
+
+
+def test_analyze_key_windows_invalid_arguments():
+    """Non-positive window or hop sizes should raise ValueError."""
+    with pytest.raises(ValueError):
+        analyze_key_windows("Bach_BWV_0772.mei", window_measures=0)
+    with pytest.raises(ValueError):
+        analyze_key_windows("Bach_BWV_0772.mei", hop_measures=0)
+    with pytest.raises(FileNotFoundError):
+        analyze_key_windows("nonexistent_file.mei")
@@ -1,13 +1,24 @@
 """Tests for show_notation tools."""
 
 import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import pytest
 
 from src.encoding_music_mcp.server import mcp
+from src.encoding_music_mcp.tools import notation
 from src.encoding_music_mcp.tools.helpers import remove_uploaded_mei
-from src.encoding_music_mcp.tools.notation import show_notation, show_notation_highlight
+from src.encoding_music_mcp.tools.notation import (
+    _SVG_PAGES,
+    _build_measure_index,
+    _filter_measures,
+    show_notation,
+    show_notation_highlight,
+)
+from src.encoding_music_mcp.tools.prefetch import get_prefetcher
+from src.encoding_music_mcp.tools.toolkit_pool import get_toolkit_pool
 
 
 class _AcceptedElicitation:
@@ -145,7 +156,79 @@ def test_show_notation_measure_range_fewer_pages():
         show_notation("Bach_BWV_0772.mei", start_measure=19, end_measure=22)
     )
 
-    assert subset.structured_content["total_pages"] < full.structured_content["total_pages"]
+    assert (
+        subset.structured_content["total_pages"]
+        < full.structured_content["total_pages"]
+    )
+
+
+def test_measure_index_slices_without_dropping_score_changes(tmp_path):
+    """Slicing keeps earlier scoreDef changes and drops whole endings."""
+    path = tmp_path / "score.mei"
+    path.write_text(
+        '<mei xmlns="http://www.music-encoding.org/ns/mei"><section>'
+        '<measure n="1"><staff n="1"/></measure>'
+        '<scoreDef meter.count="3" meter.unit="4"/>'
+        '<measure n="2"><staff n="1"/></measure>'
+        '<ending n="1"><measure n="3"/><measure n="4"/></ending>'
+        "</section></mei>",
+        encoding="utf-8",
+    )
+
+    sliced = _build_measure_index(path).slice(2, 2)
+
+    assert '<measure n="1">' not in sliced
+    assert '<scoreDef meter.count="3" meter.unit="4"/>' in sliced
+    assert '<measure n="2">' in sliced
+    assert "<ending" not in sliced
+    assert _build_measure_index(path).slice(4, 4).count("<measure") == 2
+
+
+def test_measure_index_reads_single_quoted_numbers(tmp_path):
+    """Measure numbers are found whichever quotes the attribute uses."""
+    path = tmp_path / "score.mei"
+    path.write_text(
+        "<mei xmlns='http://www.music-encoding.org/ns/mei'><section>"
+        "<measure n='1'/><measure n = \"2\"/><measure n='3'/>"
+        "</section></mei>",
+        encoding="utf-8",
+    )
+
+    index = _build_measure_index(path)
+
+    assert index.numbers == [[1], [2], [3]]
+    assert index.slice(2, 2).count("<measure") == 1
+
+
+def test_non_integer_measure_numbers_fall_back_to_filtering(tmp_path):
+    """A measure number like "3a" leaves the slicing to the XML filter."""
+    mei = (
+        '<mei xmlns="http://www.music-encoding.org/ns/mei"><section>'
+        '<measure n="1"/><measure n="2"/>'
+        '<ending n="1"><measure n="3a"/></ending>'
+        '<measure n="4b"/>'
+        "</section></mei>"
+    )
+    path = tmp_path / "score.mei"
+    path.write_text(mei, encoding="utf-8")
+
+    assert _build_measure_index(path).spans == []
+    filtered = _filter_measures(mei, 2, 3)
+    assert '<measure n="1"' not in filtered
+    assert '<measure n="2"' in filtered
+    assert 'n="3a"' in filtered
+    assert 'n="4b"' not in filtered
+
+
+def test_show_notation_measure_range_excludes_other_endings():
+    """Measures inside volta endings outside the range are not rendered."""
+    result = asyncio.run(
+        show_notation("Morley_1595_09_In_nets_of_golden.mei", start_measure=5)
+    )
+
+    svg = result.structured_content["svg"]
+    assert result.structured_content["total_pages"] == 1
+    assert svg.count('class="measure"') == 1
 
 
 def test_show_notation_single_measure():
@@ -184,7 +267,9 @@ def test_show_notation_page_navigation():
     if total > 1:
         result_p2 = asyncio.run(show_notation("Bach_BWV_0772.mei", page=2))
         assert result_p2.structured_content["page"] == 2
-        assert result_p2.structured_content["svg"] != result_p1.structured_content["svg"]
+        assert (
+            result_p2.structured_content["svg"] != result_p1.structured_content["svg"]
+        )
 
 
 def test_show_notation_page_clamping():
@@ -197,6 +282,59 @@ def test_show_notation_page_clamping():
     assert result_low.structured_content["page"] == 1
 
 
+def test_show_notation_serves_rendered_pages_from_memory_and_disk(
+    tmp_path, monkeypatch
+):
+    """Rendered pages are reused from memory, then from disk after a restart."""
+    monkeypatch.setenv("MCP_ARTIFACT_DIR", str(tmp_path))
+    # Background renders would change the counters under test.
+    get_prefetcher().wait_idle()
+    monkeypatch.setattr(get_prefetcher(), "max_pending", 0)
+    _SVG_PAGES.clear()
+    pool = get_toolkit_pool()
+    pool.clear()
+
+    first = asyncio.run(show_notation("Bach_BWV_0772.mei", start_measure=3, page=1))
+    loads = pool.stats()["misses"]
+    again = asyncio.run(show_notation("Bach_BWV_0772.mei", start_measure=3, page=1))
+    assert _SVG_PAGES.stats()["hits"] == 2
+
+    # A restart empties memory and the toolkit pool but keeps the disk tier.
+    _SVG_PAGES.clear()
+    pool.clear()
+    restarted = asyncio.run(show_notation("Bach_BWV_0772.mei", start_measure=3, page=1))
+
+    assert loads == 1
+    assert pool.stats()["misses"] == 0
+    assert again.structured_content == first.structured_content
+    assert restarted.structured_content == first.structured_content
+
+
+def test_concurrent_requests_for_one_page_render_it_once(monkeypatch):
+    """A page a prefetch is rendering is shared, not rendered a second time."""
+    get_prefetcher().wait_idle()
+    _SVG_PAGES.clear()
+    renders = []
+    normalise = notation._normalise_svg_text
+
+    def slow_normalise(svg):
+        renders.append(1)
+        time.sleep(0.5)
+        return normalise(svg)
+
+    monkeypatch.setattr(notation, "_normalise_svg_text", slow_normalise)
+    filepath = _sample_mei_path()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        pages = list(
+            executor.map(
+                lambda _: notation._page_svg(filepath, None, None, 2), range(2)
+            )
+        )
+
+    assert renders == [1]
+    assert pages[0] == pages[1]
+
+
 def test_show_notation_highlight_includes_note_ids():
     """Test highlight-capable notation payload includes requested note IDs."""
     result = asyncio.run(
@@ -214,6 +352,39 @@ def test_show_notation_highlight_includes_note_ids():
     assert result.structured_content["svg"].startswith("<svg")
 
 
+def test_show_notation_highlight_opens_on_first_highlighted_page():
+    """Without a page, the page holding the first highlight is rendered."""
+    last_note = "n2d49nm"
+    result = asyncio.run(
+        show_notation_highlight(
+            "Bach_BWV_0772.mei",
+            highlight_note_ids=[last_note, "nz7y0rb", "missing-id"],
+        )
+    )
+    get_prefetcher().wait_idle()
+
+    structured = result.structured_content
+    assert structured["page"] == structured["total_pages"] > 1
+    assert last_note in structured["svg"]
+    assert structured["highlight_pages"] == [
+        {"page": 1, "note_ids": ["nz7y0rb"]},
+        {"page": structured["total_pages"], "note_ids": [last_note]},
+    ]
+
+
+def test_show_notation_highlight_keeps_explicit_page():
+    """An explicit page wins over the page of the first highlight."""
+    result = asyncio.run(
+        show_notation_highlight(
+            "Bach_BWV_0772.mei", highlight_note_ids=["n2d49nm"], page=1
+        )
+    )
+    get_prefetcher().wait_idle()
+
+    assert result.structured_content["page"] == 1
+    assert result.structured_content["highlight_pages"][0]["page"] > 1
+
+
 def test_notation_tools_do_not_require_custom_output_schemas():
     """App-backed notation tools should register without handwritten schemas."""
     tools = {tool.name: tool for tool in asyncio.run(mcp.list_tools())}
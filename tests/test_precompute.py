@@ -0,0 +1,95 @@
+"""Tests for precomputing the bundled-corpus artifact pack."""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from src.encoding_music_mcp import precompute
+from src.encoding_music_mcp.precompute import main, precompute_file
+from src.encoding_music_mcp.tools.artifact_store import (
+    ArtifactStore,
+    get_artifact_store,
+)
+from src.encoding_music_mcp.tools.intervals import count_melodic_ngrams
+from src.encoding_music_mcp.tools.metadata import get_mei_metadata
+from src.encoding_music_mcp.tools.score_cache import get_score_cache
+
+
+def test_precompute_file_stores_artifacts_that_tools_reuse(tmp_path, monkeypatch):
+    """Tools called with precomputed parameters are served from the store."""
+    monkeypatch.setenv("MCP_ARTIFACT_DIR", str(tmp_path))
+    # Scores cached in memory by earlier tests would bypass the store.
+    get_score_cache().clear()
+
+    assert precompute_file("Bach_BWV_0772.mei", (4,)) == []
+
+    store = get_artifact_store()
+    analyses = store.stats()["analyses"]
+    for analysis in (
+        "cadences",
+        "crim_melodic_intervals",
+        "crim_notes",
+        "mei_metadata",
+        "melodic_ngram_counts",
+        "melodic_score",
+        "pitch_class_table",
+        "score_index",
+        "voice_ranges",
+    ):
+        assert analyses[analysis]["artifacts"] == 1
+    before = store.stats()["artifacts"]
+    assert count_melodic_ngrams("Bach_BWV_0772.mei", n=4)["pattern_counts"]
+    assert get_mei_metadata("Bach_BWV_0772.mei")["composer"]
+    assert store.stats()["artifacts"] == before
+
+
+def test_precompute_rejects_unknown_collection(tmp_path, monkeypatch, capsys):
+    """An unknown collection name is reported without computing anything."""
+    # main() sets the variable itself; this restores it afterwards.
+    monkeypatch.setenv("MCP_ARTIFACT_DIR", "")
+    assert main(["--collection", "nope", "--artifact-dir", str(tmp_path)]) == 2
+    assert "Unknown collection" in capsys.readouterr().err
+
+
+def test_precompute_file_reports_analyses_that_were_not_stored(monkeypatch):
+    """An analysis that runs but leaves no artifact is reported as an error."""
+    get_score_cache().clear()
+    monkeypatch.setattr(ArtifactStore, "_save", lambda *args: None)
+
+    errors = precompute_file("Bach_BWV_0772.mei", (4,))
+
+    assert "crim_notes: computed but not stored" in errors
+    assert "melodic_ngram_counts n=4: computed but not stored" in errors
+
+
+def test_precompute_exit_status_reports_failures(tmp_path, monkeypatch, capsys):
+    """Failed analyses give exit status 1; scores without notes are skipped."""
+    monkeypatch.setenv("MCP_ARTIFACT_DIR", "")
+    monkeypatch.setattr(
+        precompute,
+        "ProcessPoolExecutor",
+        lambda max_workers, mp_context: ThreadPoolExecutor(max_workers),
+    )
+    outcomes = {"Bach_BWV_0772.mei": (True, ["cadences: ValueError: bad"])}
+    monkeypatch.setattr(
+        precompute,
+        "_precompute_in_worker",
+        lambda filename, ngram_lengths: outcomes.get(filename, (False, [])),
+    )
+    args = ["--collection", "bach_inventions", "--artifact-dir", str(tmp_path)]
+
+    assert main(args) == 1
+    captured = capsys.readouterr()
+    assert "cadences: ValueError: bad" in captured.err
+    assert "1 analyses failed or were not stored; 14 scores without notes" in (
+        captured.out
+    )
+
+    outcomes.clear()
+    assert main(args) == 0
+
+
+def test_precompute_skips_scores_without_notes():
+    """CRIM files that only include their movements are skipped, not failed."""
+    assert precompute._precompute_in_worker("CRIM_Mass_0002.mei", (4,)) == (
+        False,
+        [],
+    )
@@ -0,0 +1,67 @@
+"""Tests for background prefetching of notation pages."""
+
+import asyncio
+import time
+
+from src.encoding_music_mcp.tools.notation import _SVG_PAGES, show_notation
+from src.encoding_music_mcp.tools.prefetch import Prefetcher, get_prefetcher
+
+
+def test_prefetcher_skips_duplicates_and_bounds_its_queue():
+    """Queued keys are not queued twice, and a full queue drops new jobs."""
+    prefetcher = Prefetcher(max_pending=2)
+    ran = []
+
+    with prefetcher.foreground():
+        assert prefetcher.submit("a", lambda: ran.append("a"))
+        assert not prefetcher.submit("a", lambda: ran.append("a"))
+        assert prefetcher.submit("b", lambda: ran.append("b"))
+        assert not prefetcher.submit("c", lambda: ran.append("c"))
+
+    assert prefetcher.wait_idle(timeout=5)
+    assert sorted(ran) == ["a", "b"]
+    assert prefetcher.stats()["dropped"] == 1
+
+
+def test_prefetcher_waits_for_foreground_requests():
+    """Jobs start only once no foreground request is running."""
+    prefetcher = Prefetcher(max_pending=4)
+    ran = []
+
+    with prefetcher.foreground():
+        prefetcher.submit("job", lambda: ran.append(1))
+        time.sleep(0.05)
+        assert ran == []
+
+    assert prefetcher.wait_idle(timeout=5)
+    assert ran == [1]
+
+
+def test_prefetcher_discards_job_errors():
+    """A failing job does not stop later jobs."""
+    prefetcher = Prefetcher(max_pending=4)
+    ran = []
+
+    prefetcher.submit("bad", lambda: 1 / 0)
+    prefetcher.submit("good", lambda: ran.append(1))
+
+    assert prefetcher.wait_idle(timeout=5)
+    assert ran == [1]
+    assert prefetcher.stats()["completed"] == 2
+
+
+def test_show_notation_prefetches_the_next_page(tmp_path, monkeypatch):
+    """After page 1 is served, page 2 is already cached."""
+    monkeypatch.setenv("MCP_ARTIFACT_DIR", str(tmp_path))
+    prefetcher = get_prefetcher()
+    prefetcher.wait_idle()
+    _SVG_PAGES.clear()
+
+    asyncio.run(show_notation("Bach_BWV_0772.mei", page=1))
+    assert prefetcher.wait_idle(timeout=60)
+    hits = _SVG_PAGES.stats()["hits"]
+    result = asyncio.run(show_notation("Bach_BWV_0772.mei", page=2))
+
+    assert result.structured_content["page"] == 2
+    # The page count and page 2 are both served from memory.
+    assert _SVG_PAGES.stats()["hits"] == hits + 2
@@ -0,0 +1,132 @@
+"""Tests for the shared parsed-score cache."""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.encoding_music_mcp.tools.helpers import get_mei_filepath
+from src.encoding_music_mcp.tools.intervals import _load_piece, get_notes
+from src.encoding_music_mcp.tools.score_cache import ScoreCache, get_score_cache
+
+
+def test_score_cache_counts_hits_and_misses(tmp_path):
+    """Repeated loads of an unchanged file are served from the cache."""
+    path = tmp_path / "score.mei"
+    path.write_text("<mei/>", encoding="utf-8")
+    cache = ScoreCache(max_bytes=1024)
+    loads = []
+
+    def loader(filepath):
+        loads.append(filepath)
+        return filepath.read_text(encoding="utf-8")
+
+    assert cache.get_or_load("text", path, loader) == "<mei/>"
+    assert cache.get_or_load("text", path, loader) == "<mei/>"
+
+    stats = cache.stats()
+    assert len(loads) == 1
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["entries"] == 1
+
+
+def test_score_cache_reloads_modified_files(tmp_path):
+    """A changed mtime or size invalidates the cached artifact."""
+    path = tmp_path / "score.mei"
+    path.write_text("<mei/>", encoding="utf-8")
+    cache = ScoreCache(max_bytes=1024)
+
+    def loader(filepath):
+        return filepath.read_text(encoding="utf-8")
+
+    cache.get_or_load("text", path, loader)
+    path.write_text("<mei></mei>", encoding="utf-8")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert cache.get_or_load("text", path, loader) == "<mei></mei>"
+    assert cache.stats()["entries"] == 1, "Stale fingerprints should be dropped"
+
+
+def test_score_cache_evicts_least_recently_used(tmp_path):
+    """Entries beyond the memory budget are evicted in LRU order."""
+    paths = []
+    for index in range(3):
+        path = tmp_path / f"score_{index}.mei"
+        path.write_text("<mei/>", encoding="utf-8")
+        paths.append(path)
+    cache = ScoreCache(max_bytes=250)
+
+    def loader(filepath):
+        return filepath.name
+
+    def size_estimate(filepath, value):
+        return 100
+
+    cache.get_or_load("name", paths[0], loader, size_estimate)
+    cache.get_or_load("name", paths[1], loader, size_estimate)
+    cache.get_or_load("name", paths[0], loader, size_estimate)
+    cache.get_or_load("name", paths[2], loader, size_estimate)
+
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["evictions"] == 1
+    assert stats["estimated_bytes"] == 200
+
+    cache.get_or_load("name", paths[0], loader, size_estimate)
+    assert cache.stats()["hits"] == 2, "Recently used entry should survive eviction"
+
+
+def test_crim_tools_share_cached_piece():
+    """CRIM-backed tools reuse one parsed piece per file."""
+    filepath = get_mei_filepath("Bach_BWV_0772.mei")
+    piece = _load_piece(filepath)
+    hits_before = get_score_cache().stats()["hits"]
+
+    get_notes("Bach_BWV_0772.mei")
+
+    assert _load_piece(filepath) is piece
+    assert get_score_cache().stats()["hits"] >= hits_before + 2
+
+
+def test_load_piece_missing_file():
+    """Missing files raise FileNotFoundError before touching the cache."""
+    with pytest.raises(FileNotFoundError):
+        _load_piece(get_mei_filepath("nonexistent_file.mei"))
+
+
+def test_score_cache_shares_loads_already_in_flight(tmp_path):
+    """Concurrent misses on one entry wait for the first load, errors included."""
+    path = tmp_path / "score.mei"
+    path.write_text("<mei/>", encoding="utf-8")
+    cache = ScoreCache(max_bytes=1024)
+    started = threading.Event()
+    release = threading.Event()
+    loads = []
+
+    def slow_loader(filepath):
+        loads.append(filepath)
+        started.set()
+        release.wait(5)
+        if len(loads) == 1:
+            raise ValueError("first load fails")
+        return "<mei/>"
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        first = executor.submit(cache.get_or_load, "text", path, slow_loader)
+        started.wait(5)
+        waiting = executor.submit(cache.get_or_load, "text", path, slow_loader)
+        # The second caller is counted as a hit once it waits on the load.
+        while cache.stats()["hits"] == 0:
+            time.sleep(0.01)
+        release.set()
+        for future in (first, waiting):
+            with pytest.raises(ValueError, match="first load fails"):
+                future.result()
+
+    # A failed load is not cached, so the next call loads again.
+    assert cache.get_or_load("text", path, slow_loader) == "<mei/>"
+    assert len(loads) == 2
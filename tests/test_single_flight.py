@@ -0,0 +1,115 @@
+"""Tests for single-flight coalescing of tool calls."""
+
+import asyncio
+
+import pytest
+from fastmcp import Context
+
+from src.encoding_music_mcp.tools.single_flight import (
+    coalesce,
+    filename_is_known,
+    in_flight_count,
+)
+
+
+def _counting_tool():
+    calls = []
+
+    async def render(filename: str, page: int = 1, ctx: Context | None = None) -> dict:
+        calls.append((filename, page))
+        await asyncio.sleep(0.05)
+        return {"filename": filename, "page": page}
+
+    return calls, render
+
+
+def test_identical_concurrent_calls_share_one_computation():
+    """Calls equal after defaults are applied should run once."""
+    calls, render = _counting_tool()
+    tool = coalesce(render)
+
+    async def scenario():
+        return await asyncio.gather(
+            tool("Bach_BWV_0772.mei"),
+            tool("Bach_BWV_0772.mei", page=1),
+            tool(filename="Bach_BWV_0772.mei", ctx=object()),
+            tool("Bach_BWV_0772.mei", page=2),
+        )
+
+    first, second, third, other = asyncio.run(scenario())
+
+    assert calls == [("Bach_BWV_0772.mei", 1), ("Bach_BWV_0772.mei", 2)]
+    assert first is second
+    assert third == first
+    assert other["page"] == 2
+    assert in_flight_count() == 0
+
+    # Completed calls are not cached.
+    asyncio.run(tool("Bach_BWV_0772.mei"))
+    assert len(calls) == 3
+
+
+def test_errors_are_shared_and_unshareable_calls_run_alone():
+    """Followers should see the leader's error; vetoed calls never share."""
+    attempts = []
+
+    async def fail(filename: str) -> dict:
+        attempts.append(filename)
+        await asyncio.sleep(0.05)
+        raise FileNotFoundError(filename)
+
+    tool = coalesce(fail, shareable=lambda arguments: arguments["filename"] != "x")
+
+    async def scenario():
+        return await asyncio.gather(
+            tool("a"), tool("a"), tool("x"), tool("x"), return_exceptions=True
+        )
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(result, FileNotFoundError) for result in results)
+    assert sorted(attempts) == ["a", "x", "x"]
+
+
+def test_cancellation_only_stops_work_when_every_caller_leaves():
+    """One cancelled caller should not cancel the computation for the rest."""
+    finished = []
+    cancelled = []
+
+    async def slow(filename: str) -> str:
+        try:
+            await asyncio.sleep(0.2)
+        except asyncio.CancelledError:
+            cancelled.append(filename)
+            raise
+        finished.append(filename)
+        return filename
+
+    tool = coalesce(slow)
+
+    async def scenario():
+        leader = asyncio.create_task(tool("a"))
+        follower = asyncio.create_task(tool("a"))
+        await asyncio.sleep(0.05)
+        leader.cancel()
+        assert await follower == "a"
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+
+        both = [asyncio.create_task(tool("b")) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        for task in both:
+            task.cancel()
+        await asyncio.gather(*both, return_exceptions=True)
+        await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+    assert finished == ["a"]
+    assert cancelled == ["b"]
+    assert in_flight_count() == 0
+
+
+def test_filename_is_known():
+    """Only calls naming an existing score are shareable between clients."""
+    assert filename_is_known({"filename": "Bach_BWV_0772.mei"})
+    assert not filename_is_known({"filename": None})
+    assert not filename_is_known({"filename": "nonexistent_file.mei"})
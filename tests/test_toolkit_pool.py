@@ -0,0 +1,95 @@
+"""Tests for the pooled Verovio toolkits behind notation rendering."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.encoding_music_mcp.tools.notation import _SVG_PAGES, show_notation
+from src.encoding_music_mcp.tools.prefetch import get_prefetcher
+from src.encoding_music_mcp.tools.toolkit_pool import ToolkitPool, get_toolkit_pool
+
+
+def test_toolkit_pool_reuses_and_evicts_least_recently_used():
+    """Toolkits are loaded once per key and capped at ``max_toolkits``."""
+    pool = ToolkitPool(max_toolkits=2)
+    loads = []
+
+    def load(key):
+        def _load():
+            loads.append(key)
+            return object()
+
+        return _load
+
+    for key in ["a", "b", "a", "c", "a", "b"]:
+        with pool.acquire(key, load(key)):
+            pass
+
+    assert loads == ["a", "b", "c", "b"]
+    stats = pool.stats()
+    assert stats["toolkits"] == 2
+    assert stats["evictions"] == 2
+    assert stats["hits"] == 2
+
+
+def test_toolkit_pool_drops_failed_loads():
+    """A load that raises leaves no entry behind, so the next call retries."""
+    pool = ToolkitPool(max_toolkits=2)
+
+    def fail():
+        raise ValueError("bad MEI")
+
+    with pytest.raises(ValueError, match="bad MEI"), pool.acquire("a", fail):
+        pass
+
+    assert pool.stats()["toolkits"] == 0
+    with pool.acquire("a", lambda: "loaded") as toolkit:
+        assert toolkit == "loaded"
+
+
+def test_toolkit_pool_serialises_access_to_one_toolkit():
+    """Threads sharing a key load once and never use the toolkit together."""
+    pool = ToolkitPool(max_toolkits=2)
+    loads = []
+    active = []
+    overlaps = []
+
+    def use():
+        with pool.acquire("a", lambda: loads.append(1) or "toolkit"):
+            active.append(1)
+            overlaps.append(len(active) > 1)
+            time.sleep(0.01)
+            active.pop()
+
+    threads = [threading.Thread(target=use) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert loads == [1]
+    assert not any(overlaps)
+
+
+def test_show_notation_pages_share_one_toolkit(tmp_path, monkeypatch):
+    """Paging through a score lays it out once."""
+    monkeypatch.setenv("MCP_ARTIFACT_DIR", str(tmp_path))
+    # Background renders would change the counters under test.
+    get_prefetcher().wait_idle()
+    monkeypatch.setattr(get_prefetcher(), "max_pending", 0)
+    _SVG_PAGES.clear()
+    pool = get_toolkit_pool()
+    pool.clear()
+
+    async def page_through():
+        return [
+            await show_notation("Bach_BWV_0772.mei", page=page) for page in (1, 2, 3)
+        ]
+
+    results = asyncio.run(page_through())
+
+    assert [result.structured_content["page"] for result in results] == [1, 2, 3]
+    assert pool.stats()["misses"] == 1
+    assert pool.stats()["hits"] == 3
@@ -1,14 +1,33 @@
 """Tests for weighted note-distribution visualisation."""
 
 import math
+import xml.etree.ElementTree as ET
 
 import pytest
 
 from src.encoding_music_mcp.tools.visualisation.weighted_note_distribution import (
+    _MEI_NS,
+    _build_pitch_class_table,
+    _note_pitch_class,
     plot_weighted_note_distribution,
 )
 
 
+def _write_mei(tmp_path, measures):
+    """Write a one-staff MEI file with one measure per (n, notes) pair."""
+    body = "".join(
+        f'<measure n="{n}"><staff n="1"><layer n="1">{notes}</layer></staff></measure>'
+        for n, notes in measures
+    )
+    path = tmp_path / "score.mei"
+    path.write_text(
+        '<mei xmlns="http://www.music-encoding.org/ns/mei"><music><body><mdiv>'
+        f"<score><section>{body}</section></score></mdiv></body></music></mei>",
+        encoding="utf-8",
+    )
+    return path
+
+
 def test_plot_weighted_note_distribution_bach():
     """Combined score view should return one scaled trace."""
     result = plot_weighted_note_distribution("Bach_BWV_0772.mei")
@@ -123,3 +142,143 @@ def test_plot_weighted_note_distribution_invalid_file():
     """Invalid filenames should raise FileNotFoundError."""
     with pytest.raises(FileNotFoundError):
         plot_weighted_note_distribution("nonexistent_file.mei")
+
+
+def test_plot_weighted_note_distribution_measure_windows_add_up():
+    """Adjacent measure windows should sum to the whole score's weights."""
+    whole = plot_weighted_note_distribution(
+        "Bach_BWV_0772.mei", group_by_staff=True, limit_to_active=False
+    ).structured_content
+    first = plot_weighted_note_distribution(
+        "Bach_BWV_0772.mei", group_by_staff=True, limit_to_active=False, end_measure=10
+    ).structured_content
+    second = plot_weighted_note_distribution(
+        "Bach_BWV_0772.mei",
+        group_by_staff=True,
+        limit_to_active=False,
+        start_measure=11,
+    ).structured_content
+
+    assert "start_measure" not in whole
+    assert (first["start_measure"], first["end_measure"]) == (None, 10)
+    assert (second["start_measure"], second["end_measure"]) == (11, None)
+    for total, head, tail in zip(
+        whole["traces"], first["traces"], second["traces"], strict=True
+    ):
+        assert 0 < head["note_count"] < total["note_count"]
+        assert head["note_count"] + tail["note_count"] == total["note_count"]
+        assert (
+            head["total_weight_ppq"] + tail["total_weight_ppq"]
+            == (total["total_weight_ppq"])
+        )
+        assert [
+            a + b
+            for a, b in zip(
+                head["raw_weights_ppq"], tail["raw_weights_ppq"], strict=True
+            )
+        ] == total["raw_weights_ppq"]
+
+
+def test_plot_weighted_note_distribution_single_measure():
+    """A one-measure window should only count that measure's notes."""
+    result = plot_weighted_note_distribution(
+        "Bach_BWV_0772.mei",
+        pitch_class_order="chromatic",
+        start_measure=1,
+        end_measure=1,
+    )
+    structured = result.structured_content
+
+    assert "Measures 1 to 1" in result.content[0].text
+    # Measure 1 of Invention No. 1 holds 18 notes of a C major motive.
+    assert structured["traces"][0]["note_count"] == 18
+    assert set(structured["categories"]) <= {"C", "D", "E", "F", "G", "A", "B"}
+
+
+def test_plot_weighted_note_distribution_invalid_window():
+    """Reversed or empty windows should raise ValueError."""
+    with pytest.raises(ValueError):
+        plot_weighted_note_distribution(
+            "Bach_BWV_0772.mei", start_measure=5, end_measure=2
+        )
+    with pytest.raises(ValueError, match="No sounding notes"):
+        plot_weighted_note_distribution("Bach_BWV_0772.mei", start_measure=1000)
+
+
+@pytest.mark.parametrize(
+    ("attributes", "children", "expected"),
+    [
+        ('accid="s"', "", "F#"),
+        ('accid="s" accid.ges="f"', "", "E"),
+        ('accid="f"', '<accid accid="s"/>', "F#"),
+        ('accid="f"', '<accid accid.ges="s"/>', "F#"),
+        ('accid.ges="f"', '<accid accid="s"/>', "E"),
+        ("", '<accid accid="s" accid.ges="n"/>', "F"),
+    ],
+)
+def test_note_pitch_class_accidental_precedence(attributes, children, expected):
+    """Gestural accidentals beat written ones, and <accid> beats @accid."""
+    note = ET.fromstring(
+        f'<note xmlns="{_MEI_NS["mei"]}" pname="f" oct="4" {attributes}>'
+        f"{children}</note>"
+    )
+
+    assert _note_pitch_class(note) == expected
+
+
+def test_plot_weighted_note_distribution_reads_gestural_accid_elements():
+    """Accidentals implied by the key signature should be counted as sounding."""
+    structured = plot_weighted_note_distribution(
+        "Bach_BWV_0785.mei",
+        pitch_class_order="chromatic",
+        limit_to_active=False,
+    ).structured_content
+    weights = dict(
+        zip(structured["categories"], structured["traces"][0]["values"], strict=True)
+    )
+
+    # Invention No. 14 is in B-flat major.
+    assert weights["B-"] > weights["B"]
+    assert weights["E-"] > weights["E"]
+
+
+def test_pitch_class_table_keeps_unnumbered_measures_out_of_windows(tmp_path):
+    """A non-numeric measure ``n`` must not merge with a real measure number."""
+    path = _write_mei(
+        tmp_path,
+        [
+            ("1", '<note pname="c" oct="4" dur="4" dur.ppq="4"/>'),
+            ("X", '<note pname="d" oct="4" dur="4" dur.ppq="4"/>'),
+            ("2", '<note pname="e" oct="4" dur="4" dur.ppq="4"/>'),
+        ],
+    )
+    table = _build_pitch_class_table(path)
+
+    _, counts = table.window(2, 2)
+    assert counts.sum(axis=0).nonzero()[0].tolist() == [4]
+    _, counts = table.window(None, None)
+    assert counts.sum(axis=0).nonzero()[0].tolist() == [0, 2, 4]
+    assert [table.measure_label(row) for row in range(3)] == [1, None, 2]
+
+
+def test_pitch_class_table_weights_notes_without_dur_ppq(tmp_path):
+    """Without @dur.ppq, weights follow @dur, @dots, and tuplet ratios."""
+    path = _write_mei(
+        tmp_path,
+        [
+            (
+                "1",
+                (
+                    '<note pname="c" oct="4" dur="4" dots="1"/>'
+                    '<tuplet num="3" numbase="2">'
+                    + '<note pname="d" oct="4" dur="8"/>' * 3
+                    + '</tuplet><note pname="e" oct="4" dur="8" grace="acc"/>'
+                ),
+            ),
+        ],
+    )
+    durations, counts = _build_pitch_class_table(path).window(None, None)
+
+    # A dotted quarter and a quarter-note triplet, with the grace note ignored.
+    assert durations[0, 0] == pytest.approx(1.5 * durations[0, 2])
+    assert counts[0].tolist()[:5] == [1, 0, 3, 0, 0]
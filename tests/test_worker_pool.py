@@ -0,0 +1,146 @@
+"""Tests for the CPU-bound tool worker pool."""
+
+import asyncio
+import inspect
+import threading
+import time
+
+import pytest
+
+from src.encoding_music_mcp.tools.intervals import get_notes
+from src.encoding_music_mcp.tools.key_analysis import analyze_key
+from src.encoding_music_mcp.tools.score_cache import get_score_cache
+from src.encoding_music_mcp.tools.worker_pool import (
+    ToolWorkerPool,
+    configure_tool_workers,
+    get_tool_worker_pool,
+    offload,
+)
+
+
+def _sleep(seconds: float) -> float:
+    time.sleep(seconds)
+    return seconds
+
+
+def test_pool_runs_tools_and_reraises_errors():
+    """Results and exceptions should come back from the worker unchanged."""
+    pool = ToolWorkerPool(max_workers=1)
+
+    async def scenario():
+        result = await pool.run(get_notes, {"filename": "Bach_BWV_0772.mei"})
+        with pytest.raises(FileNotFoundError):
+            await pool.run(
+                analyze_key, {"filename": "nonexistent_file.mei", "engine": "numpy"}
+            )
+        return result
+
+    try:
+        assert asyncio.run(scenario()) == get_notes("Bach_BWV_0772.mei")
+        # The worker survives ordinary tool errors and is reused.
+        assert len(pool._idle) == 1
+        assert pool._idle[0].process.is_alive()
+    finally:
+        pool.shutdown()
+
+
+def test_pool_kills_worker_on_timeout_and_cancellation():
+    """Timed-out and cancelled calls should stop their worker process."""
+    pool = ToolWorkerPool(max_workers=1)
+    started_workers = []
+    start_worker = pool._start_worker
+
+    def record_worker():
+        started_workers.append(start_worker())
+        return started_workers[-1]
+
+    pool._start_worker = record_worker
+
+    async def scenario():
+        with pytest.raises(TimeoutError, match="_sleep"):
+            await pool.run(_sleep, {"seconds": 60}, timeout=5)
+        assert pool._idle == []
+
+        task = asyncio.create_task(pool.run(_sleep, {"seconds": 60}))
+        await asyncio.sleep(1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert pool._idle == []
+
+        # A fresh worker replaces the killed ones.
+        return await pool.run(_sleep, {"seconds": 0})
+
+    try:
+        started = time.perf_counter()
+        assert asyncio.run(scenario()) == 0
+        assert time.perf_counter() - started < 30
+        # The killed workers' pipes are closed rather than leaked.
+        assert len(started_workers) == 3
+        assert [worker.connection.closed for worker in started_workers] == [
+            True,
+            True,
+            False,
+        ]
+    finally:
+        pool.shutdown()
+
+
+def test_offload_preserves_signature_and_limits_concurrency():
+    """Wrapped tools keep their schema and honour max_concurrency."""
+    wrapped = offload(get_notes)
+    assert wrapped.__name__ == "get_notes"
+    assert wrapped.__doc__ == get_notes.__doc__
+    assert inspect.signature(wrapped) == inspect.signature(get_notes)
+    assert inspect.iscoroutinefunction(wrapped)
+
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def busy(seconds: float) -> float:
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(seconds)
+        with lock:
+            active -= 1
+        return seconds
+
+    limited = offload(busy, max_concurrency=2)
+
+    async def scenario():
+        return await asyncio.gather(*(limited(0.05) for _ in range(6)))
+
+    assert get_tool_worker_pool() is None
+    assert asyncio.run(scenario()) == [0.05] * 6
+    assert peak == 2
+
+
+def test_configure_tool_workers_routes_offloaded_calls():
+    """Enabling the shared pool should run offloaded tools in a worker."""
+    try:
+        pool = configure_tool_workers(1)
+        assert get_tool_worker_pool() is pool
+        result = asyncio.run(offload(get_notes)(filename="Bach_BWV_0772.mei"))
+        assert result == get_notes("Bach_BWV_0772.mei")
+        assert len(pool._idle) == 1
+    finally:
+        assert configure_tool_workers(0) is None
+    assert get_tool_worker_pool() is None
+
+
+def _score_cache_budget() -> int:
+    return get_score_cache().max_bytes
+
+
+def test_workers_divide_the_score_cache_budget():
+    """Each worker caches its share of the budget, not a budget of its own."""
+    pool = ToolWorkerPool(max_workers=4)
+    try:
+        budget = asyncio.run(pool.run(_score_cache_budget, {}))
+    finally:
+        pool.shutdown()
+
+    assert budget == get_score_cache().max_bytes // 4